@@ -0,0 +1,86 @@
+# aggregates.py - Per-user Analytics Aggregates Maintained on Write
+
+from datetime import datetime
+
+from attendance_bits import AttendanceBits, slot_ranks, occurrence
+
+# Latest classes (or study sessions) behind the trend and recent-absence features
+RECENT_WINDOW = 10
+
+# Bumped when the layout changes, so stored aggregates are rebuilt on read
+AGGREGATES_VERSION = 3
+
+
+def study_totals(study_sessions):
+    """Per-subject study minutes, session count and last study date ('dd/mm/yyyy') in one pass"""
+    totals = {}
+    latest = {}
+    for study_session in study_sessions:
+        subject_id = str(study_session.get('subject'))
+        entry = totals.setdefault(subject_id, {'minutes': 0, 'sessions': 0, 'last_studied': None})
+        entry['minutes'] += study_session.get('duration', 0)
+        entry['sessions'] += 1
+        date = study_session.get('date')
+        try:
+            day = datetime.strptime(date, '%d/%m/%Y')
+        except (TypeError, ValueError):
+            continue
+        if subject_id not in latest or day > latest[subject_id]:
+            latest[subject_id] = day
+            entry['last_studied'] = date
+    return totals
+
+
+def build_aggregates(app_data):
+    """Summary of a user's app_data that analytics can read in O(subjects)
+
+    subjects:        the subject list
+    attendance:      {subject_id: {total, attended, bits}}, bits being the
+                     AttendanceBits of the records (see to_dict). total and
+                     attended are counted from the records when there are any
+    study:           {subject_id: {minutes, sessions, last_studied}}
+    recent_studied:  subject IDs of the last RECENT_WINDOW study sessions
+    time_slots:      the user's time slots, which order classes within a day
+    """
+    time_slots = app_data.get('timeSlots', [])
+    attendance = {}
+    for subject_id, entry in app_data.get('attendanceData', {}).items():
+        records = entry.get('records', [])
+        bits = AttendanceBits.from_records(str(subject_id), records, time_slots)
+        attendance[str(subject_id)] = {
+            'total': bits.count if records else entry.get('total', 0),
+            'attended': bits.attended if records else entry.get('attended', 0),
+            'bits': bits.to_dict()
+        }
+
+    study_sessions = app_data.get('studySessions', [])
+    return {
+        'version': AGGREGATES_VERSION,
+        'subjects': app_data.get('subjects', []),
+        'attendance': attendance,
+        'study': study_totals(study_sessions),
+        'recent_studied': [str(s.get('subject')) for s in study_sessions[-RECENT_WINDOW:]],
+        'time_slots': time_slots
+    }
+
+
+def add_attendance_to_aggregates(aggregates, subject_id, records):
+    """Fold newly appended attendance records into existing aggregates
+
+    Returns None, leaving the aggregates to be rebuilt from app_data, if a
+    record is for a class older than the subject's latest one.
+    """
+    subject_id = str(subject_id)
+    entry = aggregates['attendance'].setdefault(
+        subject_id, {'total': 0, 'attended': 0, 'bits': AttendanceBits().to_dict()}
+    )
+    bits = AttendanceBits.from_dict(entry['bits'])
+    ranks = slot_ranks(aggregates.get('time_slots'))
+    for record in records:
+        if not bits.append(record['status'] == 'present', occurrence(subject_id, record.get('key'), ranks)):
+            return None
+        entry['total'] += 1
+        if record['status'] == 'present':
+            entry['attended'] += 1
+    entry['bits'] = bits.to_dict()
+    return aggregates
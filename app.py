@@ -2,20 +2,28 @@
 
 import os
 import json
+import threading
+from collections import OrderedDict
 import base64
 from io import BytesIO
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for
+from flask import Flask, request, jsonify, render_template, session, redirect, url_for, Response
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import numpy as np
 from attendance_risk import AttendanceRiskPredictor
 from study_optimizer import StudyTimeOptimizer
-from grade_predictor_model import GradePredictor
+from grade_predictor_model import GradePredictor, GRADE_FEATURES
 from google_oauth import GoogleOAuth
+from model_registry import ModelRegistry, ModelSlot
+from storage import open_user_store, default_app_data
+from patches import PatchError, PatchConflict
+from plot_cache import PlotCache, plot_key
+from attendance_import import import_attendance
+from jobs import JobQueue
+from inference_cache import InferenceCache
+from http_cache import make_etag, conditional_response, compress_response
+from tuning import load_tuned_params
+from aggregates import build_aggregates, study_totals, RECENT_WINDOW
 
 # --- App Configuration ---
 app = Flask(__name__)
@@ -30,15 +38,63 @@ USE_GOOGLE_OAUTH = bool(GOOGLE_CLIENT_ID)
 PREMIUM_PRICE = 99  # ₹99/year
 USE_MOCK_PAYMENT = True  # Set to False when Razorpay is ready
 
+# Compress large JSON/HTML responses (gzip, or brotli when installed)
+app.after_request(compress_response)
+
 # Directory to store user data files
 DATA_DIR = 'user_data'
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
+# User data backend: 'json' (one file per user), 'compact' (packed binary files) or 'sqlite'
+# (run `python storage.py migrate [--to compact]` first for the latter two)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+user_store = open_user_store(
+    STORAGE_BACKEND, DATA_DIR, os.environ.get('SQLITE_PATH'),
+    coalesce_writes=os.environ.get('COALESCE_WRITES', '0') == '1'
+)
+
+# Versioned store of pre-trained model artifacts (trained_models/)
+model_registry = ModelRegistry()
+
+# Rendered attendance plots, keyed by a hash of the plotted values
+plot_cache = PlotCache()
+
+# Per-row model outputs keyed on (model, revision, rounded features)
+inference_cache = InferenceCache(
+    max_entries=int(os.environ.get('INFERENCE_CACHE_SIZE', 50000)),
+    ttl_seconds=int(os.environ.get('INFERENCE_CACHE_TTL', 3600))
+)
+
+# Uploads and retraining run here so they don't hold up request workers
+job_queue = JobQueue(os.path.join(DATA_DIR, 'jobs.db'), workers=int(os.environ.get('JOB_WORKERS', 2)))
+
 # --- Helper Functions ---
-def get_user_filepath(username):
-    """Returns the path to a user's JSON data file."""
-    return os.path.join(DATA_DIR, f"{username}.json")
+def tuned_params(name):
+    """Hyperparameters the last tuning run chose for a model, or None for the defaults"""
+    return load_tuned_params(model_registry.models_dir).get(name)
+
+def train_grade_predictor():
+    """Build and train a fresh grade predictor (registry fallback)"""
+    model = GradePredictor(tuned_params('grade_predictor'))
+    model.train_models()
+    return model
+
+def train_study_optimizer():
+    """Build and train a fresh study optimizer (registry fallback)"""
+    return StudyTimeOptimizer(params=tuned_params('study_optimizer'))
+
+def load_model_slot(name, model_class, factory):
+    """Load (or train) a registry model and wrap it in a hot-swappable slot"""
+    model = model_registry.load_or_train(name, model_class.MODEL_VERSION, factory)
+    entry = model_registry.get_entry(name)
+    return ModelSlot(name, model, entry['revision'] if entry else None,
+                     registry=model_registry, version=model_class.MODEL_VERSION)
+
+def cached_model(slot):
+    """Live model plus a score_rows function backed by the shared inference cache"""
+    model, revision = slot.snapshot()
+    return model, inference_cache.scorer(slot.name, revision, model.score_rows)
 
 # --- Main Routes ---
 @app.route('/')
@@ -81,30 +137,22 @@ def signup():
     if not username or not password or not email:
         return jsonify({'success': False, 'message': 'Email, username and password are required.'})
 
-    user_file = get_user_filepath(username)
-    if os.path.exists(user_file):
+    if user_store.exists(username):
         return jsonify({'success': False, 'message': 'Username already exists.'})
 
-    # Create a new user file with hashed password
+    if user_store.find_by_email(email):
+        return jsonify({'success': False, 'message': 'An account with this email already exists.'})
+
+    # Create a new user with hashed password
     default_data = {
         'email': email,
         'password': generate_password_hash(password),
         'premium': False,
         'premium_expiry': None,
-        'app_data': {
-            'subjects': [],
-            'timetable': {},
-            'attendanceData': {},
-            'timeSlots': ['9:00 AM-10:00 AM', '10:00 AM-11:00 AM', '11:00 AM-12:00 PM', '12:00 PM-1:00 PM',
-                         '1:00 PM-2:00 PM', '2:00 PM-3:00 PM', '3:00 PM-4:00 PM', '4:00 PM-5:00 PM'],
-            'studentName': '',
-            'universityRollNo': '',
-            'studySessions': [],
-            'studyGoals': {'daily': 2, 'weekly': 14}
-        }
+        'app_data': default_app_data()
     }
-    with open(user_file, 'w') as f:
-        json.dump(default_data, f, indent=4)
+    if not user_store.create(username, default_data):
+        return jsonify({'success': False, 'message': 'Username already exists.'})
     
     return jsonify({'success': True})
 
@@ -115,12 +163,9 @@ def login():
     username = data.get('username')
     password = data.get('password')
 
-    user_file = get_user_filepath(username)
-    if not os.path.exists(user_file):
+    user_data = user_store.load_account(username)
+    if user_data is None:
         return jsonify({'success': False, 'message': 'Username not found.'})
-
-    with open(user_file, 'r') as f:
-        user_data = json.load(f)
     
     if check_password_hash(user_data.get('password', ''), password):
         session['username'] = username
@@ -147,11 +192,11 @@ def google_login():
         return jsonify({'success': False, 'message': 'Invalid token'}), 401
     
     # Check if user exists
-    username = google_oauth.find_user_by_google_id(result['google_id'], DATA_DIR)
+    username = google_oauth.find_user_by_google_id(result['google_id'], user_store)
     
     if not username:
         # Create new user
-        username = google_oauth.create_user_from_google(result, DATA_DIR)
+        username = google_oauth.create_user_from_google(result, user_store)
     
     # Log user in
     session['username'] = username
@@ -184,22 +229,39 @@ def save_data():
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     
     username = session['username']
-    user_file = get_user_filepath(username)
-    
-    # Read existing data first
-    try:
-        with open(user_file, 'r') as f:
-            user_data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        user_data = {'password': ''}
 
-    # Update app_data with the new data
-    user_data['app_data'] = request.json
-    
-    with open(user_file, 'w') as f:
-        json.dump(user_data, f, indent=4)
+    # Replace app_data with the new data, keeping account fields
+    try:
+        revision = user_store.replace_app_data(username, request.json)
+    except KeyError:
+        return jsonify({'success': False, 'message': 'No data found for user.'}), 404
+    plot_cache.invalidate_user(username)
         
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'revision': revision})
+
+@app.route('/patch_data', methods=['POST'])
+def patch_data():
+    """Applies a JSON Patch made against base_revision to the user's app_data."""
+    if 'username' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+
+    username = session['username']
+    body = request.get_json(silent=True) or {}
+    base_revision = body.get('base_revision')
+    if not isinstance(base_revision, int):
+        return jsonify({'success': False, 'message': 'base_revision is required'}), 400
+
+    try:
+        revision = user_store.apply_patch(username, base_revision, body.get('ops'))
+    except PatchConflict as e:
+        return jsonify({'success': False, 'conflict': True, 'message': str(e), 'revision': e.revision}), 409
+    except PatchError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except KeyError:
+        return jsonify({'success': False, 'message': 'No data found for user.'}), 404
+
+    plot_cache.invalidate_user(username)
+    return jsonify({'success': True, 'revision': revision})
 
 @app.route('/get_data')
 def get_data():
@@ -207,27 +269,45 @@ def get_data():
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
 
     username = session['username']
-    user_file = get_user_filepath(username)
 
-    if not os.path.exists(user_file):
+    # ?since=<revision>: send only the ops made after it, when the log still has them
+    since = request.args.get('since', type=int)
+    if since is not None:
+        try:
+            revision, ops = user_store.changes_since(username, since)
+        except KeyError:
+            return jsonify({'success': False, 'message': 'No data found for user.'}), 404
+        if ops is not None:
+            return jsonify({'success': True, 'revision': revision, 'ops': ops})
+
+    # The document revision plus the account fields sent along identify the response;
+    # the header is read without parsing the document, so a 304 never loads it
+    header = user_store.load_header(username)
+    if header is None:
         return jsonify({'success': False, 'message': 'No data found for user.'}), 404
+    etag = make_etag('get_data', username, header['revision'],
+                     header.get('email', ''), header.get('premium', False), header.get('premium_expiry'))
 
-    with open(user_file, 'r') as f:
-        user_data = json.load(f)
-    
-    # Ensure study tracker fields exist
-    app_data = user_data.get('app_data', {})
-    if 'studySessions' not in app_data:
-        app_data['studySessions'] = []
-    if 'studyGoals' not in app_data:
-        app_data['studyGoals'] = {'daily': 2, 'weekly': 14}
-    
-    # Add email and premium status to app_data
-    app_data['email'] = user_data.get('email', '')
-    app_data['premium'] = user_data.get('premium', False)
-    app_data['premium_expiry'] = user_data.get('premium_expiry')
-        
-    return jsonify({'success': True, 'data': app_data})
+    def build():
+        user_data = user_store.load(username)
+        if user_data is None:
+            return jsonify({'success': False, 'message': 'No data found for user.'}), 404
+
+        # Ensure study tracker fields exist
+        app_data = user_data.get('app_data', {})
+        if 'studySessions' not in app_data:
+            app_data['studySessions'] = []
+        if 'studyGoals' not in app_data:
+            app_data['studyGoals'] = {'daily': 2, 'weekly': 14}
+
+        # Add email and premium status to app_data
+        app_data['email'] = user_data.get('email', '')
+        app_data['premium'] = user_data.get('premium', False)
+        app_data['premium_expiry'] = user_data.get('premium_expiry')
+
+        return jsonify({'success': True, 'data': app_data, 'revision': user_data.get('revision', 0)})
+
+    return conditional_response(etag, build)
 
 @app.route('/clear_data', methods=['POST'])
 def clear_data():
@@ -235,112 +315,73 @@ def clear_data():
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     
     username = session['username']
-    user_file = get_user_filepath(username)
 
-    if os.path.exists(user_file):
-        with open(user_file, 'r') as f:
-            user_data = json.load(f)
-        
-        # Clear all app_data except password
-        user_data['app_data'] = {
-            'subjects': [],
-            'timetable': {},
-            'attendanceData': {},
-            'timeSlots': ['9:00 AM-10:00 AM', '10:00 AM-11:00 AM', '11:00 AM-12:00 PM', '12:00 PM-1:00 PM',
-                         '1:00 PM-2:00 PM', '2:00 PM-3:00 PM', '3:00 PM-4:00 PM', '4:00 PM-5:00 PM'],
-            'studentName': '',
-            'universityRollNo': '',
-            'studySessions': [],
-            'studyGoals': {'daily': 2, 'weekly': 14}
-        }
-        
-        with open(user_file, 'w') as f:
-            json.dump(user_data, f, indent=4)
+    try:
+        # Clear all app_data except account fields
+        user_store.replace_app_data(username, default_app_data())
+    except KeyError:
+        pass  # nothing to clear
+    else:
+        plot_cache.invalidate_user(username)
             
     return jsonify({'success': True})
 
 @app.route('/upload_attendance', methods=['POST'])
 def upload_attendance():
-    """Handles Excel file upload and updates attendance data."""
+    """Queues an Excel/CSV upload for import as a background job."""
     if 'username' not in session:
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     if 'file' not in request.files or request.files['file'].filename == '':
         return jsonify({'success': False, 'message': 'No file selected'})
 
     file = request.files['file']
-    try:
-        df = pd.read_excel(file)
-        
-        # Get current user data
-        username = session['username']
-        user_file = get_user_filepath(username)
-        with open(user_file, 'r') as f:
-            user_data = json.load(f)
-        
-        app_data = user_data.get('app_data', {})
-        subjects = app_data.get('subjects', [])
-        attendance_data = app_data.get('attendanceData', {})
-        
-        # Create a map of subject name to subject ID
-        subject_name_to_id = {subj['name'].lower(): str(subj['id']) for subj in subjects}
-        
-        records_added = 0
-        for index, row in df.iterrows():
-            subject_name = str(row.get('Subject', '')).lower()
-            date_obj = pd.to_datetime(row.get('Date'))
-            date_str = date_obj.strftime('%Y-%m-%d') if pd.notnull(date_obj) else None
-            time_slot = str(row.get('Time Slot', ''))
-            status = str(row.get('Status', '')).lower()
-            
-            if not all([subject_name, date_str, time_slot, status in ['present', 'absent']]):
-                continue
-
-            subject_id = subject_name_to_id.get(subject_name)
-            if not subject_id:
-                continue
-
-            if subject_id not in attendance_data:
-                attendance_data[subject_id] = {'total': 0, 'attended': 0, 'records': []}
-
-            record_key = f"{subject_id}-{date_str}-{time_slot}"
-            existing_keys = [rec['key'] for rec in attendance_data[subject_id].get('records', [])]
-
-            if record_key not in existing_keys:
-                attendance_data[subject_id]['total'] += 1
-                if status == 'present':
-                    attendance_data[subject_id]['attended'] += 1
-                
-                attendance_data[subject_id]['records'].append({'key': record_key, 'status': status})
-                records_added += 1
-
-        user_data['app_data']['attendanceData'] = attendance_data
-        with open(user_file, 'w') as f:
-            json.dump(user_data, f, indent=4)
-            
-        return jsonify({'success': True, 'message': f'Successfully added {records_added} new attendance records.'})
-
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'An error occurred: {str(e)}'})
-
-@app.route('/get_attendance_plot')
-def get_attendance_plot():
+    username = session['username']
+    # The upload stream is closed once the request ends, so keep the bytes for the job
+    data = BytesIO(file.read())
+    job_id = job_queue.submit('attendance_import', run_attendance_import, username, data, file.filename,
+                              owner=username)
+    return jsonify({
+        'success': True,
+        'message': 'Upload received, importing attendance...',
+        'job_id': job_id,
+        'status_url': url_for('api_job_status', job_id=job_id)
+    }), 202
+
+def run_attendance_import(progress, username, data, filename):
+    """Background job: import an uploaded attendance file"""
+    report = import_attendance(user_store, username, data, filename, progress=progress)
+    if report['records_added']:
+        plot_cache.invalidate_user(username)
+
+    message = f"Successfully added {report['records_added']} new attendance records."
+    if report['rejected']:
+        message += f" {report['rejected']} row(s) were skipped."
+    print(f"Imported {report['rows_read']} rows for {username} in {report['elapsed_seconds']}s "
+          f"({report['rows_per_second']} rows/sec)")
+    return {'message': message, 'report': report}
+
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """Status, progress and (once finished) result of a background job"""
+    job = job_queue.get(job_id)
+    if job is None or (job['owner'] and job['owner'] != session.get('username')):
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/jobs')
+def api_jobs():
+    """Recent background jobs for the logged-in user"""
     if 'username' not in session:
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
-    
-    username = session['username']
-    user_file = get_user_filepath(username)
-    if not os.path.exists(user_file):
-        return jsonify({'success': False, 'message': 'No data found for user.'})
+    return jsonify({'success': True, 'jobs': job_queue.list(session['username'])})
 
-    with open(user_file, 'r') as f:
-        user_data = json.load(f)
-    
-    app_data = user_data.get('app_data', {})
+def attendance_plot_inputs(app_data):
+    """Subject names and attendance percentages the plot is drawn from"""
     subjects = app_data.get('subjects', [])
     attendance_data = app_data.get('attendanceData', {})
 
     if not subjects or not attendance_data:
-        return jsonify({'success': False, 'message': 'No attendance data to plot.'})
+        return None
 
     subject_names = [s['name'] for s in subjects]
     percentages = []
@@ -352,7 +393,15 @@ def get_attendance_plot():
         percentage = (attended / total * 100) if total > 0 else 0
         percentages.append(percentage)
 
-    # Create the plot
+    return subject_names, percentages
+
+def render_attendance_plot(subject_names, percentages):
+    """Render the subject-wise attendance bar chart as PNG bytes"""
+    # Imported on first render so matplotlib stays out of startup
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(10, 6))
     bars = ax.bar(subject_names, percentages, color='#2c3e50', edgecolor='#1a252f', linewidth=2)
     
@@ -378,272 +427,162 @@ def get_attendance_plot():
     fig.savefig(buf, format="png", dpi=100, bbox_inches='tight')
     plt.close(fig)
     
-    image_data = base64.b64encode(buf.getbuffer()).decode("ascii")
-    
-    return jsonify({'success': True, 'image': image_data})
+    return buf.getvalue()
 
-class StudyAnalytics:
-    def __init__(self):
-        """Initialize the Grade Predictor with ensemble models"""
-        self.rf_model = RandomForestRegressor(
-            n_estimators=200,
-            max_depth=10,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=42
-        )
-        self.gb_model = GradientBoostingRegressor(
-            n_estimators=150,
-            learning_rate=0.1,
-            max_depth=5,
-            random_state=42
-        )
-        self.ridge_model = Ridge(alpha=1.0)
-        self.scaler = StandardScaler()
-        self.is_trained = False
-        
-        # Feature importance weights
-        self.feature_weights = {
-            'attendance': 0.25,
-            'study_hours': 0.20,
-            'midterm_scores': 0.30,
-            'assignment_scores': 0.15,
-            'quiz_scores': 0.10
-        }
-    
-    def generate_synthetic_training_data(self, n_samples=1000):
-        """
-        Generate realistic synthetic training data based on academic patterns
-        """
-        np.random.seed(42)
-        
-        # Generate features with realistic correlations
-        attendance = np.random.beta(8, 2, n_samples) * 100  # Most students have good attendance
-        study_hours = np.random.gamma(3, 2, n_samples) * 5  # 0-30 hours/week, avg 15
-        study_hours = np.clip(study_hours, 0, 35)
-        
-        # Midterm and assignment scores correlate with study habits
-        midterm_base = 40 + (attendance/100 * 20) + (study_hours/35 * 20)
-        midterm_scores = midterm_base + np.random.normal(0, 8, n_samples)
-        midterm_scores = np.clip(midterm_scores, 0, 100)
-        
-        assignment_base = 50 + (attendance/100 * 25) + (study_hours/35 * 15)
-        assignment_scores = assignment_base + np.random.normal(0, 10, n_samples)
-        assignment_scores = np.clip(assignment_scores, 0, 100)
-        
-        quiz_base = 45 + (attendance/100 * 15) + (study_hours/35 * 20)
-        quiz_scores = quiz_base + np.random.normal(0, 12, n_samples)
-        quiz_scores = np.clip(quiz_scores, 0, 100)
-        
-        # Calculate final grades with weighted formula
-        final_grades = (
-            attendance * 0.15 +
-            midterm_scores * 0.35 +
-            assignment_scores * 0.25 +
-            quiz_scores * 0.15 +
-            (study_hours/35 * 100) * 0.10
-        )
-        
-        # Add some realistic noise
-        final_grades += np.random.normal(0, 5, n_samples)
-        final_grades = np.clip(final_grades, 0, 100)
-        
-        X = np.column_stack([
-            attendance,
-            study_hours,
-            midterm_scores,
-            assignment_scores,
-            quiz_scores
-        ])
-        
-        return X, final_grades
-    
-    def train_models(self):
-        """Train all models on synthetic data"""
-        print("Generating training data...")
-        X, y = self.generate_synthetic_training_data(n_samples=2000)
-        
-        print("Training models...")
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
-        
-        # Train Random Forest
-        self.rf_model.fit(X_scaled, y)
-        rf_score = cross_val_score(self.rf_model, X_scaled, y, cv=5).mean()
-        print(f"Random Forest CV Score: {rf_score:.4f}")
-        
-        # Train Gradient Boosting
-        self.gb_model.fit(X_scaled, y)
-        gb_score = cross_val_score(self.gb_model, X_scaled, y, cv=5).mean()
-        print(f"Gradient Boosting CV Score: {gb_score:.4f}")
-        
-        # Train Ridge Regression
-        self.ridge_model.fit(X_scaled, y)
-        ridge_score = cross_val_score(self.ridge_model, X_scaled, y, cv=5).mean()
-        print(f"Ridge Regression CV Score: {ridge_score:.4f}")
-        
-        self.is_trained = True
-        print("All models trained successfully!")
-        
-        return {
-            'rf_score': rf_score,
-            'gb_score': gb_score,
-            'ridge_score': ridge_score
-        }
+def load_attendance_plot_inputs(username):
+    """Returns (etag, inputs, None) or (None, None, error_message)."""
+    aggregates = user_store.load_aggregates(username)
+    if aggregates is None:
+        return None, None, 'No data found for user.'
+
+    inputs = attendance_plot_inputs({'subjects': aggregates['subjects'], 'attendanceData': aggregates['attendance']})
+    if inputs is None:
+        return None, None, 'No attendance data to plot.'
+
+    return plot_key(*inputs), inputs, None
+
+def get_cached_attendance_plot(username, etag, inputs):
+    """PNG bytes for the plot, rendered only on a cache miss"""
+    return plot_cache.get_or_render(etag, lambda: render_attendance_plot(*inputs), username)
+
+@app.route('/get_attendance_plot')
+def get_attendance_plot():
+    """Attendance plot as base64 PNG inside JSON (prefer /attendance_plot.png)"""
+    if 'username' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     
-    def predict_grade(self, attendance_pct, study_hours_per_week, 
-                     midterm_score, assignment_score, quiz_score):
-        """
-        Predict final grade using ensemble of models
-        
-        Parameters:
-        - attendance_pct: Current attendance percentage (0-100)
-        - study_hours_per_week: Average weekly study hours
-        - midterm_score: Midterm exam score (0-100)
-        - assignment_score: Average assignment score (0-100)
-        - quiz_score: Average quiz score (0-100)
-        
-        Returns:
-        - Dictionary with prediction, confidence, and recommendations
-        """
-        if not self.is_trained:
-            self.train_models()
-        
-        # Prepare input
-        X = np.array([[
-            attendance_pct,
-            study_hours_per_week,
-            midterm_score,
-            assignment_score,
-            quiz_score
-        ]])
-        
-        X_scaled = self.scaler.transform(X)
-        
-        # Get predictions from all models
-        rf_pred = self.rf_model.predict(X_scaled)[0]
-        gb_pred = self.gb_model.predict(X_scaled)[0]
-        ridge_pred = self.ridge_model.predict(X_scaled)[0]
-        
-        # Ensemble prediction (weighted average)
-        ensemble_pred = (rf_pred * 0.4 + gb_pred * 0.4 + ridge_pred * 0.2)
-        ensemble_pred = np.clip(ensemble_pred, 0, 100)
-        
-        # Calculate confidence based on model agreement
-        predictions = [rf_pred, gb_pred, ridge_pred]
-        std_dev = np.std(predictions)
-        confidence = max(0, min(100, 100 - (std_dev * 5)))
-        
-        # Generate grade letter
-        grade_letter = self._get_grade_letter(ensemble_pred)
-        
-        # Calculate what's needed for target grades
-        improvement_analysis = self._analyze_improvements(
-            attendance_pct, study_hours_per_week, midterm_score, 
-            assignment_score, quiz_score, ensemble_pred
-        )
-        
-        return {
-            'predicted_score': round(ensemble_pred, 2),
-            'grade_letter': grade_letter,
-            'confidence': round(confidence, 2),
-            'model_predictions': {
-                'random_forest': round(rf_pred, 2),
-                'gradient_boosting': round(gb_pred, 2),
-                'ridge_regression': round(ridge_pred, 2)
-            },
-            'improvement_analysis': improvement_analysis,
-            'timestamp': datetime.now().isoformat()
-        }
+    username = session['username']
+    etag, inputs, message = load_attendance_plot_inputs(username)
+    if inputs is None:
+        return jsonify({'success': False, 'message': message})
     
-    def _get_grade_letter(self, score):
-        """Convert numerical score to letter grade"""
-        if score >= 90: return 'A'
-        elif score >= 80: return 'B'
-        elif score >= 70: return 'C'
-        elif score >= 60: return 'D'
-        else: return 'F'
+    def build():
+        png = get_cached_attendance_plot(username, etag, inputs)
+        return jsonify({'success': True, 'image': base64.b64encode(png).decode("ascii")})
+
+    return conditional_response(etag, build)
+
+@app.route('/attendance_plot.png')
+def attendance_plot_png():
+    """Attendance plot as raw PNG with ETag revalidation (304 when unchanged)"""
+    if 'username' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     
-    def _analyze_improvements(self, attendance, study_hours, midterm, 
-                             assignment, quiz, current_pred):
-        """Analyze what improvements are needed for better grades"""
-        improvements = {}
-        
-        # Target grades to analyze
-        targets = [90, 80, 70, 60]  # A, B, C, D
-        
-        for target in targets:
-            if target > current_pred:
-                # Calculate needed improvements
-                gap = target - current_pred
-                
-                suggestions = []
-                
-                # Attendance improvement
-                if attendance < 95:
-                    att_needed = min(100 - attendance, gap / 0.15)
-                    if att_needed > 0:
-                        suggestions.append({
-                            'area': 'attendance',
-                            'current': round(attendance, 1),
-                            'needed': round(attendance + att_needed, 1),
-                            'impact': round(att_needed * 0.15, 2)
-                        })
-                
-                # Study hours improvement
-                if study_hours < 25:
-                    hours_increase = min(25 - study_hours, gap / (0.10 * (100/35)))
-                    if hours_increase > 1:
-                        suggestions.append({
-                            'area': 'study_hours',
-                            'current': round(study_hours, 1),
-                            'needed': round(study_hours + hours_increase, 1),
-                            'impact': round(hours_increase * (0.10 * (100/35)), 2)
-                        })
-                
-                # Assignments improvement (if there are remaining assignments)
-                if assignment < 95:
-                    assign_needed = min(100 - assignment, gap / 0.25)
-                    if assign_needed > 0:
-                        suggestions.append({
-                            'area': 'assignments',
-                            'current': round(assignment, 1),
-                            'needed': round(assignment + assign_needed, 1),
-                            'impact': round(assign_needed * 0.25, 2)
-                        })
-                
-                grade_letter = self._get_grade_letter(target)
-                improvements[f'target_{grade_letter}'] = {
-                    'target_score': target,
-                    'points_needed': round(gap, 2),
-                    'suggestions': suggestions[:3]  # Top 3 suggestions
-                }
-        
-        return improvements
+    username = session['username']
+    etag, inputs, message = load_attendance_plot_inputs(username)
+    if inputs is None:
+        return jsonify({'success': False, 'message': message}), 404
     
-    def get_feature_importance(self):
-        """Get feature importance from Random Forest model"""
-        if not self.is_trained:
-            self.train_models()
-        
-        feature_names = [
-            'Attendance %',
-            'Study Hours/Week',
-            'Midterm Score',
-            'Assignment Score',
-            'Quiz Score'
-        ]
-        
-        importances = self.rf_model.feature_importances_
-        
-        return {
-            name: round(imp * 100, 2) 
-            for name, imp in zip(feature_names, importances)
-        }
+    # The client's copy is still current: skip rendering entirely
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(get_cached_attendance_plot(username, etag, inputs), mimetype='image/png')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def attendance_series(subjects, attendance_data, bucket=None):
+    """Compact per-subject attendance arrays for client-side charts
+
+    With bucket='week' or 'month', records are also grouped by the date in
+    their key ("<subject_id>-YYYY-MM-DD-<slot>") into aligned per-period
+    'held'/'present' count arrays.
+    """
+    series = {
+        'ids': [],
+        'names': [],
+        'totals': [],
+        'attended': [],
+        'percentages': []
+    }
+    per_subject_counts = []
+    periods = set()
+
+    for subject in subjects:
+        subject_id = str(subject['id'])
+        data = attendance_data.get(subject_id, {'total': 0, 'attended': 0, 'records': []})
+        total = data.get('total', 0)
+        attended = data.get('attended', 0)
+
+        series['ids'].append(subject_id)
+        series['names'].append(subject['name'])
+        series['totals'].append(total)
+        series['attended'].append(attended)
+        series['percentages'].append(round(attended / total * 100, 1) if total > 0 else 0)
+
+        if bucket:
+            counts = {}
+            prefix_len = len(subject_id) + 1
+            for record in data.get('records', []):
+                try:
+                    day = datetime.strptime(record['key'][prefix_len:prefix_len + 10], '%Y-%m-%d')
+                except ValueError:
+                    continue
+                period = day.strftime('%G-W%V') if bucket == 'week' else day.strftime('%Y-%m')
+                held, present = counts.get(period, (0, 0))
+                counts[period] = (held + 1, present + (record.get('status') == 'present'))
+            periods.update(counts)
+            per_subject_counts.append(counts)
+
+    if bucket:
+        series['bucket'] = bucket
+        series['periods'] = sorted(periods)
+        series['held'] = [[counts.get(p, (0, 0))[0] for p in series['periods']] for counts in per_subject_counts]
+        series['present'] = [[counts.get(p, (0, 0))[1] for p in series['periods']] for counts in per_subject_counts]
+
+    return series
+
+@app.route('/api/attendance_series')
+def api_attendance_series():
+    """Attendance chart data as JSON (?bucket=week|month for time series)"""
+    if 'username' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+
+    bucket = request.args.get('bucket')
+    if bucket not in (None, 'week', 'month'):
+        return jsonify({'success': False, 'message': 'bucket must be week or month'}), 400
+
+    user_data = user_store.load(session['username'])
+    if user_data is None:
+        return jsonify({'success': False, 'message': 'No data found for user.'}), 404
+
+    app_data = user_data.get('app_data', {})
+    subjects = app_data.get('subjects', [])
+    attendance_data = app_data.get('attendanceData', {})
+    if not subjects or not attendance_data:
+        return jsonify({'success': False, 'message': 'No attendance data to plot.'})
 
+    return jsonify({'success': True, 'series': attendance_series(subjects, attendance_data, bucket)})
+
+MAX_BATCH_ROWS = 10000
+MAX_SWEEP_STEPS = 101
+
+# Memoized what-if sweeps, keyed on the model revision and the request
+SWEEP_CACHE_SIZE = 256
+sweep_cache = OrderedDict()
+sweep_cache_lock = threading.Lock()
+
+def parse_sweep_axes(axes):
+    """[(feature, values)] from {"feature": [values] | {"min", "max", "steps"}}"""
+    parsed = []
+    for feature, spec in axes.items():
+        if feature not in GRADE_FEATURES:
+            raise ValueError(f'Unknown feature: {feature}')
+        if isinstance(spec, dict):
+            steps = int(spec.get('steps', 11))
+            if not 2 <= steps <= MAX_SWEEP_STEPS:
+                raise ValueError(f'steps must be between 2 and {MAX_SWEEP_STEPS}')
+            values = np.linspace(float(spec['min']), float(spec['max']), steps)
+        else:
+            values = np.asarray(spec, dtype=np.float64)
+            if not 1 <= values.size <= MAX_SWEEP_STEPS:
+                raise ValueError(f'Each axis needs 1 to {MAX_SWEEP_STEPS} values')
+        parsed.append((feature, tuple(values.tolist())))
+    return parsed
 
 # Flask API endpoints to add to app.py
-def add_grade_predictor_routes(app, predictor):
+def add_grade_predictor_routes(app, predictor_slot):
     """
     Add these routes to your Flask app
     """
@@ -655,9 +594,7 @@ def add_grade_predictor_routes(app, predictor):
             data = request.json
             
             # Validate inputs
-            required_fields = ['attendance', 'study_hours', 'midterm', 
-                             'assignment', 'quiz']
-            for field in required_fields:
+            for field in GRADE_FEATURES:
                 if field not in data:
                     return jsonify({
                         'success': False, 
@@ -665,12 +602,14 @@ def add_grade_predictor_routes(app, predictor):
                     }), 400
             
             # Make prediction
-            result = predictor.predict_grade(
+            model, score_rows = cached_model(predictor_slot)
+            result = model.predict_grade(
                 attendance_pct=float(data['attendance']),
                 study_hours_per_week=float(data['study_hours']),
                 midterm_score=float(data['midterm']),
                 assignment_score=float(data['assignment']),
-                quiz_score=float(data['quiz'])
+                quiz_score=float(data['quiz']),
+                score_rows=score_rows
             )
             
             return jsonify({'success': True, 'prediction': result})
@@ -681,11 +620,110 @@ def add_grade_predictor_routes(app, predictor):
                 'message': f'Error: {str(e)}'
             }), 500
     
+    @app.route('/api/predict_grade/batch', methods=['POST'])
+    def api_predict_grade_batch():
+        """
+        Batch grade prediction
+        
+        Accepts {"rows": [[attendance, study_hours, midterm, assignment, quiz], ...]},
+        {"rows": [{"attendance": ..., ...}, ...]} or columnar
+        {"attendance": [...], "study_hours": [...], ...}.
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            
+            if 'rows' in data:
+                rows = data['rows']
+                if rows and isinstance(rows[0], dict):
+                    missing = [field for field in GRADE_FEATURES if field not in rows[0]]
+                    if missing:
+                        return jsonify({'success': False, 'message': f'Missing required field: {missing[0]}'}), 400
+                    rows = [[row[field] for field in GRADE_FEATURES] for row in rows]
+                X = np.array(rows, dtype=np.float64)
+            else:
+                missing = [field for field in GRADE_FEATURES if field not in data]
+                if missing:
+                    return jsonify({'success': False, 'message': f'Missing required field: {missing[0]}'}), 400
+                X = np.column_stack([np.asarray(data[field], dtype=np.float64) for field in GRADE_FEATURES])
+            
+            if X.size == 0:
+                return jsonify({'success': False, 'message': 'No rows to predict'}), 400
+            if X.ndim != 2 or X.shape[1] != len(GRADE_FEATURES):
+                return jsonify({
+                    'success': False,
+                    'message': f'Each row needs {len(GRADE_FEATURES)} values: {", ".join(GRADE_FEATURES)}'
+                }), 400
+            if len(X) > MAX_BATCH_ROWS:
+                return jsonify({'success': False, 'message': f'At most {MAX_BATCH_ROWS} rows per request'}), 413
+            
+            predictions = predictor_slot.get().predict_batch(
+                X, include_improvements=bool(data.get('include_improvements'))
+            )
+            return jsonify({'success': True, 'count': len(X), 'predictions': predictions})
+            
+        except (ValueError, TypeError, KeyError) as e:
+            return jsonify({'success': False, 'message': f'Invalid input: {str(e)}'}), 400
+        except Exception as e:
+            return jsonify({
+                'success': False, 
+                'message': f'Error: {str(e)}'
+            }), 500
+    
+    @app.route('/api/predict_grade/sweep', methods=['POST'])
+    def api_predict_grade_sweep():
+        """
+        What-if sensitivity sweep
+        
+        {"base": {"attendance": ..., ...}, "axes": {"attendance": {"min": 50, "max": 100,
+        "steps": 11}, "study_hours": [5, 10, 15]}, "mode": "grid" | "curves"}
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            base_fields = data.get('base', {})
+            missing = [field for field in GRADE_FEATURES if field not in base_fields]
+            if missing:
+                return jsonify({'success': False, 'message': f'Missing required field: base.{missing[0]}'}), 400
+            base = tuple(float(base_fields[field]) for field in GRADE_FEATURES)
+            
+            axes = parse_sweep_axes(data.get('axes') or {})
+            if not axes:
+                return jsonify({'success': False, 'message': 'At least one axis is required'}), 400
+            mode = data.get('mode', 'grid')
+            if mode not in ('grid', 'curves'):
+                return jsonify({'success': False, 'message': 'mode must be grid or curves'}), 400
+            n_points = (int(np.prod([len(values) for _, values in axes])) if mode == 'grid'
+                        else sum(len(values) for _, values in axes))
+            if n_points > MAX_BATCH_ROWS:
+                return jsonify({'success': False, 'message': f'Sweep has {n_points} points; at most {MAX_BATCH_ROWS}'}), 413
+            
+            model, revision = predictor_slot.snapshot()
+            key = (revision, base, tuple(axes), mode)
+            with sweep_cache_lock:
+                sweep = sweep_cache.get(key)
+                if sweep is not None:
+                    sweep_cache.move_to_end(key)
+            if sweep is None:
+                sweep = model.sensitivity_grid(base, axes, mode)
+                with sweep_cache_lock:
+                    sweep_cache[key] = sweep
+                    while len(sweep_cache) > SWEEP_CACHE_SIZE:
+                        sweep_cache.popitem(last=False)
+            
+            return jsonify({'success': True, 'sweep': sweep})
+            
+        except (ValueError, TypeError, KeyError) as e:
+            return jsonify({'success': False, 'message': f'Invalid input: {str(e)}'}), 400
+        except Exception as e:
+            return jsonify({
+                'success': False, 
+                'message': f'Error: {str(e)}'
+            }), 500
+    
     @app.route('/api/feature_importance')
     def api_feature_importance():
         """Get feature importance for understanding predictions"""
         try:
-            importance = predictor.get_feature_importance()
+            importance = predictor_slot.get().get_feature_importance()
             return jsonify({'success': True, 'importance': importance})
         except Exception as e:
             return jsonify({
@@ -695,14 +733,18 @@ def add_grade_predictor_routes(app, predictor):
     
     @app.route('/api/train_models', methods=['POST'])
     def api_train_models():
-        """Retrain models with latest data"""
+        """Retrain a model off to the side and hot-swap it in (runs as a background job)"""
         try:
-            scores = predictor.train_models()
+            name = (request.get_json(silent=True) or {}).get('model', predictor_slot.name)
+            if name not in MODEL_TRAINERS:
+                return jsonify({'success': False, 'message': f'Unknown model: {name}'}), 400
+            job_id = job_queue.submit('train_models', retrain_model, name, owner=session.get('username'))
             return jsonify({
                 'success': True, 
-                'message': 'Models trained successfully',
-                'scores': scores
-            })
+                'message': 'Model training started',
+                'job_id': job_id,
+                'status_url': url_for('api_job_status', job_id=job_id)
+            }), 202
         except Exception as e:
             return jsonify({
                 'success': False, 
@@ -766,11 +808,22 @@ class StudyAnalytics:
             'insights': insights
         }
     
-    def recommend_next_subject(self, study_sessions, subjects, attendance_data):
-        """ML-based recommendation for which subject to study next"""
+    def recommend_next_subject(self, study_sessions, subjects, attendance_data,
+                               study_summary=None, recent_studied=None):
+        """ML-based recommendation for which subject to study next
+        
+        study_summary and recent_studied come from the user's aggregates when
+        available; otherwise they are computed from study_sessions in one pass.
+        """
         if not subjects:
             return None
         
+        if study_summary is None:
+            study_summary = study_totals(study_sessions)
+        if recent_studied is None:
+            recent_studied = [str(s['subject']) for s in study_sessions[-RECENT_WINDOW:]]
+        recent_studied = set(recent_studied)
+        
         subject_scores = {}
         
         for subject in subjects:
@@ -787,15 +840,14 @@ class StudyAnalytics:
                     score += 20
             
             # Factor 2: Study time (less studied = higher priority)
-            subject_study_time = sum(s['duration'] for s in study_sessions if str(s['subject']) == subject_id)
+            subject_study_time = study_summary.get(subject_id, {}).get('minutes', 0)
             if subject_study_time == 0:
                 score += 30
             elif subject_study_time < 120:  # Less than 2 hours
                 score += 15
             
             # Factor 3: Recency (not studied recently = higher priority)
-            recent_sessions = [s for s in study_sessions[-10:] if str(s['subject']) == subject_id]
-            if not recent_sessions:
+            if subject_id not in recent_studied:
                 score += 30
             
             subject_scores[subject_id] = score
@@ -850,12 +902,12 @@ class StudyAnalytics:
         }
 
 
-# Initialize ML models
-predictor = GradePredictor()
+# Initialize ML models (loaded from trained_models/, trained only if missing or stale)
+grade_model = load_model_slot('grade_predictor', GradePredictor, train_grade_predictor)
 study_analytics = StudyAnalytics()
 
 # Add grade predictor routes
-add_grade_predictor_routes(app, predictor)
+add_grade_predictor_routes(app, grade_model)
 
 # Study Analytics API Routes
 @app.route('/api/study_analytics', methods=['POST'])
@@ -872,9 +924,21 @@ def api_study_analytics():
 
 @app.route('/api/recommend_subject', methods=['POST'])
 def api_recommend_subject():
-    """Get AI recommendation for next subject to study"""
+    """Get AI recommendation for next subject to study
+    
+    Uses the posted study_sessions/subjects/attendance_data, or the logged-in
+    user's stored aggregates when subjects are not posted.
+    """
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
+        if 'subjects' not in data and 'username' in session:
+            aggregates = user_store.load_aggregates(session['username']) or build_aggregates({})
+            recommendation = study_analytics.recommend_next_subject(
+                [], aggregates['subjects'], aggregates['attendance'],
+                aggregates['study'], aggregates['recent_studied']
+            )
+            return jsonify({'success': True, 'recommendation': recommendation})
+        
         study_sessions = data.get('study_sessions', [])
         subjects = data.get('subjects', [])
         attendance_data = data.get('attendance_data', {})
@@ -910,19 +974,15 @@ def activate_premium_demo():
         from datetime import timedelta
         
         username = session['username']
-        user_file = get_user_filepath(username)
-        
-        with open(user_file, 'r') as f:
-            user_data = json.load(f)
         
         # Set premium status and expiry (1 year from now)
         expiry_date = (datetime.now() + timedelta(days=365)).isoformat()
-        user_data['premium'] = True
-        user_data['premium_expiry'] = expiry_date
-        user_data['payment_id'] = f'DEMO_{datetime.now().strftime("%Y%m%d%H%M%S")}'
-        
-        with open(user_file, 'w') as f:
-            json.dump(user_data, f, indent=4)
+        user_store.update_account(
+            username,
+            premium=True,
+            premium_expiry=expiry_date,
+            payment_id=f'DEMO_{datetime.now().strftime("%Y%m%d%H%M%S")}'
+        )
         
         return jsonify({
             'success': True,
@@ -939,14 +999,11 @@ def check_premium():
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     
     username = session['username']
-    user_file = get_user_filepath(username)
+    user_data = user_store.load_account(username)
     
-    if not os.path.exists(user_file):
+    if user_data is None:
         return jsonify({'success': False, 'premium': False})
     
-    with open(user_file, 'r') as f:
-        user_data = json.load(f)
-    
     is_premium = user_data.get('premium', False)
     expiry = user_data.get('premium_expiry')
     
@@ -955,9 +1012,7 @@ def check_premium():
         expiry_date = datetime.fromisoformat(expiry)
         if datetime.now() > expiry_date:
             is_premium = False
-            user_data['premium'] = False
-            with open(user_file, 'w') as f:
-                json.dump(user_data, f, indent=4)
+            user_store.update_account(username, premium=False)
     
     return jsonify({
         'success': True,
@@ -973,16 +1028,7 @@ def deactivate_premium():
     
     try:
         username = session['username']
-        user_file = get_user_filepath(username)
-        
-        with open(user_file, 'r') as f:
-            user_data = json.load(f)
-        
-        user_data['premium'] = False
-        user_data['premium_expiry'] = None
-        
-        with open(user_file, 'w') as f:
-            json.dump(user_data, f, indent=4)
+        user_store.update_account(username, premium=False, premium_expiry=None)
         
         return jsonify({
             'success': True,
@@ -992,7 +1038,7 @@ def deactivate_premium():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 # --- Attendance Risk API ---
-risk_predictor = AttendanceRiskPredictor()
+risk_model = load_model_slot('attendance_risk', AttendanceRiskPredictor, AttendanceRiskPredictor)
 
 @app.route('/api/attendance_risk')
 def api_attendance_risk():
@@ -1002,26 +1048,28 @@ def api_attendance_risk():
     
     try:
         username = session['username']
-        user_file = get_user_filepath(username)
-        
-        with open(user_file, 'r') as f:
-            user_data = json.load(f)
-        
-        app_data = user_data.get('app_data', {})
-        subjects = app_data.get('subjects', [])
-        attendance_data = app_data.get('attendanceData', {})
+        aggregates = user_store.load_aggregates(username) or build_aggregates({})
+        subjects = aggregates['subjects']
+        attendance_data = aggregates['attendance']
         
         if not subjects:
             return jsonify({'success': False, 'message': 'No subjects found. Please set up your subjects first.'})
         
-        risks = risk_predictor.analyze_risk(subjects, attendance_data)
-        
-        return jsonify({'success': True, 'risks': risks})
+        model, revision = risk_model.snapshot()
+        etag = make_etag('attendance_risk', revision if revision is not None else id(model),
+                         subjects, attendance_data)
+
+        def build():
+            model, score_rows = cached_model(risk_model)
+            risks = model.analyze_risk(subjects, attendance_data, score_rows)
+            return jsonify({'success': True, 'risks': risks})
+
+        return conditional_response(etag, build)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 # --- Study Optimizer API ---
-study_optimizer_model = StudyTimeOptimizer()
+optimizer_model = load_model_slot('study_optimizer', StudyTimeOptimizer, train_study_optimizer)
 
 @app.route('/api/study_optimizer')
 def api_study_optimizer():
@@ -1031,39 +1079,125 @@ def api_study_optimizer():
     
     try:
         username = session['username']
-        user_file = get_user_filepath(username)
         days_to_exam = int(request.args.get('days_to_exam', 30))
-        
-        with open(user_file, 'r') as f:
-            user_data = json.load(f)
-        
-        app_data = user_data.get('app_data', {})
-        subjects = app_data.get('subjects', [])
-        attendance_data = app_data.get('attendanceData', {})
-        study_sessions = app_data.get('studySessions', [])
+        aggregates = user_store.load_aggregates(username) or build_aggregates({})
+        subjects = aggregates['subjects']
+        attendance_data = aggregates['attendance']
         
         if not subjects:
             return jsonify({'success': False, 'message': 'No subjects found. Please set up your subjects first.'})
         
-        recommendations = study_optimizer_model.optimize_study_plan(
-            subjects, attendance_data, study_sessions, days_to_exam
-        )
-        
-        schedule = study_optimizer_model.generate_weekly_schedule(recommendations)
-        
-        return jsonify({
-            'success': True,
-            'recommendations': recommendations,
-            'schedule': schedule
-        })
+        model, revision = optimizer_model.snapshot()
+        etag = make_etag('study_optimizer', revision if revision is not None else id(model),
+                         days_to_exam, subjects, attendance_data, aggregates['study'])
+
+        def build():
+            # One instance for the whole request, even if a retrain publishes meanwhile
+            study_optimizer_model, score_rows = cached_model(optimizer_model)
+            recommendations = study_optimizer_model.optimize_study_plan(
+                subjects, attendance_data, [], days_to_exam, score_rows, aggregates['study']
+            )
+
+            schedule = study_optimizer_model.generate_weekly_schedule(recommendations)
+
+            return jsonify({
+                'success': True,
+                'recommendations': recommendations,
+                'schedule': schedule
+            })
+
+        return conditional_response(etag, build)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+# --- Model Retraining & Hot Swap ---
+def retrain_grade_predictor(progress):
+    model = GradePredictor(tuned_params('grade_predictor'))
+    return model, model.train_models(progress)
+
+def retrain_study_optimizer(progress):
+    model = StudyTimeOptimizer(params=tuned_params('study_optimizer'))
+    return model, model.cv_metrics
+
+def retrain_constructed(model_class):
+    """Trainer for models whose constructor trains them"""
+    def trainer(progress):
+        model = model_class()
+        return model, model.cv_metrics
+    return trainer
+
+# name -> (slot, model class, trainer returning (model, metrics))
+MODEL_TRAINERS = {
+    'grade_predictor': (grade_model, GradePredictor, retrain_grade_predictor),
+    'attendance_risk': (risk_model, AttendanceRiskPredictor, retrain_constructed(AttendanceRiskPredictor)),
+    'study_optimizer': (optimizer_model, StudyTimeOptimizer, retrain_study_optimizer),
+}
+
+# Inputs used to smoke-test a model before it goes live
+PROBE_SUBJECTS = [{'id': 1, 'name': 'Probe'}]
+PROBE_ATTENDANCE = {'1': {'total': 10, 'attended': 7, 'records': [
+    {'key': f'1-probe-{i}', 'status': 'present' if i % 3 else 'absent'} for i in range(10)
+]}}
+
+def validate_model(name, model):
+    """Raise ValueError if a freshly trained model gives unusable predictions"""
+    if name == 'grade_predictor':
+        score = model.predict_grade(85, 10, 75, 80, 70)['predicted_score']
+        ok = 0 <= score <= 100
+    elif name == 'attendance_risk':
+        risks = model.analyze_risk(PROBE_SUBJECTS, PROBE_ATTENDANCE)
+        ok = len(risks) == 1 and 0 <= risks[0]['risk_probability'] <= 100
+    else:
+        plan = model.optimize_study_plan(PROBE_SUBJECTS, PROBE_ATTENDANCE, [], 30)
+        ok = len(plan) == 1 and np.isfinite(plan[0]['recommended_total_hours'])
+    if not ok:
+        raise ValueError(f"Retrained {name} failed validation")
+
+def retrain_model(progress, name):
+    """Background job: train a model off to the side, validate, save and publish it"""
+    slot, model_class, trainer = MODEL_TRAINERS[name]
+    with slot.update_lock:
+        model, metrics = trainer(progress)
+        progress(0.95, 'Validating')
+        validate_model(name, model)
+        entry = model_registry.save(name, model, model_class.MODEL_VERSION, metrics)
+        previous_revision = slot.revision
+        slot.publish(model, entry['revision'])
+        inference_cache.invalidate(name)
+    print(f"Published {name} revision {entry['revision']} (was {previous_revision})")
+    return {'model': name, 'revision': entry['revision'], 'previous_revision': previous_revision,
+            'metrics': metrics}
+
+@app.route('/api/models')
+def api_models():
+    """Live revision of each model, rollback availability and inference cache counters"""
+    return jsonify({'success': True, 'models': {
+        name: {'revision': slot.revision, 'can_rollback': slot.previous is not None}
+        for name, (slot, _, _) in MODEL_TRAINERS.items()
+    }, 'inference_cache': inference_cache.stats()})
+
+@app.route('/api/models/<name>/rollback', methods=['POST'])
+def api_rollback_model(name):
+    """Republish the model that was live before the last retrain"""
+    if 'username' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    if name not in MODEL_TRAINERS:
+        return jsonify({'success': False, 'message': f'Unknown model: {name}'}), 404
+
+    slot, model_class, _ = MODEL_TRAINERS[name]
+    with slot.update_lock:
+        if slot.previous is None:
+            return jsonify({'success': False, 'message': 'No previous version to roll back to'}), 409
+        model, old_revision = slot.previous
+        # Saved as a new revision so a restart keeps serving the rolled-back model
+        entry = model_registry.save(name, model, model_class.MODEL_VERSION, {'rolled_back_to': old_revision})
+        slot.publish(model, entry['revision'])
+        inference_cache.invalidate(name)
+    return jsonify({'success': True, 'model': name, 'revision': entry['revision'], 'restored': old_revision})
+
 # --- Run the App ---
 if __name__ == '__main__':
     print("\n=== Initializing Ordinare ===")
-    print("Training ML models...")
-    predictor.train_models()
     print("Models ready!\n")
     app.run(debug=True)
 
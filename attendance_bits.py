@@ -0,0 +1,129 @@
+# attendance_bits.py - Per-subject Attendance as a Bit Array of Class Occurrences
+
+from datetime import date
+
+# Occurrence number = day ordinal * SLOTS_PER_DAY + rank of the time slot that day
+SLOTS_PER_DAY = 1024
+
+
+def popcount(x):
+    """Set bits in a non-negative int (int.bit_count() needs Python 3.10)"""
+    return bin(x).count('1')
+
+
+def slot_ranks(time_slots):
+    """{slot: position in the day} from the user's timeSlots list"""
+    return {slot: rank for rank, slot in enumerate(time_slots or [])}
+
+
+def occurrence(subject_id, key, ranks):
+    """Chronological number of the class a record key ('<subject>-<YYYY-MM-DD>-<slot>') refers to
+
+    Slots missing from ranks sort after the known ones that day. Returns
+    None for keys in any other shape.
+    """
+    prefix = f"{subject_id}-"
+    if not isinstance(key, str) or not key.startswith(prefix) or key[len(prefix) + 10:len(prefix) + 11] != '-':
+        return None
+    try:
+        day = date.fromisoformat(key[len(prefix):len(prefix) + 10])
+    except ValueError:
+        return None
+    rank = ranks.get(key[len(prefix) + 11:], SLOTS_PER_DAY - 1)
+    return day.toordinal() * SLOTS_PER_DAY + min(rank, SLOTS_PER_DAY - 1)
+
+
+class AttendanceBits:
+    """Attendance of one subject: bit i is set if the i-th class held (oldest first) was attended
+
+    Counts, windows over the latest classes and streaks are popcounts and
+    shifts on one integer, so they cost microseconds however long the history.
+    """
+
+    __slots__ = ('bits', 'count', 'last')
+
+    def __init__(self, bits=0, count=0, last=None):
+        self.bits = bits
+        self.count = count
+        self.last = last  # occurrence of the latest class, for in-order appends
+
+    @classmethod
+    def from_records(cls, subject_id, records, time_slots=None):
+        """Build from attendance records in one pass, ordered by date and time slot
+
+        Records already in chronological order (the usual case) are not sorted.
+        Records whose key has no date keep their place after the record before them.
+        """
+        ranks = slot_ranks(time_slots)
+        occurrences = []
+        statuses = []
+        in_order = True
+        last = None
+        for record in records:
+            current = occurrence(subject_id, record.get('key'), ranks)
+            if current is None:
+                current = last
+            elif last is not None and current < last:
+                in_order = False
+            if current is not None:
+                last = current if last is None else max(last, current)
+            occurrences.append(current if current is not None else -1)
+            statuses.append('1' if record.get('status') == 'present' else '0')
+        if not in_order:
+            order = sorted(range(len(statuses)), key=occurrences.__getitem__)
+            statuses = [statuses[i] for i in order]
+        # Newest class is the most significant bit
+        bits = int(''.join(reversed(statuses)), 2) if statuses else 0
+        return cls(bits, len(statuses), last)
+
+    def append(self, present, current=None):
+        """Add the newest class; returns False (and changes nothing) if it predates the latest one"""
+        if current is not None and self.last is not None and current < self.last:
+            return False
+        if present:
+            self.bits |= 1 << self.count
+        self.count += 1
+        if current is not None:
+            self.last = current
+        return True
+
+    @property
+    def attended(self):
+        return popcount(self.bits)
+
+    @property
+    def absent(self):
+        return self.count - self.attended
+
+    def percentage(self):
+        return self.attended / self.count * 100 if self.count else 0.0
+
+    def window(self, n):
+        """(attended, held) over the latest n classes"""
+        held = min(n, self.count)
+        return popcount(self.bits >> (self.count - held)), held
+
+    def window_percentage(self, n):
+        attended, held = self.window(n)
+        return attended / held * 100 if held else 0.0
+
+    def absences_in_last(self, n):
+        attended, held = self.window(n)
+        return held - attended
+
+    def streak(self):
+        """Classes attended in a row up to the latest one"""
+        missed = ~self.bits & ((1 << self.count) - 1)
+        return self.count - missed.bit_length()
+
+    def absence_streak(self):
+        """Classes missed in a row up to the latest one"""
+        return self.count - self.bits.bit_length()
+
+    def to_dict(self):
+        """JSON-safe form (the bit array as hex)"""
+        return {'bits': format(self.bits, 'x'), 'count': self.count, 'last': self.last}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(int(data['bits'], 16), data['count'], data.get('last'))
@@ -0,0 +1,175 @@
+# attendance_import.py - Streaming Attendance File Import
+
+import os
+import time
+
+import pandas as pd
+
+REQUIRED_COLUMNS = ['Date', 'Subject', 'Time Slot', 'Status']
+VALID_STATUSES = ('present', 'absent')
+
+# Rejected rows reported back in full; the rest are only counted
+MAX_REJECTED_SAMPLES = 20
+
+
+def _file_size(file):
+    """Size of a seekable file object, or None"""
+    try:
+        position = file.tell()
+        size = file.seek(0, os.SEEK_END)
+        file.seek(position)
+    except (AttributeError, OSError):
+        return None
+    return size or None
+
+
+def read_attendance_chunks(file, filename, chunk_size=5000):
+    """Yield the uploaded sheet as (DataFrame of at most chunk_size rows, fraction read)
+
+    CSV is read with pandas' chunked reader and .xlsx with openpyxl's
+    read-only streaming mode; legacy .xls falls back to pd.read_excel.
+    The fraction comes from bytes consumed (CSV) or rows over the sheet's
+    row count, and is None when the size is unknown.
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+
+    if extension == '.csv':
+        size = _file_size(file)
+        for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str, skipinitialspace=True):
+            # The parser reads ahead in blocks, so this runs slightly ahead of the rows
+            yield chunk, min(file.tell() / size, 1.0) if size else None
+        return
+
+    if extension in ('.xlsx', '.xlsm'):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            # From the sheet's stored dimensions, which some writers leave out
+            total = sheet.max_row - 1 if sheet.max_row and sheet.max_row > 1 else None
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(name).strip() if name is not None else '' for name in header]
+            buffer = []
+            read = 0
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= chunk_size:
+                    read += len(buffer)
+                    yield pd.DataFrame(buffer, columns=columns), min(read / total, 1.0) if total else None
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=columns), 1.0
+        finally:
+            workbook.close()
+        return
+
+    df = pd.read_excel(file)
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size], min(start + chunk_size, len(df)) / len(df)
+
+
+def normalize_chunk(df, subject_name_to_id, first_row_number):
+    """Validate and normalize a chunk column-wise
+
+    Returns (records, rejected) where records is a DataFrame with subject_id,
+    key and status columns and rejected is a list of (row_number, reason).
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    # Row numbers as seen in the spreadsheet (header is row 1)
+    row_numbers = pd.RangeIndex(first_row_number, first_row_number + len(df))
+    df = df.reset_index(drop=True)
+
+    subject_names = df['Subject'].astype('string').str.strip().str.lower()
+    dates = pd.to_datetime(df['Date'], errors='coerce', format='mixed')
+    time_slots = df['Time Slot'].astype('string').str.strip()
+    statuses = df['Status'].astype('string').str.strip().str.lower()
+    subject_ids = subject_names.map(subject_name_to_id)
+
+    reasons = pd.Series(pd.NA, index=df.index, dtype='object')
+    checks = [
+        (subject_names.isna() | (subject_names == ''), 'missing subject'),
+        (dates.isna(), 'invalid date'),
+        (time_slots.isna() | (time_slots == ''), 'missing time slot'),
+        (~statuses.isin(VALID_STATUSES).fillna(False), 'status must be present or absent'),
+        (subject_ids.isna(), 'unknown subject'),
+    ]
+    # Report the first failing check for each row
+    for failed, reason in reversed(checks):
+        reasons[failed.fillna(True).astype(bool)] = reason
+
+    valid = reasons.isna()
+    rejected = list(zip(row_numbers[~valid.values], reasons[~valid]))
+
+    subject_ids = subject_ids[valid].astype(str)
+    records = pd.DataFrame({
+        'subject_id': subject_ids,
+        'key': subject_ids + '-' + dates[valid].dt.strftime('%Y-%m-%d') + '-' + time_slots[valid].astype(str),
+        'status': statuses[valid].astype(str)
+    })
+    return records, rejected
+
+
+def import_attendance(store, username, file, filename, chunk_size=5000, progress=None):
+    """Stream an attendance file into a user's records, one batched store write per chunk
+
+    Only one chunk is held in memory at a time. Returns a report dict with
+    counts, rows/second and rejected-row diagnostics. progress(fraction,
+    message) is called after each chunk, if given.
+    """
+    start = time.perf_counter()
+
+    user_data = store.load(username)
+    if user_data is None:
+        raise KeyError(username)
+    subjects = user_data.get('app_data', {}).get('subjects', [])
+    subject_name_to_id = {subj['name'].strip().lower(): str(subj['id']) for subj in subjects}
+
+    rows_read = 0
+    rejected_count = 0
+    rejected_samples = []
+    rejected_by_reason = {}
+    records_added = 0
+    duplicates = 0
+
+    for chunk, fraction in read_attendance_chunks(file, filename, chunk_size):
+        records, rejected = normalize_chunk(chunk, subject_name_to_id, first_row_number=rows_read + 2)
+        rows_read += len(chunk)
+
+        if len(records):
+            unique = records.drop_duplicates('key')
+            records_by_subject = {
+                subject_id: group[['key', 'status']].to_dict('records')
+                for subject_id, group in unique.groupby('subject_id', sort=False)
+            }
+            # The store skips keys that are already recorded, including ones from earlier chunks
+            added = store.add_attendance(username, records_by_subject)
+            records_added += added
+            duplicates += len(records) - added
+
+        rejected_count += len(rejected)
+        for row_number, reason in rejected:
+            rejected_by_reason[reason] = rejected_by_reason.get(reason, 0) + 1
+            if len(rejected_samples) < MAX_REJECTED_SAMPLES:
+                rejected_samples.append({'row': int(row_number), 'reason': reason})
+        if progress:
+            progress(0.05 + 0.9 * fraction if fraction is not None else 0.5,
+                     f"Imported {rows_read} rows ({records_added} new records)")
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows_read': rows_read,
+        'records_added': records_added,
+        'duplicates': duplicates,
+        'rejected': rejected_count,
+        'rejected_by_reason': rejected_by_reason,
+        'rejected_rows': rejected_samples,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(rows_read / elapsed, 1) if elapsed > 0 else None
+    }
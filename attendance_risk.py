@@ -4,48 +4,49 @@ import numpy as np
 from sklearn.linear_model import LogisticRegression
 from datetime import datetime, timedelta
 
+import synthetic_data
+from attendance_bits import AttendanceBits
+from aggregates import RECENT_WINDOW
+
 class AttendanceRiskPredictor:
-    def __init__(self):
+    # Bump when the training recipe or feature layout changes
+    MODEL_VERSION = 1
+
+    def __init__(self, data=None, n_jobs=None, train=True):
         self.model = LogisticRegression(random_state=42)
         self.threshold = 75  # Default attendance threshold
-        self.train_model()
+        self.cv_metrics = self.train_model(data, n_jobs) if train else {}
     
-    def train_model(self):
-        """Train model with synthetic data"""
-        np.random.seed(42)
-        X = []
-        y = []
-        
-        # Generate more diverse training data
-        for _ in range(2000):
-            current_att = np.random.beta(7, 2) * 100
-            trend = np.random.normal(0, 3)
-            days_left = np.random.randint(5, 90)
-            recent_absences = np.random.poisson(2)
-            
-            projected = current_att + (trend * (days_left / 30))
-            risk_score = 0
-            
-            if projected < 70:
-                risk_score = 1
-            elif projected < 75 and trend < -1:
-                risk_score = 1
-            elif current_att < 75 and recent_absences > 3:
-                risk_score = 1
-            
-            X.append([current_att, trend, days_left, recent_absences])
-            y.append(risk_score)
-        
+    def train_model(self, data=None, n_jobs=None):
+        """Train model with synthetic data, or on data=(X, y) if given
+
+        n_jobs runs the CV folds in parallel. Returns the CV metrics.
+        """
+        if data is None:
+            df = synthetic_data.generate('attendance_risk', 2000, seed=42)
+            columns = synthetic_data.DATASET_COLUMNS['attendance_risk']
+            data = (df[columns[:-1]].values, df[columns[-1]].values)
+        return self._fit(*data, n_jobs=n_jobs)
+    
+    def _fit(self, X, y, n_jobs=None):
         self.model = LogisticRegression(random_state=42, max_iter=1000, C=1.0, solver='lbfgs')
         self.model.fit(X, y)
         
         from sklearn.model_selection import cross_val_score
-        scores = cross_val_score(self.model, X, y, cv=5)
+        scores = cross_val_score(self.model, X, y, cv=5, n_jobs=n_jobs)
         print(f"Attendance Risk Model - CV Accuracy: {scores.mean():.4f} (+/- {scores.std():.4f})")
+        return {'cv_accuracy': float(scores.mean())}
     
-    def analyze_risk(self, subjects_data, attendance_data):
-        """Analyze attendance risk for all subjects"""
-        results = []
+    def extract_features(self, subjects_data, attendance_data):
+        """Build the model feature rows for every subject that has classes
+
+        Returns (subjects, data, features): the matching subject dicts, their
+        attendance entries and a (n_subjects, 4) feature list.
+        """
+        subjects, entries, features = [], [], []
+        
+        # Estimate days left in semester (assume 90 days)
+        days_left = 60
         
         for subject in subjects_data:
             subject_id = str(subject['id'])
@@ -56,62 +57,103 @@ class AttendanceRiskPredictor:
             
             current_percentage = (data['attended'] / data['total']) * 100
             
-            # Calculate trend from recent records
-            recent_records = data.get('records', [])[-10:]
-            if len(recent_records) >= 3:
-                recent_attended = sum(1 for r in recent_records if r['status'] == 'present')
-                trend = (recent_attended / len(recent_records) * 100) - current_percentage
+            # Calculate trend from the latest classes (bit array precomputed in aggregates as 'bits')
+            if 'bits' in data:
+                bits = AttendanceBits.from_dict(data['bits'])
+            else:
+                bits = AttendanceBits.from_records(subject_id, data.get('records', []))
+            recent_attended, recent_held = bits.window(RECENT_WINDOW)
+            if recent_held >= 3:
+                trend = (recent_attended / recent_held * 100) - current_percentage
             else:
                 trend = 0
             
-            # Estimate days left in semester (assume 90 days)
-            days_left = 60
-            
             # Count recent absences
-            recent_absences = sum(1 for r in recent_records if r['status'] == 'absent')
-            
-            # Predict risk
-            features = [[current_percentage, trend, days_left, recent_absences]]
-            risk_prob = self.model.predict_proba(features)[0][1]
-            
-            # Calculate projections
-            projected_percentage = self.calculate_projection(
-                current_percentage, data['total'], trend, days_left
-            )
-            
-            # Determine risk level
-            if current_percentage < 70:
-                risk_level = 'High'
-                color = 'danger'
-            elif current_percentage < 75:
-                risk_level = 'Medium'
-                color = 'warning'
-            elif risk_prob > 0.3:
-                risk_level = 'Medium'
-                color = 'warning'
-            else:
-                risk_level = 'Low'
-                color = 'success'
-            
-            # Generate recommendations
-            recommendations = self.generate_recommendations(
-                current_percentage, projected_percentage, data['total'], trend
-            )
+            recent_absences = recent_held - recent_attended
             
-            results.append({
-                'subject_name': subject['name'],
-                'current_percentage': round(current_percentage, 1),
-                'projected_percentage': round(projected_percentage, 1),
-                'risk_level': risk_level,
-                'risk_probability': round(risk_prob * 100, 1),
-                'color': color,
-                'trend': round(trend, 1),
-                'total_classes': data['total'],
-                'attended': data['attended'],
-                'recommendations': recommendations
-            })
+            subjects.append(subject)
+            entries.append(data)
+            features.append([current_percentage, trend, days_left, recent_absences])
+        
+        return subjects, entries, features
+    
+    def score_rows(self, X):
+        """Risk probability for each feature row"""
+        return self.model.predict_proba(X)[:, 1]
+    
+    def analyze_risk(self, subjects_data, attendance_data, score_rows=None):
+        """Analyze attendance risk for all subjects"""
+        return self.analyze_risk_batch([(subjects_data, attendance_data)], score_rows)[0]
+    
+    def analyze_risk_batch(self, users, score_rows=None):
+        """Analyze risk for many users' subjects with a single predict_proba call
+        
+        users is a list of (subjects_data, attendance_data) pairs; returns one
+        sorted result list per user, in the same order. score_rows replaces
+        self.score_rows, e.g. with a cached version.
+        """
+        extracted = [self.extract_features(subjects, attendance) for subjects, attendance in users]
+        rows = [row for _, _, features in extracted for row in features]
+        if not rows:
+            return [[] for _ in users]
+        
+        risk_probs = (score_rows or self.score_rows)(np.array(rows, dtype=float))
+        
+        all_results = []
+        offset = 0
+        for subjects, entries, features in extracted:
+            results = [
+                self._build_result(subject, data, row, risk_prob)
+                for subject, data, row, risk_prob in zip(
+                    subjects, entries, features, risk_probs[offset:offset + len(features)]
+                )
+            ]
+            offset += len(features)
+            all_results.append(sorted(results, key=lambda x: x['risk_probability'], reverse=True))
+        
+        return all_results
+    
+    def _build_result(self, subject, data, features, risk_prob):
+        """Turn one scored feature row into the API result dict"""
+        current_percentage, trend, days_left, _ = features
+        risk_prob = float(risk_prob)
         
-        return sorted(results, key=lambda x: x['risk_probability'], reverse=True)
+        # Calculate projections
+        projected_percentage = self.calculate_projection(
+            current_percentage, data['total'], trend, days_left
+        )
+        
+        # Determine risk level
+        if current_percentage < 70:
+            risk_level = 'High'
+            color = 'danger'
+        elif current_percentage < 75:
+            risk_level = 'Medium'
+            color = 'warning'
+        elif risk_prob > 0.3:
+            risk_level = 'Medium'
+            color = 'warning'
+        else:
+            risk_level = 'Low'
+            color = 'success'
+        
+        # Generate recommendations
+        recommendations = self.generate_recommendations(
+            current_percentage, projected_percentage, data['total'], trend
+        )
+        
+        return {
+            'subject_name': subject['name'],
+            'current_percentage': round(current_percentage, 1),
+            'projected_percentage': round(projected_percentage, 1),
+            'risk_level': risk_level,
+            'risk_probability': round(risk_prob * 100, 1),
+            'color': color,
+            'trend': round(trend, 1),
+            'total_classes': data['total'],
+            'attended': data['attended'],
+            'recommendations': recommendations
+        }
     
     def calculate_projection(self, current_pct, total_classes, trend, days_left):
         """Project future attendance percentage"""
@@ -176,32 +218,63 @@ class AttendanceRiskPredictor:
         return recommendations
     
     def calculate_classes_needed(self, current_pct, total_classes, target_pct):
-        """Calculate classes needed to reach target"""
-        current_attended = (current_pct / 100) * total_classes
-        classes_needed = 0
+        """Calculate classes needed to reach target (capped at 100)
         
-        while classes_needed < 100:
-            new_total = total_classes + classes_needed
-            new_attended = current_attended + classes_needed
-            new_pct = (new_attended / new_total) * 100
-            
-            if new_pct >= target_pct:
-                return classes_needed
-            classes_needed += 1
+        Smallest n with (attended + n) / (total + n) >= target, solved in
+        closed form. Accepts scalars or NumPy arrays.
+        """
+        current_attended = (np.asarray(current_pct, dtype=float) / 100) * total_classes
+        total = np.asarray(total_classes, dtype=float)
         
-        return classes_needed
+        def reached(n):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return ((current_attended + n) / (total + n)) * 100 >= target_pct
+        
+        if target_pct >= 100:
+            guess = np.where(reached(0), 0, 100)
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                guess = np.ceil((target_pct * total - 100 * current_attended) / (100 - target_pct))
+        
+        return self._first_true(reached, guess, 100)
     
     def calculate_safe_bunks(self, current_pct, total_classes, target_pct):
-        """Calculate safe bunks without falling below target"""
-        current_attended = (current_pct / 100) * total_classes
-        bunks = 0
+        """Calculate safe bunks without falling below target (capped at 50)
         
-        while bunks < 50:
-            new_total = total_classes + bunks + 1
-            new_pct = (current_attended / new_total) * 100
-            
-            if new_pct < target_pct:
-                return bunks
-            bunks += 1
+        Smallest b with attended / (total + b + 1) < target, solved in
+        closed form. Accepts scalars or NumPy arrays.
+        """
+        current_attended = (np.asarray(current_pct, dtype=float) / 100) * total_classes
+        total = np.asarray(total_classes, dtype=float)
+        
+        def below(b):
+            return (current_attended / (total + b + 1)) * 100 < target_pct
+        
+        if target_pct <= 0:
+            guess = np.full(np.shape(total), 50)
+        else:
+            guess = np.floor(100 * current_attended / target_pct - total - 1) + 1
+        
+        return self._first_true(below, guess, 50)
+    
+    @staticmethod
+    def _first_true(predicate, guess, cap):
+        """Smallest n in [0, cap] where a monotone predicate holds, else cap
+        
+        Starts from the closed-form guess and nudges it by whole steps so the
+        answer matches stepping through n = 0, 1, 2, ... one class at a time.
+        """
+        n = np.clip(np.nan_to_num(np.asarray(guess, dtype=float), nan=cap), 0, cap)
+        while True:
+            step_down = (n > 0) & predicate(n - 1)
+            if not np.any(step_down):
+                break
+            n = np.where(step_down, n - 1, n)
+        while True:
+            step_up = (n < cap) & ~predicate(n)
+            if not np.any(step_up):
+                break
+            n = np.where(step_up, n + 1, n)
         
-        return bunks
+        n = n.astype(int)
+        return int(n) if n.ndim == 0 else n
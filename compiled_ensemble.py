@@ -0,0 +1,108 @@
+# compiled_ensemble.py - Pure-NumPy Scorer for the Grade Ensemble
+
+import numpy as np
+
+
+class FlatForest:
+    """Decision trees flattened into contiguous node arrays
+
+    All trees are walked together, one level per step, so a prediction costs
+    max_depth vectorized steps instead of one sklearn call per tree.
+    """
+
+    def __init__(self, trees):
+        offsets, features, thresholds, lefts, rights, values = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            t = tree.tree_
+            left = t.children_left.astype(np.intp)
+            right = t.children_right.astype(np.intp)
+            leaf = left == -1
+            own = np.arange(t.node_count, dtype=np.intp)
+
+            # Leaves point back to themselves, so extra steps are no-ops
+            lefts.append(np.where(leaf, own, left) + offset)
+            rights.append(np.where(leaf, own, right) + offset)
+            features.append(np.where(leaf, 0, t.feature).astype(np.intp))
+            thresholds.append(np.where(leaf, np.inf, t.threshold))
+            values.append(t.value[:, 0, 0].astype(np.float64))
+            offsets.append(offset)
+            offset += t.node_count
+
+        self.roots = np.array(offsets, dtype=np.intp)
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        # children[2 * node] is the left child, children[2 * node + 1] the right
+        self.children = np.column_stack([np.concatenate(lefts), np.concatenate(rights)]).ravel()
+        self.value = np.concatenate(values)
+        self.depth = max(tree.tree_.max_depth for tree in trees)
+
+    def leaf_values(self, X):
+        """(n_trees, n_rows) array of each tree's prediction for each row"""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        columns = X.T.ravel()
+        rows = np.tile(np.arange(n_rows), len(self.roots))
+        nodes = np.repeat(self.roots, n_rows)
+        for _ in range(self.depth):
+            x = columns[self.feature[nodes] * n_rows + rows]
+            nodes = self.children[2 * nodes + (x > self.threshold[nodes])]
+        return self.value[nodes].reshape(len(self.roots), n_rows)
+
+
+class CompiledGradeEnsemble:
+    """Scaler, Random Forest, Gradient Boosting and Ridge folded into NumPy arrays
+
+    Produces the same floating-point results as the fitted sklearn models,
+    summing tree outputs in the same order they do.
+    """
+
+    def __init__(self, scaler, rf_model, gb_model, ridge_model):
+        if getattr(gb_model, 'loss', 'squared_error') != 'squared_error':
+            raise ValueError('Only squared-error gradient boosting can be compiled')
+
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+        self.rf = FlatForest(rf_model.estimators_)
+        self.rf_count = len(rf_model.estimators_)
+
+        self.gb = FlatForest(gb_model.estimators_[:, 0])
+        self.gb_learning_rate = float(gb_model.learning_rate)
+        if gb_model.init_ == 'zero':
+            self.gb_init = 0.0
+        else:
+            self.gb_init = float(gb_model.init_.predict(np.zeros((1, len(self.mean))))[0])
+
+        self.ridge_coef = np.asarray(ridge_model.coef_, dtype=np.float64)
+        self.ridge_intercept = float(ridge_model.intercept_)
+
+    def transform(self, X):
+        """StandardScaler.transform"""
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    def predict_scaled(self, X_scaled):
+        """(rf, gb, ridge) prediction arrays for already-scaled rows"""
+        n = X_scaled.shape[0]
+
+        # cumsum adds strictly in order, matching sklearn's per-tree accumulation
+        rf_values = self.rf.leaf_values(X_scaled)
+        rf_pred = np.cumsum(np.vstack([np.zeros(n), rf_values]), axis=0)[-1] / self.rf_count
+
+        gb_steps = self.gb_learning_rate * self.gb.leaf_values(X_scaled)
+        gb_pred = np.cumsum(np.vstack([np.full(n, self.gb_init), gb_steps]), axis=0)[-1]
+
+        ridge_pred = X_scaled @ self.ridge_coef + self.ridge_intercept
+        return rf_pred, gb_pred, ridge_pred
+
+    def predict(self, X):
+        """(rf, gb, ridge) prediction arrays for raw feature rows"""
+        return self.predict_scaled(self.transform(X))
+
+    def matches(self, X, scaler, rf_model, gb_model, ridge_model):
+        """True if this scorer reproduces the sklearn models exactly on X"""
+        X_scaled = scaler.transform(X)
+        expected = (rf_model.predict(X_scaled), gb_model.predict(X_scaled), ridge_model.predict(X_scaled))
+        actual = self.predict(X)
+        return all(np.array_equal(a, e) for a, e in zip(actual, expected))
@@ -1,12 +1,12 @@
 # google_oauth.py - Google OAuth Integration
 
-import os
-import json
 from google.oauth2 import id_token
 from google.auth.transport import requests
 from werkzeug.security import generate_password_hash
 import secrets
 
+from storage import default_app_data
+
 class GoogleOAuth:
     def __init__(self, client_id):
         self.client_id = client_id
@@ -37,21 +37,14 @@ class GoogleOAuth:
                 'error': str(e)
             }
     
-    def create_user_from_google(self, user_info, data_dir='user_data'):
+    def create_user_from_google(self, user_info, store):
         """Create user account from Google OAuth data"""
         email = user_info['email']
         google_id = user_info['google_id']
         name = user_info['name']
         
         # Generate username from email
-        username = email.split('@')[0]
-        base_username = username
-        counter = 1
-        
-        # Check if username exists, add number if needed
-        while os.path.exists(os.path.join(data_dir, f"{username}.json")):
-            username = f"{base_username}{counter}"
-            counter += 1
+        base_username = email.split('@')[0]
         
         # Create user data
         user_data = {
@@ -64,40 +57,18 @@ class GoogleOAuth:
             'oauth_provider': 'google',
             'premium': False,
             'premium_expiry': None,
-            'app_data': {
-                'subjects': [],
-                'timetable': {},
-                'attendanceData': {},
-                'timeSlots': ['9:00 AM-10:00 AM', '10:00 AM-11:00 AM', '11:00 AM-12:00 PM', 
-                             '12:00 PM-1:00 PM', '1:00 PM-2:00 PM', '2:00 PM-3:00 PM', 
-                             '3:00 PM-4:00 PM', '4:00 PM-5:00 PM'],
-                'studentName': name,
-                'universityRollNo': '',
-                'studySessions': [],
-                'studyGoals': {'daily': 2, 'weekly': 14}
-            }
+            'app_data': default_app_data(student_name=name)
         }
         
-        # Save user file
-        user_file = os.path.join(data_dir, f"{username}.json")
-        with open(user_file, 'w') as f:
-            json.dump(user_data, f, indent=4)
+        # Take the first free username, adding a number if needed
+        username = base_username
+        counter = 1
+        while not store.create(username, user_data):
+            username = f"{base_username}{counter}"
+            counter += 1
         
         return username
     
-    def find_user_by_google_id(self, google_id, data_dir='user_data'):
+    def find_user_by_google_id(self, google_id, store):
         """Find existing user by Google ID"""
-        if not os.path.exists(data_dir):
-            return None
-        
-        for filename in os.listdir(data_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(data_dir, filename)
-                try:
-                    with open(filepath, 'r') as f:
-                        user_data = json.load(f)
-                        if user_data.get('google_id') == google_id:
-                            return filename.replace('.json', '')
-                except:
-                    continue
-        return None
+        return store.find_by_google_id(google_id)
@@ -7,24 +7,108 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import cross_val_score
 from datetime import datetime
 
-class GradePredictor:
-    def __init__(self):
-        """Initialize the Grade Predictor with ensemble models"""
-        self.rf_model = RandomForestRegressor(
-            n_estimators=200,
-            max_depth=10,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=42
-        )
-        self.gb_model = GradientBoostingRegressor(
-            n_estimators=150,
-            learning_rate=0.1,
-            max_depth=5,
-            random_state=42
+from compiled_ensemble import CompiledGradeEnsemble
+
+# Feature order of every model input row (also the API field names)
+GRADE_FEATURES = ['attendance', 'study_hours', 'midterm', 'assignment', 'quiz']
+
+# Above this many rows sklearn's own Cython predict is faster
+COMPILED_MAX_ROWS = 1024
+
+# Target grades to analyze: A, B, C, D
+IMPROVEMENT_TARGETS = np.array([90, 80, 70, 60])
+IMPROVEMENT_LETTERS = ['A', 'B', 'C', 'D']
+
+# (area, feature column, suggested only below, ceiling, grade points per unit, minimum increase)
+IMPROVEMENT_AREAS = [
+    ('attendance', 0, 95, 100, 0.15, 0),
+    ('study_hours', 1, 25, 25, 0.10 * (100/35), 1),
+    ('assignments', 3, 95, 100, 0.25, 0),
+]
+
+
+class ImprovementTable:
+    """Improvement suggestions for many predictions, kept as (rows, targets, areas) arrays
+
+    Nothing is rounded or turned into dicts until row() or to_columns() is called.
+    """
+
+    def __init__(self, X, current_preds):
+        columns = [column for _, column, _, _, _, _ in IMPROVEMENT_AREAS]
+        below = np.array([limit for _, _, limit, _, _, _ in IMPROVEMENT_AREAS])
+        ceiling = np.array([cap for _, _, _, cap, _, _ in IMPROVEMENT_AREAS])
+        weight = np.array([w for _, _, _, _, w, _ in IMPROVEMENT_AREAS])
+        min_increase = np.array([m for _, _, _, _, _, m in IMPROVEMENT_AREAS])
+
+        self.current = np.asarray(X, dtype=np.float64)[:, columns]           # (n, areas)
+        self.gap = IMPROVEMENT_TARGETS[None, :] - current_preds[:, None]    # (n, targets)
+        self.active = self.gap > 0
+
+        increase = np.minimum(
+            (ceiling - self.current)[:, None, :],
+            self.gap[:, :, None] / weight
+        )                                                                   # (n, targets, areas)
+        self.needed = self.current[:, None, :] + increase
+        self.impact = increase * weight
+        self.suggested = (
+            self.active[:, :, None]
+            & (self.current < below)[:, None, :]
+            & (increase > min_increase)
         )
+
+    def row(self, i):
+        """Per-target suggestion dicts for one prediction (predict_grade format)"""
+        improvements = {}
+        for t, target in enumerate(IMPROVEMENT_TARGETS):
+            if not self.active[i, t]:
+                continue
+            suggestions = [
+                {
+                    'area': area,
+                    'current': round(float(self.current[i, a]), 1),
+                    'needed': round(float(self.needed[i, t, a]), 1),
+                    'impact': round(float(self.impact[i, t, a]), 2)
+                }
+                for a, (area, _, _, _, _, _) in enumerate(IMPROVEMENT_AREAS)
+                if self.suggested[i, t, a]
+            ]
+            improvements[f'target_{IMPROVEMENT_LETTERS[t]}'] = {
+                'target_score': int(target),
+                'points_needed': round(float(self.gap[i, t]), 2),
+                'suggestions': suggestions[:3]
+            }
+        return improvements
+
+    def to_columns(self):
+        """Compact form for batches: nested [row][target][area] lists, null where not applicable"""
+        return {
+            'targets': IMPROVEMENT_TARGETS.tolist(),
+            'areas': [area for area, _, _, _, _, _ in IMPROVEMENT_AREAS],
+            'current': np.round(self.current, 1).tolist(),
+            'points_needed': np.where(self.active, np.round(self.gap, 2), None).tolist(),
+            'needed': np.where(self.suggested, np.round(self.needed, 1), None).tolist(),
+            'impact': np.where(self.suggested, np.round(self.impact, 2), None).tolist()
+        }
+
+class GradePredictor:
+    # Bump when the training recipe or feature layout changes
+    MODEL_VERSION = 2
+
+    # Default hyperparameters (`python train_models.py tune` can override them)
+    RF_PARAMS = {'n_estimators': 200, 'max_depth': 10, 'min_samples_split': 5, 'min_samples_leaf': 2}
+    GB_PARAMS = {'n_estimators': 150, 'learning_rate': 0.1, 'max_depth': 5}
+
+    def __init__(self, params=None):
+        """Initialize the Grade Predictor with ensemble models
+
+        params optionally overrides hyperparameters: {'rf': {...}, 'gb': {...}}.
+        """
+        params = params or {}
+        self.rf_model = RandomForestRegressor(**{**self.RF_PARAMS, **params.get('rf', {})}, random_state=42)
+        self.gb_model = GradientBoostingRegressor(**{**self.GB_PARAMS, **params.get('gb', {})}, random_state=42)
         self.ridge_model = Ridge(alpha=1.0)
         self.scaler = StandardScaler()
+        self.compiled = None
         self.is_trained = False
         
         # Feature importance weights
@@ -81,31 +165,45 @@ class GradePredictor:
         
         return X, final_grades
     
-    def train_models(self):
-        """Train all models on synthetic data"""
-        print("Generating training data...")
-        X, y = self.generate_synthetic_training_data(n_samples=2000)
+    def train_models(self, progress=None, data=None, n_jobs=None):
+        """Train all models on synthetic data, or on data=(X, y) if given
+
+        progress(fraction, message) is called as each stage starts, if given.
+        n_jobs parallelizes the Random Forest fit and the CV folds.
+        """
+        progress = progress or (lambda fraction, message=None: None)
+        if data is None:
+            print("Generating training data...")
+            X, y = self.generate_synthetic_training_data(n_samples=2000)
+        else:
+            X, y = data
         
         print("Training models...")
+        progress(0.1, 'Training Random Forest')
         # Scale features
         X_scaled = self.scaler.fit_transform(X)
         
-        # Train Random Forest
+        # Train Random Forest (n_jobs is reset so predictions stay single-threaded)
+        self.rf_model.set_params(n_jobs=n_jobs)
         self.rf_model.fit(X_scaled, y)
-        rf_score = cross_val_score(self.rf_model, X_scaled, y, cv=5).mean()
+        self.rf_model.set_params(n_jobs=None)
+        rf_score = cross_val_score(self.rf_model, X_scaled, y, cv=5, n_jobs=n_jobs).mean()
         print(f"Random Forest CV Score: {rf_score:.4f}")
+        progress(0.4, 'Training Gradient Boosting')
         
         # Train Gradient Boosting
         self.gb_model.fit(X_scaled, y)
-        gb_score = cross_val_score(self.gb_model, X_scaled, y, cv=5).mean()
+        gb_score = cross_val_score(self.gb_model, X_scaled, y, cv=5, n_jobs=n_jobs).mean()
         print(f"Gradient Boosting CV Score: {gb_score:.4f}")
+        progress(0.8, 'Training Ridge Regression')
         
         # Train Ridge Regression
         self.ridge_model.fit(X_scaled, y)
-        ridge_score = cross_val_score(self.ridge_model, X_scaled, y, cv=5).mean()
+        ridge_score = cross_val_score(self.ridge_model, X_scaled, y, cv=5, n_jobs=n_jobs).mean()
         print(f"Ridge Regression CV Score: {ridge_score:.4f}")
         
         self.is_trained = True
+        self.compile(X)
         print("All models trained successfully!")
         
         return {
@@ -114,8 +212,40 @@ class GradePredictor:
             'ridge_score': ridge_score
         }
     
+    def compile(self, X_check):
+        """Build the pure-NumPy scorer, keeping it only if it matches sklearn exactly on X_check"""
+        compiled = CompiledGradeEnsemble(self.scaler, self.rf_model, self.gb_model, self.ridge_model)
+        if compiled.matches(X_check, self.scaler, self.rf_model, self.gb_model, self.ridge_model):
+            self.compiled = compiled
+        else:
+            print("Compiled ensemble does not match sklearn; using sklearn predict")
+            self.compiled = None
+
+    def predict_models(self, X):
+        """Random Forest, Gradient Boosting and Ridge predictions for raw feature rows"""
+        X = np.asarray(X, dtype=np.float64)
+        compiled = getattr(self, 'compiled', None)
+        if compiled is not None and len(X) <= COMPILED_MAX_ROWS and np.isfinite(X).all():
+            return compiled.predict(X)
+
+        X_scaled = self.scaler.transform(X)
+        return (
+            self.rf_model.predict(X_scaled),
+            self.gb_model.predict(X_scaled),
+            self.ridge_model.predict(X_scaled)
+        )
+
+    def score_rows(self, X):
+        """(n, 3) array of Random Forest, Gradient Boosting and Ridge predictions"""
+        return np.column_stack(self.predict_models(X))
+
+    def predict_scores(self, X):
+        """Clipped ensemble score for each raw feature row"""
+        rf_preds, gb_preds, ridge_preds = self.predict_models(X)
+        return np.clip(rf_preds * 0.4 + gb_preds * 0.4 + ridge_preds * 0.2, 0, 100)
+
     def predict_grade(self, attendance_pct, study_hours_per_week, 
-                     midterm_score, assignment_score, quiz_score):
+                     midterm_score, assignment_score, quiz_score, score_rows=None):
         """
         Predict final grade using ensemble of models
         
@@ -125,6 +255,7 @@ class GradePredictor:
         - midterm_score: Midterm exam score (0-100)
         - assignment_score: Average assignment score (0-100)
         - quiz_score: Average quiz score (0-100)
+        - score_rows: Optional replacement for self.score_rows (e.g. cached)
         
         Returns:
         - Dictionary with prediction, confidence, and recommendations
@@ -141,12 +272,8 @@ class GradePredictor:
             quiz_score
         ]])
         
-        X_scaled = self.scaler.transform(X)
-        
         # Get predictions from all models
-        rf_pred = self.rf_model.predict(X_scaled)[0]
-        gb_pred = self.gb_model.predict(X_scaled)[0]
-        ridge_pred = self.ridge_model.predict(X_scaled)[0]
+        rf_pred, gb_pred, ridge_pred = (score_rows or self.score_rows)(X)[0]
         
         # Ensemble prediction (weighted average)
         ensemble_pred = (rf_pred * 0.4 + gb_pred * 0.4 + ridge_pred * 0.2)
@@ -179,6 +306,97 @@ class GradePredictor:
             'timestamp': datetime.now().isoformat()
         }
     
+    def predict_batch(self, X, include_improvements=False):
+        """
+        Predict final grades for many students in one vectorized pass
+        
+        X is an (n, 5) array-like with the same feature order as predict_grade.
+        Returns parallel lists: predicted_score, grade_letter, confidence and
+        model_predictions (one list per model), plus the improvement analysis in
+        ImprovementTable.to_columns() form if include_improvements is set.
+        """
+        if not self.is_trained:
+            self.train_models()
+        
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(GRADE_FEATURES))
+        rf_preds, gb_preds, ridge_preds = self.predict_models(X)
+        
+        ensemble_preds = np.clip(rf_preds * 0.4 + gb_preds * 0.4 + ridge_preds * 0.2, 0, 100)
+        std_devs = np.std(np.vstack([rf_preds, gb_preds, ridge_preds]), axis=0)
+        confidences = np.clip(100 - (std_devs * 5), 0, 100)
+        
+        grade_letters = np.select(
+            [ensemble_preds >= 90, ensemble_preds >= 80, ensemble_preds >= 70, ensemble_preds >= 60],
+            ['A', 'B', 'C', 'D'], default='F'
+        )
+        
+        result = {
+            'predicted_score': np.round(ensemble_preds, 2).tolist(),
+            'grade_letter': grade_letters.tolist(),
+            'confidence': np.round(confidences, 2).tolist(),
+            'model_predictions': {
+                'random_forest': np.round(rf_preds, 2).tolist(),
+                'gradient_boosting': np.round(gb_preds, 2).tolist(),
+                'ridge_regression': np.round(ridge_preds, 2).tolist()
+            },
+            'timestamp': datetime.now().isoformat()
+        }
+        if include_improvements:
+            result['improvement_analysis'] = ImprovementTable(X, ensemble_preds).to_columns()
+        return result
+    
+    def sensitivity_grid(self, base, axes, mode='grid'):
+        """
+        What-if sweep around one student's inputs, scored in one batched pass
+        
+        base holds the five feature values; axes is a list of (feature, values)
+        with feature names from GRADE_FEATURES. mode 'grid' scores the Cartesian
+        product of the axes and returns an n-dimensional score matrix (two axes
+        give a heatmap); 'curves' varies one feature at a time with the others
+        held at base, like a partial-dependence plot for this student.
+        """
+        if not self.is_trained:
+            self.train_models()
+        
+        base = np.asarray(base, dtype=np.float64).reshape(len(GRADE_FEATURES))
+        columns = [GRADE_FEATURES.index(feature) for feature, _ in axes]
+        values = [np.asarray(axis_values, dtype=np.float64).ravel() for _, axis_values in axes]
+        
+        if mode == 'grid':
+            mesh = np.meshgrid(*values, indexing='ij')
+            X = np.tile(base, (mesh[0].size, 1))
+            for column, axis_mesh in zip(columns, mesh):
+                X[:, column] = axis_mesh.ravel()
+        elif mode == 'curves':
+            blocks = []
+            for column, axis_values in zip(columns, values):
+                block = np.tile(base, (len(axis_values), 1))
+                block[:, column] = axis_values
+                blocks.append(block)
+            X = np.vstack(blocks)
+        else:
+            raise ValueError(f"Unknown sweep mode: {mode}")
+        
+        # Base row rides along in the same pass
+        scores = self.predict_scores(np.vstack([base, X]))
+        base_score, scores = scores[0], np.round(scores[1:], 2)
+        
+        result = {'mode': mode, 'base_score': round(float(base_score), 2)}
+        if mode == 'grid':
+            result['features'] = [feature for feature, _ in axes]
+            result['values'] = [axis_values.tolist() for axis_values in values]
+            result['predicted_score'] = scores.reshape([len(v) for v in values]).tolist()
+        else:
+            result['curves'] = {}
+            offset = 0
+            for (feature, _), axis_values in zip(axes, values):
+                result['curves'][feature] = {
+                    'values': axis_values.tolist(),
+                    'predicted_score': scores[offset:offset + len(axis_values)].tolist()
+                }
+                offset += len(axis_values)
+        return result
+    
     def _get_grade_letter(self, score):
         """Convert numerical score to letter grade"""
         if score >= 90: return 'A'
@@ -190,59 +408,8 @@ class GradePredictor:
     def _analyze_improvements(self, attendance, study_hours, midterm, 
                              assignment, quiz, current_pred):
         """Analyze what improvements are needed for better grades"""
-        improvements = {}
-        
-        # Target grades to analyze
-        targets = [90, 80, 70, 60]  # A, B, C, D
-        
-        for target in targets:
-            if target > current_pred:
-                # Calculate needed improvements
-                gap = target - current_pred
-                
-                suggestions = []
-                
-                # Attendance improvement
-                if attendance < 95:
-                    att_needed = min(100 - attendance, gap / 0.15)
-                    if att_needed > 0:
-                        suggestions.append({
-                            'area': 'attendance',
-                            'current': round(attendance, 1),
-                            'needed': round(attendance + att_needed, 1),
-                            'impact': round(att_needed * 0.15, 2)
-                        })
-                
-                # Study hours improvement
-                if study_hours < 25:
-                    hours_increase = min(25 - study_hours, gap / (0.10 * (100/35)))
-                    if hours_increase > 1:
-                        suggestions.append({
-                            'area': 'study_hours',
-                            'current': round(study_hours, 1),
-                            'needed': round(study_hours + hours_increase, 1),
-                            'impact': round(hours_increase * (0.10 * (100/35)), 2)
-                        })
-                
-                # Assignments improvement
-                if assignment < 95:
-                    assign_needed = min(100 - assignment, gap / 0.25)
-                    if assign_needed > 0:
-                        suggestions.append({
-                            'area': 'assignments',
-                            'current': round(assignment, 1),
-                            'needed': round(assignment + assign_needed, 1),
-                            'impact': round(assign_needed * 0.25, 2)
-                        })
-                
-                grade_letter = self._get_grade_letter(target)
-                improvements[f'target_{grade_letter}'] = {
-                    'target_score': target,
-                    'points_needed': round(gap, 2),
-                    'suggestions': suggestions[:3]
-                }
-        
-        return improvements
+        X = np.array([[attendance, study_hours, midterm, assignment, quiz]], dtype=np.float64)
+        return ImprovementTable(X, np.array([current_pred], dtype=np.float64)).row(0)
     
     def get_feature_importance(self):
         """Get feature importance from Random Forest model"""
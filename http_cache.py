@@ -0,0 +1,86 @@
+# http_cache.py - ETag Revalidation and Response Compression for the JSON APIs
+
+import gzip
+import json
+import hashlib
+
+from flask import request, Response, make_response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies are sent as they are; compressing them saves next to nothing
+COMPRESS_MIN_BYTES = 1024
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/plain', 'text/css',
+                      'text/javascript', 'application/javascript', 'image/svg+xml')
+
+# A strong ETag names one exact byte sequence, so each content coding gets its own tag
+ENCODING_SUFFIXES = {'br': '-br', 'gzip': '-gz'}
+
+
+def make_etag(*parts):
+    """Strong ETag from the values a response is built from (a revision, inputs, ...)"""
+    payload = json.dumps(parts, separators=(',', ':'), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def matching_etag(etag):
+    """The variant of etag (in any content coding) the request's If-None-Match names, or None"""
+    for suffix in ('', *ENCODING_SUFFIXES.values()):
+        if request.if_none_match.contains(etag + suffix):
+            return etag + suffix
+    return None
+
+
+def conditional_response(etag, build):
+    """304 if the client already has etag, otherwise the response build() returns, tagged with etag
+
+    build is only called when the body is actually needed, and may return
+    anything a view can; only 200 responses are tagged.
+    """
+    matched = matching_etag(etag)
+    if matched:
+        # Echo the tag of the representation the client holds
+        response = Response(status=304)
+        response.set_etag(matched)
+        response.vary.add('Accept-Encoding')
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def compress_response(response):
+    """after_request hook: brotli or gzip text bodies of at least COMPRESS_MIN_BYTES the client accepts"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        coding = 'br'
+    elif accepted['gzip']:
+        coding = 'gzip'
+    else:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    if coding == 'br':
+        response.set_data(brotli.compress(data, quality=5))
+    else:
+        # mtime=0 keeps the output identical for identical input
+        response.set_data(gzip.compress(data, compresslevel=6, mtime=0))
+    response.headers['Content-Encoding'] = coding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag + ENCODING_SUFFIXES[coding])
+    return response
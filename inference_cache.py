@@ -0,0 +1,86 @@
+# inference_cache.py - Shared Memoization Cache for Model Predictions
+
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class InferenceCache:
+    """LRU + TTL cache of per-row model outputs keyed on (model, revision, quantized row)
+
+    Rows are rounded to `decimals` places before lookup and the model is
+    scored on the rounded values, so a cached answer is exactly what the
+    model would return for that input. A new model revision never sees the
+    previous revision's entries.
+    """
+
+    def __init__(self, max_entries=50000, ttl_seconds=3600, decimals=4):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.decimals = decimals
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _counters(self, name):
+        return self._stats.setdefault(name, {'hits': 0, 'misses': 0})
+
+    def score_rows(self, name, revision, X, compute):
+        """Outputs of compute(X) for each row of X, calling compute only for uncached rows
+
+        compute takes an (m, n_features) array and returns m outputs (scalars
+        or 1-d arrays), all misses being scored in a single call.
+        """
+        X = np.round(np.asarray(X, dtype=np.float64), self.decimals)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        keys = [(name, revision, row) for row in map(tuple, X.tolist())]
+        outputs = [None] * len(keys)
+        misses = []
+
+        now = time.monotonic()
+        with self._lock:
+            counters = self._counters(name)
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    outputs[i] = entry[1]
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    misses.append(i)
+            counters['hits'] += len(keys) - len(misses)
+            counters['misses'] += len(misses)
+
+        if misses:
+            computed = compute(X[misses])
+            expires = now + self.ttl_seconds
+            with self._lock:
+                for i, value in zip(misses, computed):
+                    outputs[i] = value
+                    self._entries[keys[i]] = (expires, value)
+                    self._entries.move_to_end(keys[i])
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return np.array(outputs)
+
+    def scorer(self, name, revision, compute):
+        """compute wrapped as a cached X -> outputs function"""
+        return lambda X: self.score_rows(name, revision, X, compute)
+
+    def invalidate(self, name):
+        """Drop every entry for a model (after it is retrained or swapped)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == name]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'models': {name: dict(counters) for name, counters in self._stats.items()}
+            }
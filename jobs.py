@@ -0,0 +1,181 @@
+# jobs.py - Background Job Queue for Long-running Requests
+
+import os
+import json
+import uuid
+import socket
+import sqlite3
+import threading
+import traceback
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_STATES = ('queued', 'running', 'succeeded', 'failed')
+
+
+def pid_alive(pid):
+    """True if a process with this ID is running on this host"""
+    if os.name == 'nt':
+        # os.kill(pid, 0) would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """Thread pool with a persistent SQLite job table
+
+    Jobs are plain functions called as fn(progress, *args); progress(fraction,
+    message) records how far along the job is. Results must be JSON-serializable.
+    Each job records the host and process running it, so several worker
+    processes can share one database: only jobs whose process is gone are
+    marked failed.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        owner TEXT,
+        status TEXT NOT NULL,
+        progress REAL NOT NULL DEFAULT 0,
+        message TEXT,
+        result TEXT,
+        error TEXT,
+        created_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        worker_host TEXT,
+        worker_pid INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs(owner, created_at);
+    """
+
+    INTERRUPTED = 'Interrupted by server restart'
+
+    # Columns get() returns; worker_host/worker_pid are only for reaping
+    PUBLIC_FIELDS = ('job_id', 'kind', 'owner', 'status', 'progress', 'message', 'result', 'error',
+                     'created_at', 'started_at', 'finished_at')
+
+    def __init__(self, db_path, workers=2):
+        self.db_path = db_path
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self._local = threading.local()
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+        # Databases created before jobs recorded their worker
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+        for column, kind in (('worker_host', 'TEXT'), ('worker_pid', 'INTEGER')):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self.reap_orphans(startup=True)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+    def _connect(self):
+        """Per-thread autocommit connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _update(self, job_id, **fields):
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        self._connect().execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def _orphaned(self, host, pid, startup=False):
+        """True if the process that queued a job is gone (or unknown, from before workers were recorded)"""
+        if pid is None:
+            return True
+        if host != self.host:
+            return False  # another machine's processes cannot be checked from here
+        if pid == self.pid:
+            # At startup our PID can only be a dead predecessor's, reused
+            return startup
+        return not pid_alive(pid)
+
+    def _fail_interrupted(self, job_id):
+        self._connect().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+            "WHERE job_id = ? AND status IN ('queued', 'running')",
+            (self.INTERRUPTED, datetime.now().isoformat(), job_id)
+        )
+
+    def reap_orphans(self, startup=False):
+        """Mark queued/running jobs whose worker process has exited as failed; returns how many"""
+        rows = self._connect().execute(
+            "SELECT job_id, worker_host, worker_pid FROM jobs WHERE status IN ('queued', 'running')"
+        ).fetchall()
+        orphans = [row['job_id'] for row in rows if self._orphaned(row['worker_host'], row['worker_pid'], startup)]
+        for job_id in orphans:
+            self._fail_interrupted(job_id)
+        return len(orphans)
+
+    def submit(self, kind, fn, *args, owner=None):
+        """Queue fn(progress, *args) and return its job ID immediately"""
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            'INSERT INTO jobs (job_id, kind, owner, status, created_at, worker_host, worker_pid) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job_id, kind, owner, 'queued', datetime.now().isoformat(), self.host, self.pid)
+        )
+        self._pool.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _run(self, job_id, fn, args):
+        self._update(job_id, status='running', started_at=datetime.now().isoformat())
+
+        def progress(fraction, message=None):
+            self._update(job_id, progress=round(min(max(fraction, 0.0), 1.0), 3), message=message)
+
+        try:
+            result = fn(progress, *args)
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status='failed', error=str(e), finished_at=datetime.now().isoformat())
+            return
+        self._update(job_id, status='succeeded', progress=1.0, message='Completed',
+                     result=json.dumps(result, default=float), finished_at=datetime.now().isoformat())
+
+    def get(self, job_id):
+        """Job record as a dict, or None if the ID is unknown"""
+        row = self._connect().execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        if row['status'] in ('queued', 'running') and self._orphaned(row['worker_host'], row['worker_pid']):
+            # Its worker process died without a restart of this one
+            self._fail_interrupted(job_id)
+            row = self._connect().execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        job = {field: row[field] for field in self.PUBLIC_FIELDS}
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def list(self, owner, limit=20):
+        """Most recent jobs submitted by a user"""
+        rows = self._connect().execute(
+            'SELECT job_id, kind, status, progress, message, created_at, finished_at FROM jobs '
+            'WHERE owner = ? ORDER BY created_at DESC LIMIT ?', (owner, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
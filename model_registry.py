@@ -0,0 +1,197 @@
+# model_registry.py - Versioned Model Artifact Registry
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+
+import joblib
+import sklearn
+
+from storage import FileLock
+
+MODELS_DIR = 'trained_models'
+MANIFEST_FILE = 'manifest.json'
+
+
+class ModelRegistry:
+    """Stores trained models as checksummed joblib artifacts with a manifest
+
+    Saves hold a lock file next to the manifest, so processes training at
+    the same time never lose each other's manifest entries.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR):
+        self.models_dir = models_dir
+        if not os.path.exists(self.models_dir):
+            os.makedirs(self.models_dir)
+        self.manifest_path = os.path.join(self.models_dir, MANIFEST_FILE)
+
+    def artifact_path(self, name):
+        """Returns the path to a model's artifact file."""
+        return os.path.join(self.models_dir, f"{name}.joblib")
+
+    def read_manifest(self):
+        """Read the manifest, returning an empty one if it is missing or corrupt"""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'models': {}}
+
+    def manifest_stamp(self):
+        """Changes whenever the manifest is rewritten (it is always replaced by a rename)"""
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _write_manifest(self, manifest):
+        """Atomically replace the manifest file"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.models_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=4)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def _sha256(path):
+        """Checksum an artifact file in 1 MB blocks"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def save(self, name, model, version, metrics=None):
+        """Serialize a trained model and record it in the manifest"""
+        path = self.artifact_path(name)
+
+        # Uncompressed dumps can be memory-mapped on load
+        fd, tmp_path = tempfile.mkstemp(dir=self.models_dir, suffix='.tmp')
+        os.close(fd)
+        joblib.dump(model, tmp_path)
+        os.chmod(tmp_path, 0o644)
+        checksum = self._sha256(tmp_path)
+
+        # The artifact and its manifest entry change together
+        with FileLock(self.manifest_path + '.lock'):
+            os.replace(tmp_path, path)
+            manifest = self.read_manifest()
+            previous = manifest['models'].get(name, {})
+            entry = {
+                'file': os.path.basename(path),
+                'version': version,
+                'revision': previous.get('revision', 0) + 1,
+                'sha256': checksum,
+                'sklearn_version': sklearn.__version__,
+                'created_at': datetime.now().isoformat(),
+                'metrics': metrics or {}
+            }
+            manifest['models'][name] = entry
+            self._write_manifest(manifest)
+        return entry
+
+    def get_entry(self, name):
+        """Manifest entry for a model, or None if it was never saved"""
+        return self.read_manifest()['models'].get(name)
+
+    def stale_reason(self, name, version):
+        """Explain why a stored artifact cannot be used, or None if it is current"""
+        entry = self.get_entry(name)
+        if entry is None:
+            return 'not in manifest'
+        if not os.path.exists(self.artifact_path(name)):
+            return 'artifact file missing'
+        if entry.get('version') != version:
+            return f"version {entry.get('version')} != {version}"
+        if entry.get('sklearn_version') != sklearn.__version__:
+            return f"built with scikit-learn {entry.get('sklearn_version')}"
+        if self._sha256(self.artifact_path(name)) != entry.get('sha256'):
+            return 'checksum mismatch'
+        return None
+
+    def load(self, name, version, mmap_mode='r'):
+        """Load a current artifact, returning None if it is missing or stale"""
+        reason = self.stale_reason(name, version)
+        if reason:
+            print(f"Model '{name}' needs training ({reason})")
+            return None
+        return joblib.load(self.artifact_path(name), mmap_mode=mmap_mode)
+
+    def load_or_train(self, name, version, factory):
+        """Load a model artifact, training and saving it via factory() when needed"""
+        model = self.load(name, version)
+        if model is not None:
+            return model
+
+        model = factory()
+        self.save(name, model, version)
+        return model
+
+
+class ModelSlot:
+    """Live instance of a model, replaced by a single reference swap
+
+    Request handlers call get() once and use that instance for the whole
+    request, so a publish never exposes a half-trained model and the predict
+    path takes no locks. Publishers serialize on update_lock.
+
+    Given a registry, the slot also follows revisions saved by other processes
+    (other server workers retraining or rolling back): get() and snapshot()
+    stat the manifest and load the registry's revision when it has moved.
+    """
+
+    def __init__(self, name, model, revision=None, registry=None, version=None):
+        self.name = name
+        self._current = (model, revision)
+        self._previous = None
+        self.update_lock = threading.Lock()
+        self._registry = registry
+        self._version = version
+        self._manifest_stamp = None  # checked on first use
+
+    def get(self):
+        return self.snapshot()[0]
+
+    def snapshot(self):
+        """(model, revision) read together, for caches keyed on the revision"""
+        if self._registry is not None:
+            self._sync()
+        return self._current
+
+    @property
+    def revision(self):
+        return self.snapshot()[1]
+
+    def _sync(self):
+        """Load the registry's revision if another process saved a different one"""
+        stamp = self._registry.manifest_stamp()
+        if stamp == self._manifest_stamp:
+            return
+        # Publishers hold the lock for a whole retrain; serve the current model meanwhile
+        if not self.update_lock.acquire(blocking=False):
+            return
+        try:
+            entry = self._registry.get_entry(self.name)
+            if entry is not None and entry['revision'] != self._current[1]:
+                model = self._registry.load(self.name, self._version)
+                if model is not None:
+                    self.publish(model, entry['revision'])
+            # A save racing this read changes the stamp again, so it is picked up next time
+            self._manifest_stamp = stamp
+        finally:
+            self.update_lock.release()
+
+    @property
+    def previous(self):
+        """The (model, revision) replaced by the last publish, or None"""
+        return self._previous
+
+    def publish(self, model, revision=None):
+        """Make a trained, validated model live; the old one is kept for rollback"""
+        self._previous = self._current
+        self._current = (model, revision)
@@ -0,0 +1,144 @@
+# out_of_core.py - Chunked Readers and Accumulators for Training on Large Datasets
+
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+
+def read_dataset_chunks(path, columns, chunk_size=100_000):
+    """Yield (X, y) float64 arrays of at most chunk_size rows from a .csv, .parquet or .npy file
+
+    columns are the feature columns followed by the target. A .npy file must
+    be a 2-d matrix with exactly those columns in that order; it is read with
+    plain file reads rather than mapped, so resident memory stays at one chunk.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npy':
+        with open(path, 'rb') as f:
+            major, _ = np.lib.format.read_magic(f)
+            if major == 1:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if len(shape) != 2 or shape[1] != len(columns) or fortran_order:
+                raise ValueError(f"{path} must be a C-ordered (rows, {len(columns)}) matrix of {', '.join(columns)}")
+            for start in range(0, shape[0], chunk_size):
+                rows = min(chunk_size, shape[0] - start)
+                block = np.fromfile(f, dtype=dtype, count=rows * shape[1]).reshape(rows, shape[1])
+                block = block.astype(np.float64, copy=False)
+                yield block[:, :-1], block[:, -1]
+    elif ext == '.csv':
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_size):
+            block = chunk[columns].to_numpy(dtype=np.float64)
+            yield block[:, :-1], block[:, -1]
+    elif ext == '.parquet':
+        if pa is None:
+            raise RuntimeError('pyarrow is required to read Parquet (pip install pyarrow), or use .csv/.npy')
+        parquet_file = pa.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            block = batch.to_pandas()[columns].to_numpy(dtype=np.float64)
+            yield block[:, :-1], block[:, -1]
+    else:
+        raise ValueError(f"Unsupported dataset format: {ext}")
+
+
+class RowSample:
+    """Uniform random sample of at most `size` rows from a stream of chunks
+
+    Every row gets a random key and the rows with the smallest keys are kept,
+    so memory is bounded by size + one chunk.
+    """
+
+    def __init__(self, size, seed=42):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.X = None
+        self.y = None
+
+    def add(self, X, y):
+        keys = self.rng.random(len(y))
+        if self.X is None:
+            self.X, self.y = X, y
+        else:
+            keys = np.concatenate([self.keys, keys])
+            self.X = np.concatenate([self.X, X])
+            self.y = np.concatenate([self.y, y])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            keys, self.X, self.y = keys[keep], self.X[keep], self.y[keep]
+        self.keys = keys
+
+    def rows(self):
+        """(X, y) of the sample"""
+        return self.X, self.y
+
+
+class NormalEquations:
+    """Running sums for an exact Ridge fit over rows seen chunk by chunk"""
+
+    def __init__(self, n_features):
+        self.n = 0
+        self.sum_x = np.zeros(n_features)
+        self.sum_y = 0.0
+        self.xtx = np.zeros((n_features, n_features))
+        self.xty = np.zeros(n_features)
+
+    def add(self, X, y):
+        self.n += len(y)
+        self.sum_x += X.sum(axis=0)
+        self.sum_y += y.sum()
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+
+    def fit(self, ridge):
+        """Set coef_ and intercept_ of an sklearn Ridge to the solution on all rows added"""
+        mean_x = self.sum_x / self.n
+        mean_y = self.sum_y / self.n
+        # Centered Gram matrix, as Ridge(fit_intercept=True) solves on centered data
+        xtx = self.xtx - self.n * np.outer(mean_x, mean_x)
+        xty = self.xty - self.n * mean_x * mean_y
+        coef = np.linalg.solve(xtx + ridge.alpha * np.eye(len(mean_x)), xty)
+        ridge.coef_ = coef
+        ridge.intercept_ = float(mean_y - mean_x @ coef)
+        ridge.n_features_in_ = len(coef)
+        return ridge
+
+
+class HeldOutMetrics:
+    """Test-set R² and RMSE, or accuracy for a classifier, accumulated chunk by chunk"""
+
+    def __init__(self, classifier=False):
+        self.classifier = classifier
+        self.count = 0
+        self.correct = 0
+        self.sum_y = 0.0
+        self.sum_y2 = 0.0
+        self.sse = 0.0
+
+    def add(self, y_true, y_pred):
+        self.count += len(y_true)
+        if self.classifier:
+            self.correct += int(np.sum(y_true == y_pred))
+        else:
+            self.sum_y += float(y_true.sum())
+            self.sum_y2 += float(np.dot(y_true, y_true))
+            self.sse += float(np.sum((y_true - y_pred) ** 2))
+
+    def result(self):
+        if self.count == 0:
+            return {}
+        if self.classifier:
+            return {'test_accuracy': self.correct / self.count}
+        total = self.sum_y2 - self.sum_y ** 2 / self.count
+        return {
+            'test_r2': 1 - self.sse / total if total > 0 else 0.0,
+            'test_rmse': float(np.sqrt(self.sse / self.count))
+        }
@@ -0,0 +1,140 @@
+# patches.py - JSON Patch (RFC 6902) Support for Incremental app_data Sync
+
+import copy
+
+
+class PatchError(ValueError):
+    """A patch is malformed or does not apply to the document"""
+
+
+class PatchConflict(Exception):
+    """A patch touches data changed since the revision it was based on"""
+
+    def __init__(self, revision, message='Data changed on the server since your last sync'):
+        super().__init__(message)
+        self.revision = revision
+
+
+def parse_pointer(path):
+    """JSON Pointer string -> list of reference tokens ('' is the whole document)"""
+    if not isinstance(path, str) or (path and not path.startswith('/')):
+        raise PatchError(f"Invalid JSON pointer: {path!r}")
+    if path == '':
+        return []
+    return [token.replace('~1', '/').replace('~0', '~') for token in path[1:].split('/')]
+
+
+def format_pointer(tokens):
+    return ''.join('/' + str(token).replace('~', '~0').replace('/', '~1') for token in tokens)
+
+
+def _index(container, token, allow_end=False):
+    if token == '-' and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith('0')):
+        raise PatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index out of range: {token}")
+    return index
+
+
+def _parent(doc, tokens):
+    """Container holding the location tokens point to"""
+    node = doc
+    for token in tokens[:-1]:
+        if isinstance(node, dict):
+            if token not in node:
+                raise PatchError(f"Path not found: {format_pointer(tokens)}")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_index(node, token)]
+        else:
+            raise PatchError(f"Path not found: {format_pointer(tokens)}")
+    return node
+
+
+def apply_ops(doc, ops):
+    """Apply add/remove/replace/test operations to a copy of doc
+
+    All-or-nothing: raises PatchError without touching doc if any operation
+    fails. Returns (new_doc, touched), touched being the paths each operation
+    changed, with array insertions and removals widened to the whole array
+    since they shift its indices (appends stay '<array>/-').
+    """
+    if not isinstance(ops, list):
+        raise PatchError('A patch must be a list of operations')
+    doc = copy.deepcopy(doc)
+    touched = []
+
+    for op in ops:
+        if not isinstance(op, dict) or 'op' not in op or 'path' not in op:
+            raise PatchError(f"Invalid operation: {op!r}")
+        kind = op['op']
+        tokens = parse_pointer(op['path'])
+        if kind in ('add', 'replace', 'test') and 'value' not in op:
+            raise PatchError(f"'{kind}' needs a value: {op['path']}")
+
+        if not tokens:
+            if kind == 'test':
+                if doc != op['value']:
+                    raise PatchError('Test failed: /')
+                continue
+            if kind == 'remove' or not isinstance(op['value'], dict):
+                raise PatchError('The document root can only be replaced with an object')
+            doc = copy.deepcopy(op['value'])
+            touched.append('')
+            continue
+
+        parent = _parent(doc, tokens)
+        key = tokens[-1]
+        if isinstance(parent, dict):
+            if kind != 'add' and key not in parent:
+                raise PatchError(f"Path not found: {op['path']}")
+            if kind == 'test':
+                if parent[key] != op['value']:
+                    raise PatchError(f"Test failed: {op['path']}")
+                continue
+            if kind == 'remove':
+                del parent[key]
+            elif kind in ('add', 'replace'):
+                parent[key] = copy.deepcopy(op['value'])
+            else:
+                raise PatchError(f"Unsupported operation: {kind!r}")
+            touched.append(op['path'])
+        elif isinstance(parent, list):
+            index = _index(parent, key, allow_end=kind == 'add')
+            if kind == 'test':
+                if parent[index] != op['value']:
+                    raise PatchError(f"Test failed: {op['path']}")
+                continue
+            if kind == 'add':
+                parent.insert(index, copy.deepcopy(op['value']))
+                appended = key == '-' or index == len(parent) - 1
+                touched.append(format_pointer(tokens[:-1] + ['-']) if appended else format_pointer(tokens[:-1]))
+            elif kind == 'remove':
+                del parent[index]
+                touched.append(format_pointer(tokens[:-1]))
+            elif kind == 'replace':
+                parent[index] = copy.deepcopy(op['value'])
+                touched.append(op['path'])
+            else:
+                raise PatchError(f"Unsupported operation: {kind!r}")
+        else:
+            raise PatchError(f"Path not found: {op['path']}")
+
+    return doc, touched
+
+
+def paths_conflict(ours, theirs):
+    """True if any path in ours overlaps (equals, contains or is inside) one in theirs
+
+    Two appends to the same array commute, so they do not conflict.
+    """
+    for a in ours:
+        for b in theirs:
+            if a == b and a.endswith('/-'):
+                continue
+            if a == b or a == '' or b == '' or a.startswith(b + '/') or b.startswith(a + '/'):
+                return True
+    return False
@@ -0,0 +1,83 @@
+# plot_cache.py - Content-addressed Cache for Rendered Plots
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def plot_key(*inputs):
+    """Content hash of the values a plot is drawn from (also used as its ETag)"""
+    payload = json.dumps(inputs, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class PlotCache:
+    """LRU cache of PNG bytes bounded by entry count and total size"""
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # pyplot is not thread-safe, so renders are serialized
+        self._render_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png, username=None):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = png
+            self._bytes += len(png)
+            if username is not None:
+                self._user_keys[username] = key
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get_or_render(self, key, render, username=None):
+        """Return cached PNG bytes, calling render() once on a miss"""
+        png = self.get(key)
+        if png is None:
+            with self._render_lock:
+                # Another request may have rendered it while we waited
+                with self._lock:
+                    png = self._entries.get(key)
+                if png is None:
+                    png = render()
+                    self.put(key, png, username)
+                    return png
+        if username is not None:
+            with self._lock:
+                self._user_keys[username] = key
+        return png
+
+    def invalidate_user(self, username):
+        """Drop the plot last served to a user after their attendance changes"""
+        with self._lock:
+            key = self._user_keys.pop(username, None)
+            if key is not None and key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,217 @@
+# risk_scan.py - Cohort-wide Nightly Attendance Risk Scan
+
+import os
+import csv
+import json
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from attendance_risk import AttendanceRiskPredictor
+from model_registry import ModelRegistry, MODELS_DIR
+from storage import open_user_store
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+# Columns of the report, one row per (user, subject)
+REPORT_COLUMNS = [
+    ('username', 'string'),
+    ('subject_name', 'string'),
+    ('current_percentage', 'float32'),
+    ('projected_percentage', 'float32'),
+    ('trend', 'float32'),
+    ('risk_probability', 'float32'),
+    ('risk_level', 'string'),
+    ('total_classes', 'int32'),
+    ('attended', 'int32'),
+]
+
+RISK_LEVELS = ('High', 'Medium', 'Low')
+
+# Model loaded once per worker process
+_worker_model = None
+
+
+def _load_model(models_dir):
+    registry = ModelRegistry(models_dir)
+    return registry.load_or_train(
+        'attendance_risk', AttendanceRiskPredictor.MODEL_VERSION, AttendanceRiskPredictor
+    )
+
+
+def _init_worker(models_dir):
+    global _worker_model
+    _worker_model = _load_model(models_dir)
+
+
+def score_chunk(chunk, model=None):
+    """Score a chunk of (username, subjects, attendance_data) with one batched model call
+
+    Returns report rows as a dict of column lists.
+    """
+    model = model or _worker_model
+    results = model.analyze_risk_batch([(subjects, attendance) for _, subjects, attendance in chunk])
+
+    columns = {name: [] for name, _ in REPORT_COLUMNS}
+    for (username, _, _), user_results in zip(chunk, results):
+        for result in user_results:
+            columns['username'].append(username)
+            for name, _ in REPORT_COLUMNS[1:]:
+                columns[name].append(result[name])
+    return columns
+
+
+def iter_user_chunks(store, chunk_size):
+    """Stream users from the store as lists of (username, subjects, attendance_data)
+
+    Counts come from the user's aggregates, as in /api/attendance_risk, so the
+    scan and the API always score the same numbers.
+    """
+    chunk = []
+    for username in store.usernames():
+        aggregates = store.load_aggregates(username)
+        if aggregates is None:
+            continue  # deleted since usernames() was read
+        chunk.append((username, aggregates['subjects'], aggregates['attendance']))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ReportWriter:
+    """Append column batches to a Parquet, Arrow IPC or CSV file"""
+
+    def __init__(self, path, fmt):
+        if fmt in ('parquet', 'arrow') and pa is None:
+            raise RuntimeError(f"pyarrow is required for {fmt} output (pip install pyarrow), or use --format csv")
+        self.path = path
+        self.fmt = fmt
+        self._writer = None
+        self._file = None
+        if fmt in ('parquet', 'arrow'):
+            self.schema = pa.schema([(name, getattr(pa, dtype)()) for name, dtype in REPORT_COLUMNS])
+            if fmt == 'parquet':
+                self._writer = pa.parquet.ParquetWriter(path, self.schema, compression='zstd')
+            else:
+                self._file = pa.OSFile(path, 'wb')
+                self._writer = pa.ipc.new_file(self._file, self.schema)
+        elif fmt == 'csv':
+            self._file = open(path, 'w', newline='')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow([name for name, _ in REPORT_COLUMNS])
+        else:
+            raise ValueError(f"Unknown report format: {fmt}")
+
+    def write(self, columns):
+        if not columns['username']:
+            return
+        if self.fmt == 'csv':
+            self._writer.writerows(zip(*(columns[name] for name, _ in REPORT_COLUMNS)))
+        elif self.fmt == 'parquet':
+            self._writer.write_table(pa.table(columns, schema=self.schema))
+        else:
+            self._writer.write_batch(pa.record_batch(columns, schema=self.schema))
+
+    def close(self):
+        if self.fmt == 'csv':
+            self._file.close()
+        else:
+            self._writer.close()
+            if self._file is not None:
+                self._file.close()
+
+
+def run_risk_scan(store, output_path, fmt='parquet', chunk_size=500, workers=None, models_dir=MODELS_DIR):
+    """Score every user in the store and write a columnar report plus a JSON summary
+
+    At most two chunks per worker are in flight, so memory stays bounded by
+    chunk_size regardless of cohort size. Returns the summary dict.
+    """
+    workers = workers if workers is not None else os.cpu_count() or 1
+
+    # Make sure the artifact exists before workers start loading it
+    model = _load_model(models_dir)
+
+    summary = {
+        'started_at': datetime.now().isoformat(),
+        'users_scanned': 0,
+        'subjects_scored': 0,
+        'at_risk_users': 0,
+        'risk_levels': {level: 0 for level in RISK_LEVELS},
+    }
+
+    def consume(n_users, columns):
+        summary['users_scanned'] += n_users
+        summary['subjects_scored'] += len(columns['username'])
+        at_risk = set()
+        for username, level in zip(columns['username'], columns['risk_level']):
+            summary['risk_levels'][level] += 1
+            if level != 'Low':
+                at_risk.add(username)
+        summary['at_risk_users'] += len(at_risk)
+        writer.write(columns)
+
+    start = time.perf_counter()
+    writer = ReportWriter(output_path, fmt)
+    try:
+        if workers <= 1:
+            for chunk in iter_user_chunks(store, chunk_size):
+                consume(len(chunk), score_chunk(chunk, model))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(models_dir,)) as pool:
+                pending = []
+                for chunk in iter_user_chunks(store, chunk_size):
+                    pending.append((len(chunk), pool.submit(score_chunk, chunk)))
+                    if len(pending) >= workers * 2:
+                        n_users, future = pending.pop(0)
+                        consume(n_users, future.result())
+                for n_users, future in pending:
+                    consume(n_users, future.result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    summary['elapsed_seconds'] = round(elapsed, 3)
+    summary['users_per_second'] = round(summary['users_scanned'] / elapsed, 1) if elapsed > 0 else None
+    summary['report'] = output_path
+    summary['format'] = fmt
+
+    with open(os.path.splitext(output_path)[0] + '_summary.json', 'w') as f:
+        json.dump(summary, f, indent=4)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Flag at-risk students across all users')
+    parser.add_argument('--backend', default=os.environ.get('STORAGE_BACKEND', 'json'), choices=['json', 'compact', 'sqlite'])
+    parser.add_argument('--data-dir', default='user_data')
+    parser.add_argument('--db', default=os.environ.get('SQLITE_PATH'))
+    parser.add_argument('--format', default='parquet', choices=['parquet', 'arrow', 'csv'])
+    parser.add_argument('--output', default=None, help='Report path (default: reports/risk_scan_<date>.<ext>)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Users per scoring batch')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    args = parser.parse_args()
+
+    output = args.output
+    if output is None:
+        os.makedirs('reports', exist_ok=True)
+        output = os.path.join('reports', f"risk_scan_{datetime.now().strftime('%Y%m%d')}.{args.format}")
+
+    store = open_user_store(args.backend, args.data_dir, args.db)
+    summary = run_risk_scan(store, output, args.format, args.chunk_size, args.workers, args.models_dir)
+
+    print(f"Scanned {summary['users_scanned']} users ({summary['subjects_scored']} subjects) "
+          f"in {summary['elapsed_seconds']}s - {summary['users_per_second']} users/sec")
+    print(f"At-risk users: {summary['at_risk_users']}  "
+          f"(High: {summary['risk_levels']['High']}, Medium: {summary['risk_levels']['Medium']} subjects)")
+    print(f"Report: {output}")
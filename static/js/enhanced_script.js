@@ -319,6 +319,158 @@ async function logout() {
 }
 
 // Data Management
+const SYNCED_KEYS = ['subjects', 'timetable', 'attendanceData', 'timeSlots', 'studentName', 'universityRollNo'];
+
+// Server revision and a copy of the synced fields as of that revision
+let dataRevision = null;
+let syncedState = null;
+
+// Patch retries before giving up and reloading the server's copy
+const MAX_PATCH_ATTEMPTS = 3;
+
+function escapePointer(key) {
+    return String(key).replace(/~/g, '~0').replace(/\//g, '~1');
+}
+
+function unescapePointer(token) {
+    return token.replace(/~1/g, '/').replace(/~0/g, '~');
+}
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+// JSON Patch ops turning before into after; array growth is sent as appends
+function diffJson(before, after, path = '', ops = []) {
+    if (isPlainObject(before) && isPlainObject(after)) {
+        for (const key of Object.keys(before)) {
+            if (!(key in after) || after[key] === undefined) {
+                ops.push({ op: 'remove', path: `${path}/${escapePointer(key)}` });
+            }
+        }
+        for (const key of Object.keys(after)) {
+            if (after[key] === undefined) continue;
+            const childPath = `${path}/${escapePointer(key)}`;
+            if (!(key in before) || before[key] === undefined) {
+                ops.push({ op: 'add', path: childPath, value: after[key] });
+            } else {
+                diffJson(before[key], after[key], childPath, ops);
+            }
+        }
+    } else if (Array.isArray(before) && Array.isArray(after)) {
+        const common = Math.min(before.length, after.length);
+        for (let i = 0; i < common; i++) {
+            diffJson(before[i], after[i], `${path}/${i}`, ops);
+        }
+        for (let i = before.length - 1; i >= after.length; i--) {
+            ops.push({ op: 'remove', path: `${path}/${i}` });
+        }
+        for (let i = common; i < after.length; i++) {
+            ops.push({ op: 'add', path: `${path}/-`, value: after[i] });
+        }
+    } else if (JSON.stringify(before) !== JSON.stringify(after)) {
+        ops.push({ op: 'replace', path, value: after });
+    }
+    return ops;
+}
+
+// Copy of state with JSON Patch ops applied; ops outside the synced fields are skipped.
+// Throws if an op does not apply, as the server would reject it.
+function applyOps(state, ops) {
+    const doc = JSON.parse(JSON.stringify(state));
+    for (const op of ops) {
+        const tokens = op.path.split('/').slice(1).map(unescapePointer);
+        if (tokens.length === 0) throw new Error('Cannot apply a whole-document op');
+        if (!SYNCED_KEYS.includes(tokens[0])) continue;
+
+        let parent = doc;
+        for (const token of tokens.slice(0, -1)) {
+            parent = parent === null || typeof parent !== 'object' ? undefined : parent[token];
+            if (parent === undefined) throw new Error(`Path not found: ${op.path}`);
+        }
+        const key = tokens[tokens.length - 1];
+        const value = op.value === undefined ? undefined : JSON.parse(JSON.stringify(op.value));
+
+        if (Array.isArray(parent)) {
+            const index = key === '-' ? parent.length : Number(key);
+            const limit = op.op === 'add' ? parent.length : parent.length - 1;
+            if (!Number.isInteger(index) || index < 0 || index > limit || (key === '-' && op.op !== 'add')) {
+                throw new Error(`Bad array index: ${op.path}`);
+            }
+            if (op.op === 'add') parent.splice(index, 0, value);
+            else if (op.op === 'remove') parent.splice(index, 1);
+            else if (op.op === 'replace') parent[index] = value;
+            else if (op.op !== 'test' || JSON.stringify(parent[index]) !== JSON.stringify(value)) {
+                throw new Error(`Op failed: ${op.op} ${op.path}`);
+            }
+        } else if (isPlainObject(parent)) {
+            if (op.op !== 'add' && !(key in parent)) throw new Error(`Path not found: ${op.path}`);
+            if (op.op === 'add' || op.op === 'replace') parent[key] = value;
+            else if (op.op === 'remove') delete parent[key];
+            else if (op.op !== 'test' || JSON.stringify(parent[key]) !== JSON.stringify(value)) {
+                throw new Error(`Op failed: ${op.op} ${op.path}`);
+            }
+        } else {
+            throw new Error(`Path not found: ${op.path}`);
+        }
+    }
+    return doc;
+}
+
+function setSyncedFields(data) {
+    subjects = data.subjects || [];
+    timetable = data.timetable || {};
+    attendanceData = data.attendanceData || {};
+    timeSlots = data.timeSlots || timeSlots;
+    studentName = data.studentName || '';
+    universityRollNo = data.universityRollNo || '';
+}
+
+function currentSyncedState() {
+    return JSON.parse(JSON.stringify({
+        subjects,
+        timetable,
+        attendanceData,
+        timeSlots,
+        studentName,
+        universityRollNo
+    }));
+}
+
+async function saveFullData(dataToSave) {
+    const response = await fetch('/save_data', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(dataToSave)
+    });
+    const result = await response.json();
+    if (result.success) {
+        dataRevision = result.revision;
+        syncedState = dataToSave;
+    }
+}
+
+// Replay the server's changes since dataRevision onto syncedState and redo the local
+// edits on top of them. Returns false if the changes cannot be replayed.
+async function rebaseLocalEdits() {
+    const response = await fetch(`/get_data?since=${dataRevision}`);
+    const result = await response.json();
+    if (!result.success || !Array.isArray(result.ops)) return false;
+
+    let serverState, rebased;
+    try {
+        serverState = applyOps(syncedState, result.ops);
+        // Read the local state only now, so edits made while fetching are kept
+        rebased = applyOps(serverState, diffJson(syncedState, currentSyncedState()));
+    } catch (error) {
+        return false;
+    }
+    dataRevision = result.revision;
+    syncedState = serverState;
+    setSyncedFields(rebased);
+    return true;
+}
+
 // Debounced save function for better performance
 let saveDataTimeout = null;
 async function saveData() {
@@ -331,21 +483,43 @@ async function saveData() {
     
     // Debounce save by 500ms
     saveDataTimeout = setTimeout(async () => {
-        const dataToSave = { 
-            subjects, 
-            timetable, 
-            attendanceData, 
-            timeSlots, 
-            studentName, 
-            universityRollNo 
-        };
-        
         try {
-            await fetch('/save_data', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(dataToSave)
-            });
+            if (dataRevision === null || syncedState === null) {
+                // Nothing synced yet to diff against
+                await saveFullData(currentSyncedState());
+                return;
+            }
+
+            for (let attempt = 0; attempt < MAX_PATCH_ATTEMPTS; attempt++) {
+                // Send only what changed since the last sync
+                const dataToSave = currentSyncedState();
+                const ops = diffJson(syncedState, dataToSave);
+                if (ops.length === 0) return;
+
+                const response = await fetch('/patch_data', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ base_revision: dataRevision, ops })
+                });
+                const result = await response.json();
+
+                if (result.success) {
+                    dataRevision = result.revision;
+                    syncedState = dataToSave;
+                    return;
+                }
+                if (response.status !== 409 && response.status !== 400) return;
+
+                // Another client changed the same data, or our snapshot is stale:
+                // catch up with its changes and retry our edits on top of them
+                if (!(await rebaseLocalEdits())) break;
+                updateAllDisplays();
+            }
+
+            // Never overwrite the other client's changes; take the server's copy instead
+            await loadData();
+            updateAllDisplays();
+            showAlert('Your data was changed on another device. The latest version has been loaded.', 'warning');
         } catch (error) {
             console.error('Error saving data:', error);
         }
@@ -360,13 +534,16 @@ async function loadData() {
         const result = await response.json();
         
         if (result.success && result.data) {
-            subjects = result.data.subjects || [];
-            timetable = result.data.timetable || {};
-            attendanceData = result.data.attendanceData || {};
-            timeSlots = result.data.timeSlots || timeSlots;
-            studentName = result.data.studentName || '';
-            universityRollNo = result.data.universityRollNo || '';
+            setSyncedFields(result.data);
             userEmail = result.data.email || '';
+
+            dataRevision = result.revision ?? null;
+            syncedState = {};
+            for (const key of SYNCED_KEYS) {
+                if (result.data[key] !== undefined) {
+                    syncedState[key] = JSON.parse(JSON.stringify(result.data[key]));
+                }
+            }
             
             // Load study sessions from server if available
             if (result.data.studySessions && result.data.studySessions.length > 0) {
@@ -920,25 +1097,112 @@ async function fetchAttendancePlot() {
     
     if (!plotContainer) return;
     
+    // Draw in the browser when Chart.js is available; the server PNG is the fallback
+    if (typeof Chart !== 'undefined') {
+        await fetchAttendanceChart(plotContainer);
+        return;
+    }
+    
     try {
-        const response = await fetch('/get_attendance_plot');
-        const result = await response.json();
+        // Raw PNG; the browser revalidates it with the ETag and gets 304 when unchanged
+        const response = await fetch('/attendance_plot.png');
         
-        if (result.success && result.image) {
+        if (response.ok) {
+            const imageUrl = URL.createObjectURL(await response.blob());
             plotContainer.innerHTML = `
-                <img src="data:image/png;base64,${result.image}" 
+                <img src="${imageUrl}" 
                      class="img-fluid rounded" 
                      alt="Attendance Plot"
                      style="max-height: 400px;">
             `;
+            plotContainer.querySelector('img').onload = () => URL.revokeObjectURL(imageUrl);
         } else {
+            const result = await response.json();
+            plotContainer.innerHTML = `
+                <div class="alert alert-info">
+                    <i class="bi bi-info-circle me-2"></i>
+                    ${result.message || 'No attendance data to display.'}
+                </div>
+            `;
+        }
+    } catch (error) {
+        plotContainer.innerHTML = `
+            <div class="alert alert-danger">
+                <i class="bi bi-exclamation-triangle me-2"></i>
+                Error loading attendance plot.
+            </div>
+        `;
+    }
+}
+
+async function fetchAttendanceChart(plotContainer) {
+    try {
+        const response = await fetch('/api/attendance_series');
+        const result = await response.json();
+        
+        if (!result.success) {
             plotContainer.innerHTML = `
                 <div class="alert alert-info">
                     <i class="bi bi-info-circle me-2"></i>
                     ${result.message || 'No attendance data to display.'}
                 </div>
             `;
+            return;
         }
+        
+        const series = result.series;
+        plotContainer.innerHTML = '<div style="height: 400px;"><canvas id="attendancePlotChart"></canvas></div>';
+        
+        if (attendanceChart) {
+            attendanceChart.destroy();
+        }
+        
+        attendanceChart = new Chart(document.getElementById('attendancePlotChart').getContext('2d'), {
+            type: 'bar',
+            data: {
+                labels: series.names,
+                datasets: [{
+                    label: 'Attendance Percentage (%)',
+                    data: series.percentages,
+                    backgroundColor: 'rgba(44, 62, 80, 0.8)',
+                    borderColor: '#1a252f',
+                    borderWidth: 2,
+                    borderRadius: 8
+                }]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                plugins: {
+                    legend: {
+                        display: false
+                    },
+                    title: {
+                        display: true,
+                        text: 'Subject-wise Attendance Percentage'
+                    },
+                    tooltip: {
+                        callbacks: {
+                            label: function(context) {
+                                const i = context.dataIndex;
+                                return `${series.percentages[i].toFixed(1)}% (${series.attended[i]} / ${series.totals[i]} classes)`;
+                            }
+                        }
+                    }
+                },
+                scales: {
+                    y: {
+                        min: 0,
+                        max: 105,
+                        ticks: {
+                            callback: function(value) {
+                                return value + '%';
+                            }
+                        }
+                    }
+                }
+            }
+        });
     } catch (error) {
         plotContainer.innerHTML = `
             <div class="alert alert-danger">
@@ -1188,6 +1452,25 @@ async function deactivatePremium() {
     }
 }
 
+// Background Jobs
+async function waitForJob(jobId, onProgress, interval = 1000) {
+    while (true) {
+        const response = await fetch(`/api/jobs/${jobId}`);
+        const result = await response.json();
+        if (!result.success) {
+            return { status: 'failed', error: result.message };
+        }
+        const job = result.job;
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            return job;
+        }
+        if (onProgress) {
+            onProgress(job);
+        }
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+}
+
 // File Upload
 async function uploadAttendanceFile() {
     const fileInput = document.getElementById('attendanceFile');
@@ -1206,7 +1489,20 @@ async function uploadAttendanceFile() {
             method: 'POST',
             body: formData,
         });
-        const result = await response.json();
+        let result = await response.json();
+
+        if (result.success && result.job_id) {
+            messageDiv.innerHTML = `
+                <div class="alert alert-info">
+                    <i class="bi bi-hourglass-split me-2"></i>
+                    ${result.message}
+                </div>
+            `;
+            const job = await waitForJob(result.job_id);
+            result = job.status === 'succeeded'
+                ? { success: true, message: job.result.message }
+                : { success: false, message: job.error || 'Import failed' };
+        }
         
         if (result.success) {
             messageDiv.innerHTML = `
@@ -0,0 +1,1188 @@
+# storage.py - User Data Storage Backends
+
+import os
+import json
+import sqlite3
+import argparse
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from aggregates import build_aggregates, add_attendance_to_aggregates, AGGREGATES_VERSION
+from patches import apply_ops, paths_conflict, PatchConflict
+from user_codec import encode_user, decode_user
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_TIME_SLOTS = ['9:00 AM-10:00 AM', '10:00 AM-11:00 AM', '11:00 AM-12:00 PM', '12:00 PM-1:00 PM',
+                      '1:00 PM-2:00 PM', '2:00 PM-3:00 PM', '3:00 PM-4:00 PM', '4:00 PM-5:00 PM']
+
+# app_data keys kept in their own tables by the SQLite backend
+TABLE_KEYS = ('subjects', 'attendanceData', 'studySessions')
+
+# Secondary index of google_id/email -> username for the JSON backend
+INDEX_FILE = '.user_index'
+
+# Per-user analytics aggregates for the JSON backend (user_data/.aggregates/<username>.json)
+AGGREGATES_DIR = '.aggregates'
+
+# Per-user account fields and revision for the JSON backend (user_data/.headers/<username>.json),
+# so revision checks and logins do not parse the whole document
+HEADERS_DIR = '.headers'
+
+# Per-user write lock files for the JSON backend (user_data/.locks/<username>.lock)
+LOCKS_DIR = '.locks'
+
+# Log of recent app_data revisions for the JSON backend (user_data/.oplog/<username>.jsonl)
+OPLOG_DIR = '.oplog'
+# Revisions kept per user for delta sync; clients further behind reload everything
+OPLOG_LIMIT = 200
+
+
+def default_app_data(student_name=''):
+    """Returns the app_data document for a new or cleared account."""
+    return {
+        'subjects': [],
+        'timetable': {},
+        'attendanceData': {},
+        'timeSlots': list(DEFAULT_TIME_SLOTS),
+        'studentName': student_name,
+        'universityRollNo': '',
+        'studySessions': [],
+        'studyGoals': {'daily': 2, 'weekly': 14}
+    }
+
+
+def normalize_email(email):
+    """Emails are indexed case-insensitively"""
+    return email.strip().lower() if email else None
+
+
+def atomic_write_json(path, data, fsync=False, **dump_kwargs):
+    """Write JSON to a temp file in the same directory and rename it over path"""
+    atomic_write_bytes(path, json.dumps(data, **dump_kwargs).encode('utf-8'), fsync)
+
+
+def atomic_write_bytes(path, data, fsync=False):
+    """Write bytes to a temp file in the same directory and rename it over path
+
+    With fsync=True the file (and, on POSIX, the directory entry) is flushed
+    to disk before returning, so the new contents survive a crash.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if fsync and hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def entries_since(log, since, revision):
+    """Op log entries after revision `since`, or None if they cannot be replayed
+
+    None means the log no longer covers every revision up to `revision`, or
+    one of them replaced app_data wholesale (entries without 'ops').
+    """
+    if since > revision:
+        return None
+    newer = [entry for entry in log if entry['revision'] > since]
+    if [entry['revision'] for entry in newer] != list(range(since + 1, revision + 1)):
+        return None
+    if any('ops' not in entry for entry in newer):
+        return None
+    return newer
+
+
+def patch_app_data(app_data, ops, base_revision, revision, read_log):
+    """Apply a client's patch, made against base_revision, to app_data at revision
+
+    Changes made since base_revision are fine as long as none of them touch
+    the paths the patch touches. Raises PatchConflict otherwise, or
+    PatchError for a malformed patch. Returns (new_app_data, touched).
+    """
+    newer = []
+    if base_revision != revision:
+        newer = entries_since(read_log(), base_revision, revision)
+        if newer is None:
+            raise PatchConflict(revision)
+    app_data, touched = apply_ops(app_data, ops)
+    if paths_conflict(touched, [path for entry in newer for path in entry['touched']]):
+        raise PatchConflict(revision)
+    return app_data, touched
+
+
+class FileLock:
+    """Exclusive lock on a lock file, held across processes (fcntl, or msvcrt on Windows)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a+')
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+
+class JsonUserStore:
+    """One JSON document per user in data_dir (user_data/<username>.json)
+
+    Writes to a user's document hold that user's lock file, so read-modify-write
+    updates from other threads and processes never interleave, and documents are
+    replaced atomically so readers never see a partial file. With
+    coalesce_writes=True, whole-app_data saves for a user that queue up behind a
+    write in progress are merged into one write of the latest data.
+    """
+
+    def __init__(self, data_dir='user_data', coalesce_writes=False):
+        self.data_dir = data_dir
+        if not os.path.exists(self.data_dir):
+            os.makedirs(self.data_dir)
+        self.index_path = os.path.join(self.data_dir, INDEX_FILE)
+        self._index = None
+        self._index_stamp = None
+        self.aggregates_dir = os.path.join(self.data_dir, AGGREGATES_DIR)
+        if not os.path.exists(self.aggregates_dir):
+            os.makedirs(self.aggregates_dir)
+        self.headers_dir = os.path.join(self.data_dir, HEADERS_DIR)
+        if not os.path.exists(self.headers_dir):
+            os.makedirs(self.headers_dir)
+        self.locks_dir = os.path.join(self.data_dir, LOCKS_DIR)
+        if not os.path.exists(self.locks_dir):
+            os.makedirs(self.locks_dir)
+        self.oplog_dir = os.path.join(self.data_dir, OPLOG_DIR)
+        if not os.path.exists(self.oplog_dir):
+            os.makedirs(self.oplog_dir)
+        self.coalesce_writes = coalesce_writes
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+    EXTENSION = '.json'
+
+    def filepath(self, username):
+        """Returns the path to a user's data file."""
+        return os.path.join(self.data_dir, f"{username}{self.EXTENSION}")
+
+    def _encode(self, user_data):
+        return json.dumps(user_data, indent=4).encode('utf-8')
+
+    def _decode(self, data, expand=True):
+        """Parse a stored document; expand=False callers only need the account fields"""
+        return json.loads(data)
+
+    def _read(self, username, expand=True):
+        try:
+            with open(self.filepath(username), 'rb') as f:
+                return self._decode(f.read(), expand)
+        except FileNotFoundError:
+            return None
+
+    def _user_lock(self, username):
+        """Exclusive write lock on one user's document, across threads and processes"""
+        return FileLock(os.path.join(self.locks_dir, f"{username}.lock"))
+
+    def _write(self, username, user_data):
+        """Commit a user's document; callers hold the user's lock"""
+        atomic_write_bytes(self.filepath(username), self._encode(user_data), fsync=True)
+        self._write_aggregates(username, user_data)
+        self._write_header(username, user_data)
+
+    # --- account header ---
+    def _header_path(self, username):
+        return os.path.join(self.headers_dir, f"{username}.json")
+
+    def _write_header(self, username, user_data):
+        """Save the fields other than app_data, tagged with the stamp of the document they came from"""
+        header = {key: value for key, value in user_data.items() if key != 'app_data'}
+        header['source'] = list(self._stamp(self.filepath(username)))
+        atomic_write_json(self._header_path(username), header)
+        return header
+
+    def load_header(self, username):
+        """Account fields plus 'revision' without app_data, or None if the user does not exist
+
+        Read from the header sidecar while it matches the document, so this
+        does not parse the document; rebuilt from it otherwise.
+        """
+        try:
+            stamp = list(self._stamp(self.filepath(username)))
+        except FileNotFoundError:
+            return None
+        try:
+            with open(self._header_path(username), 'r') as f:
+                header = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            header = None
+        if header is None or header.get('source') != stamp:
+            # Under the lock, so the stamp written matches the document read
+            with self._user_lock(username):
+                user_data = self._read(username, expand=False)
+                if user_data is None:
+                    return None
+                header = self._write_header(username, user_data)
+        header.pop('source', None)
+        header.setdefault('revision', 0)
+        return header
+
+    # --- revisions and op log ---
+    def _oplog_path(self, username):
+        return os.path.join(self.oplog_dir, f"{username}.jsonl")
+
+    def _read_oplog(self, username):
+        entries = []
+        try:
+            with open(self._oplog_path(username), 'r') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # half-written last line
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _commit_revision(self, username, user_data, revision, ops=None, touched=None):
+        """Write user_data as revision + 1 and log the change; callers hold the user's lock
+
+        ops=None records that app_data was replaced wholesale.
+        """
+        revision += 1
+        user_data['revision'] = revision
+        self._write(username, user_data)
+
+        entry = {'revision': revision}
+        if ops is not None:
+            entry.update(ops=ops, touched=touched)
+        with open(self._oplog_path(username), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        if revision % OPLOG_LIMIT == 0:
+            fd, tmp_path = tempfile.mkstemp(dir=self.oplog_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.writelines(json.dumps(e) + '\n' for e in self._read_oplog(username)[-OPLOG_LIMIT:])
+            os.replace(tmp_path, self._oplog_path(username))
+        return revision
+
+    def revision(self, username):
+        """Current app_data revision, or None if the user does not exist"""
+        header = self.load_header(username)
+        return None if header is None else header['revision']
+
+    def changes_since(self, username, since):
+        """(revision, ops) to bring a client at revision `since` up to date
+
+        ops is None if the client must reload the whole document instead.
+        Raises KeyError if the user does not exist.
+        """
+        revision = self.revision(username)
+        if revision is None:
+            raise KeyError(username)
+        newer = entries_since(self._read_oplog(username), since, revision)
+        return revision, None if newer is None else [op for entry in newer for op in entry['ops']]
+
+    def apply_patch(self, username, base_revision, ops):
+        """Apply JSON Patch ops to app_data, returning the new revision
+
+        Raises PatchConflict if the ops touch data changed since base_revision,
+        PatchError if they are invalid and KeyError if the user does not exist.
+        """
+        with self._user_lock(username):
+            user_data = self.load(username)
+            if user_data is None:
+                raise KeyError(username)
+            revision = user_data.get('revision', 0)
+            app_data, touched = patch_app_data(
+                user_data.get('app_data', {}), ops, base_revision, revision, lambda: self._read_oplog(username)
+            )
+            if not touched:
+                return revision
+            user_data['app_data'] = app_data
+            return self._commit_revision(username, user_data, revision, ops, touched)
+
+    # --- analytics aggregates ---
+    def _aggregates_path(self, username):
+        return os.path.join(self.aggregates_dir, f"{username}.json")
+
+    def _write_aggregates(self, username, user_data):
+        """Rebuild a user's aggregates, tagged with the stamp of the document they came from"""
+        aggregates = build_aggregates(user_data.get('app_data', {}))
+        aggregates['source'] = list(self._stamp(self.filepath(username)))
+        atomic_write_json(self._aggregates_path(username), aggregates)
+        return aggregates
+
+    def load_aggregates(self, username):
+        """Analytics aggregates (see aggregates.build_aggregates), or None if the user does not exist
+
+        Rebuilt from the user document if missing, older than it or in an older layout.
+        """
+        try:
+            stamp = list(self._stamp(self.filepath(username)))
+        except FileNotFoundError:
+            return None
+        try:
+            with open(self._aggregates_path(username), 'r') as f:
+                aggregates = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            aggregates = None
+        if (aggregates is None or aggregates.get('source') != stamp
+                or aggregates.get('version') != AGGREGATES_VERSION):
+            # Under the lock, so the stamp written matches the document read
+            with self._user_lock(username):
+                user_data = self.load(username)
+                if user_data is None:
+                    return None
+                aggregates = self._write_aggregates(username, user_data)
+        aggregates.pop('source', None)
+        return aggregates
+
+    # --- google_id / email index ---
+    def _index_lock(self):
+        return FileLock(self.index_path + '.lock')
+
+    def _read_index(self, locked=False):
+        """In-memory copy of the index, reloaded when another process rewrites it
+
+        A missing index is rebuilt under the index lock; locked=True means the
+        caller already holds it.
+        """
+        try:
+            stamp = self._stamp(self.index_path)
+        except FileNotFoundError:
+            if locked:
+                return self._rebuild_index()
+            with self._index_lock():
+                # Another writer may have created it while we waited
+                return self._read_index(locked=True)
+        if stamp != self._index_stamp:
+            with open(self.index_path, 'r') as f:
+                self._index = json.load(f)
+            self._index_stamp = stamp
+        return self._index
+
+    @staticmethod
+    def _stamp(path):
+        # Every rewrite renames a new file into place, so the inode changes too
+        st = os.stat(path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _update_index(self, username, old=None, new=None):
+        """Move a user's google_id/email entries from their old to new account values"""
+        old = old or {}
+        new = new or {}
+        changes = [
+            ('google_id', old.get('google_id'), new.get('google_id')),
+            ('email', normalize_email(old.get('email')), normalize_email(new.get('email')))
+        ]
+        if all(before == after for _, before, after in changes) and os.path.exists(self.index_path):
+            return
+
+        with self._index_lock():
+            self._index_stamp = None
+            index = self._read_index(locked=True)
+            for field, before, after in changes:
+                if before and index[field].get(before) == username:
+                    del index[field][before]
+                if after:
+                    # First account registered with an email keeps it
+                    index[field].setdefault(after, username)
+            atomic_write_json(self.index_path, index)
+            self._index = index
+            self._index_stamp = self._stamp(self.index_path)
+
+    def rebuild_index(self):
+        """Rebuild the google_id/email index by scanning every user document"""
+        with self._index_lock():
+            return self._rebuild_index()
+
+    def _rebuild_index(self):
+        # Callers hold the index lock, so no update lands between the scan and the write
+        index = {'google_id': {}, 'email': {}}
+        for username, user_data in self.iter_users():
+            if user_data.get('google_id'):
+                index['google_id'].setdefault(user_data['google_id'], username)
+            email = normalize_email(user_data.get('email'))
+            if email:
+                index['email'].setdefault(email, username)
+        atomic_write_json(self.index_path, index)
+        self._index = index
+        self._index_stamp = self._stamp(self.index_path)
+        return index
+
+    def find_by_google_id(self, google_id):
+        """Username linked to a Google account ID, or None"""
+        username = self._read_index()['google_id'].get(google_id)
+        return username if username and self.exists(username) else None
+
+    def find_by_email(self, email):
+        """Username registered with an email address, or None"""
+        username = self._read_index()['email'].get(normalize_email(email))
+        return username if username and self.exists(username) else None
+
+    def exists(self, username):
+        return os.path.exists(self.filepath(username))
+
+    def load(self, username):
+        """Full user document, or None if the user does not exist"""
+        return self._read(username)
+
+    def load_account(self, username):
+        """Account fields (password, premium, ...) without app_data"""
+        user_data = self.load_header(username)
+        if user_data is None:
+            return None
+        user_data.pop('revision', None)
+        return user_data
+
+    def create(self, username, user_data):
+        """Create a user, returning False if the username is taken"""
+        with self._user_lock(username):
+            if self.exists(username):
+                return False
+            self._write(username, user_data)
+            self._update_index(username, new=user_data)
+        return True
+
+    def save(self, username, user_data):
+        """Replace a user's whole document, returning its new revision"""
+        with self._user_lock(username):
+            previous = self._read(username, expand=False) or {}
+            # Revisions never go back, even when a copied document carries its own
+            revision = max(previous.get('revision', 0), user_data.get('revision', 0))
+            revision = self._commit_revision(username, dict(user_data), revision)
+            self._update_index(username, old=previous, new=user_data)
+        return revision
+
+    def update_account(self, username, **fields):
+        """Set top-level account fields such as premium or premium_expiry"""
+        with self._user_lock(username):
+            user_data = self.load(username)
+            if user_data is None:
+                raise KeyError(username)
+            previous = {key: user_data.get(key) for key in ('google_id', 'email')}
+            user_data.update(fields)
+            self._write(username, user_data)
+            self._update_index(username, old=previous, new=user_data)
+
+    def replace_app_data(self, username, app_data):
+        """Replace app_data, keeping account fields; returns the new revision
+
+        Raises KeyError if the user does not exist.
+        """
+        if not self.coalesce_writes:
+            with self._user_lock(username):
+                return self._replace_app_data(username, app_data)
+
+        # The first caller waits for the lock; callers arriving meanwhile just
+        # swap in newer data and wait for that caller's write to finish
+        with self._pending_lock:
+            batch = self._pending.get(username)
+            leader = batch is None
+            if leader:
+                batch = self._pending[username] = {'done': threading.Event(), 'error': None}
+            batch['app_data'] = app_data
+
+        if not leader:
+            batch['done'].wait()
+            if batch['error'] is not None:
+                raise batch['error']
+            return batch['revision']
+
+        try:
+            with self._user_lock(username):
+                with self._pending_lock:
+                    del self._pending[username]
+                batch['revision'] = self._replace_app_data(username, batch['app_data'])
+                return batch['revision']
+        except BaseException as e:
+            batch['error'] = e
+            raise
+        finally:
+            with self._pending_lock:
+                if self._pending.get(username) is batch:
+                    del self._pending[username]
+            batch['done'].set()
+
+    def _replace_app_data(self, username, app_data):
+        user_data = self.load(username)
+        if user_data is None:
+            raise KeyError(username)
+        user_data['app_data'] = app_data
+        return self._commit_revision(username, user_data, user_data.get('revision', 0))
+
+    def add_attendance_records(self, username, subject_id, records):
+        """Append new attendance records for one subject, skipping known keys
+
+        Returns the number of records added.
+        """
+        return self.add_attendance(username, {subject_id: records})
+
+    def add_attendance(self, username, records_by_subject):
+        """Append records for several subjects in one write, skipping known keys
+
+        Returns the number of records added.
+        """
+        with self._user_lock(username):
+            return self._add_attendance(username, records_by_subject)
+
+    def _add_attendance(self, username, records_by_subject):
+        user_data = self.load(username)
+        if user_data is None:
+            raise KeyError(username)
+        attendance_data = user_data.setdefault('app_data', {}).setdefault('attendanceData', {})
+
+        added = 0
+        for subject_id, records in records_by_subject.items():
+            entry = attendance_data.setdefault(str(subject_id), {'total': 0, 'attended': 0, 'records': []})
+            known_keys = {rec['key'] for rec in entry.get('records', [])}
+            for record in records:
+                if record['key'] in known_keys:
+                    continue
+                known_keys.add(record['key'])
+                entry['records'].append({'key': record['key'], 'status': record['status']})
+                entry['total'] += 1
+                if record['status'] == 'present':
+                    entry['attended'] += 1
+                added += 1
+
+        if added:
+            self._commit_revision(username, user_data, user_data.get('revision', 0))
+        return added
+
+    def usernames(self):
+        """All usernames, sorted"""
+        return sorted(
+            filename[:-len(self.EXTENSION)] for filename in os.listdir(self.data_dir)
+            if filename.endswith(self.EXTENSION)
+        )
+
+    def iter_users(self):
+        """Yield (username, user_data) for every readable user document"""
+        for username in self.usernames():
+            try:
+                user_data = self.load(username)
+            except (ValueError, OSError):
+                continue
+            if user_data is not None:
+                yield username, user_data
+
+
+class CompactUserStore(JsonUserStore):
+    """JsonUserStore with documents in the packed binary format of user_codec (user_data/<username>.packed)
+
+    Attendance records and study sessions are stored as packed integer
+    columns (msgpack, or compact JSON without msgpack) and expanded back to
+    the usual app_data shape by load(). Account-only reads skip the expansion.
+    """
+
+    EXTENSION = '.packed'
+
+    def _encode(self, user_data):
+        return encode_user(user_data)
+
+    def _decode(self, data, expand=True):
+        return decode_user(data, expand)
+
+
+class SqliteUserStore:
+    """Users, subjects, attendance and study sessions in indexed SQLite tables (WAL mode)"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        email TEXT,
+        password TEXT NOT NULL DEFAULT '',
+        google_id TEXT,
+        premium INTEGER NOT NULL DEFAULT 0,
+        premium_expiry TEXT,
+        extra TEXT NOT NULL DEFAULT '{}'
+    );
+    CREATE INDEX IF NOT EXISTS idx_users_email_key ON users(lower(trim(email)));
+    CREATE INDEX IF NOT EXISTS idx_users_google_id ON users(google_id);
+
+    CREATE TABLE IF NOT EXISTS profiles (
+        username TEXT PRIMARY KEY REFERENCES users(username) ON DELETE CASCADE,
+        app_data TEXT NOT NULL DEFAULT '{}'
+    );
+
+    CREATE TABLE IF NOT EXISTS subjects (
+        username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        subject_id TEXT NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (username, position)
+    );
+
+    CREATE TABLE IF NOT EXISTS attendance_totals (
+        username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+        subject_id TEXT NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        attended INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (username, subject_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS attendance_records (
+        username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+        subject_id TEXT NOT NULL,
+        record_key TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        PRIMARY KEY (username, subject_id, record_key)
+    );
+    CREATE INDEX IF NOT EXISTS idx_attendance_seq ON attendance_records(username, subject_id, seq);
+
+    CREATE TABLE IF NOT EXISTS study_sessions (
+        username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+        seq INTEGER NOT NULL,
+        subject TEXT,
+        date TEXT,
+        duration REAL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (username, seq)
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessions_subject ON study_sessions(username, subject);
+
+    CREATE TABLE IF NOT EXISTS user_aggregates (
+        username TEXT PRIMARY KEY REFERENCES users(username) ON DELETE CASCADE,
+        data TEXT NOT NULL
+    );
+
+    -- Recent app_data revisions; ops is NULL when app_data was replaced wholesale
+    CREATE TABLE IF NOT EXISTS user_ops (
+        username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+        revision INTEGER NOT NULL,
+        ops TEXT,
+        touched TEXT,
+        PRIMARY KEY (username, revision)
+    );
+    """
+
+    # Account fields with their own column; everything else goes to users.extra
+    ACCOUNT_COLUMNS = ('email', 'password', 'google_id', 'premium', 'premium_expiry')
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self._local = threading.local()
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self):
+        """Per-thread connection, created on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly by _transaction()
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, write=False):
+        """Consistent snapshot for reads; IMMEDIATE lock for read-modify-write"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    # --- Row (de)serialization ---
+    def _account_row(self, user_data):
+        extra = {
+            key: value for key, value in user_data.items()
+            if key not in self.ACCOUNT_COLUMNS and key not in ('app_data', 'revision')
+        }
+        return (
+            user_data.get('email'),
+            user_data.get('password', ''),
+            user_data.get('google_id'),
+            1 if user_data.get('premium') else 0,
+            user_data.get('premium_expiry'),
+            json.dumps(extra)
+        )
+
+    def _read_account(self, conn, username):
+        row = conn.execute(
+            'SELECT email, password, google_id, premium, premium_expiry, extra '
+            'FROM users WHERE username = ?', (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        email, password, google_id, premium, premium_expiry, extra = row
+        account = {'password': password}
+        if email is not None:
+            account['email'] = email
+        if google_id is not None:
+            account['google_id'] = google_id
+        account['premium'] = bool(premium)
+        account['premium_expiry'] = premium_expiry
+        account.update(json.loads(extra))
+        return account
+
+    def _read_app_data(self, conn, username):
+        row = conn.execute('SELECT app_data FROM profiles WHERE username = ?', (username,)).fetchone()
+        app_data = json.loads(row[0]) if row else {}
+
+        app_data['subjects'] = [
+            json.loads(data) for (data,) in conn.execute(
+                'SELECT data FROM subjects WHERE username = ? ORDER BY position', (username,)
+            )
+        ]
+
+        attendance_data = {}
+        for subject_id, total, attended in conn.execute(
+            'SELECT subject_id, total, attended FROM attendance_totals WHERE username = ?', (username,)
+        ):
+            attendance_data[subject_id] = {'total': total, 'attended': attended, 'records': []}
+        for subject_id, record_key, status in conn.execute(
+            'SELECT subject_id, record_key, status FROM attendance_records '
+            'WHERE username = ? ORDER BY subject_id, seq', (username,)
+        ):
+            entry = attendance_data.setdefault(subject_id, {'total': 0, 'attended': 0, 'records': []})
+            entry['records'].append({'key': record_key, 'status': status})
+        app_data['attendanceData'] = attendance_data
+
+        app_data['studySessions'] = [
+            json.loads(data) for (data,) in conn.execute(
+                'SELECT data FROM study_sessions WHERE username = ? ORDER BY seq', (username,)
+            )
+        ]
+        return app_data
+
+    def _write_app_data(self, conn, username, app_data):
+        """Apply app_data as row-level changes against what is stored"""
+        profile = {key: value for key, value in app_data.items() if key not in TABLE_KEYS}
+        conn.execute(
+            'INSERT INTO profiles (username, app_data) VALUES (?, ?) '
+            'ON CONFLICT(username) DO UPDATE SET app_data = excluded.app_data',
+            (username, json.dumps(profile))
+        )
+
+        # Subjects are few; rewrite them in order
+        conn.execute('DELETE FROM subjects WHERE username = ?', (username,))
+        conn.executemany(
+            'INSERT INTO subjects (username, position, subject_id, data) VALUES (?, ?, ?, ?)',
+            [(username, position, str(subject.get('id')), json.dumps(subject))
+             for position, subject in enumerate(app_data.get('subjects', []))]
+        )
+
+        attendance_data = app_data.get('attendanceData', {})
+        conn.execute(
+            'DELETE FROM attendance_totals WHERE username = ? AND subject_id NOT IN (%s)'
+            % ','.join('?' * len(attendance_data)), (username, *attendance_data.keys())
+        )
+        conn.execute(
+            'DELETE FROM attendance_records WHERE username = ? AND subject_id NOT IN (%s)'
+            % ','.join('?' * len(attendance_data)), (username, *attendance_data.keys())
+        )
+        for subject_id, entry in attendance_data.items():
+            conn.execute(
+                'INSERT INTO attendance_totals (username, subject_id, total, attended) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(username, subject_id) DO UPDATE SET total = excluded.total, attended = excluded.attended',
+                (username, subject_id, entry.get('total', 0), entry.get('attended', 0))
+            )
+            self._sync_records(conn, username, subject_id, entry.get('records', []))
+
+        self._sync_sessions(conn, username, app_data.get('studySessions', []))
+        self._write_aggregates(conn, username, build_aggregates(app_data))
+
+    def _write_aggregates(self, conn, username, aggregates):
+        conn.execute(
+            'INSERT INTO user_aggregates (username, data) VALUES (?, ?) '
+            'ON CONFLICT(username) DO UPDATE SET data = excluded.data',
+            (username, json.dumps(aggregates))
+        )
+
+    def _revision(self, conn, username):
+        (revision,) = conn.execute(
+            'SELECT COALESCE(MAX(revision), 0) FROM user_ops WHERE username = ?', (username,)
+        ).fetchone()
+        return revision
+
+    def _read_oplog(self, conn, username):
+        rows = conn.execute(
+            'SELECT revision, ops, touched FROM user_ops WHERE username = ? ORDER BY revision', (username,)
+        )
+        entries = []
+        for revision, ops, touched in rows:
+            entry = {'revision': revision}
+            if ops is not None:
+                entry.update(ops=json.loads(ops), touched=json.loads(touched))
+            entries.append(entry)
+        return entries
+
+    def _log_revision(self, conn, username, ops=None, touched=None):
+        """Record a new app_data revision in the current transaction and return it
+
+        ops=None records that app_data was replaced wholesale.
+        """
+        revision = self._revision(conn, username) + 1
+        conn.execute(
+            'INSERT INTO user_ops (username, revision, ops, touched) VALUES (?, ?, ?, ?)',
+            (username, revision, None if ops is None else json.dumps(ops),
+             None if ops is None else json.dumps(touched))
+        )
+        conn.execute(
+            'DELETE FROM user_ops WHERE username = ? AND revision <= ?', (username, revision - OPLOG_LIMIT)
+        )
+        return revision
+
+    def _read_aggregates(self, conn, username):
+        """Stored aggregates, or None if missing or in an older layout"""
+        row = conn.execute('SELECT data FROM user_aggregates WHERE username = ?', (username,)).fetchone()
+        if row is None:
+            return None
+        aggregates = json.loads(row[0])
+        return aggregates if aggregates.get('version') == AGGREGATES_VERSION else None
+
+    def _sync_records(self, conn, username, subject_id, records):
+        stored = {
+            key: (seq, status) for key, seq, status in conn.execute(
+                'SELECT record_key, seq, status FROM attendance_records WHERE username = ? AND subject_id = ?',
+                (username, subject_id)
+            )
+        }
+        wanted = set()
+        changed = []
+        for seq, record in enumerate(records):
+            wanted.add(record['key'])
+            if stored.get(record['key']) != (seq, record['status']):
+                changed.append((username, subject_id, record['key'], seq, record['status']))
+        removed = [(username, subject_id, key) for key in stored if key not in wanted]
+
+        conn.executemany(
+            'DELETE FROM attendance_records WHERE username = ? AND subject_id = ? AND record_key = ?', removed
+        )
+        conn.executemany(
+            'INSERT INTO attendance_records (username, subject_id, record_key, seq, status) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(username, subject_id, record_key) DO UPDATE SET seq = excluded.seq, status = excluded.status',
+            changed
+        )
+
+    def _sync_sessions(self, conn, username, sessions):
+        stored = dict(conn.execute('SELECT seq, data FROM study_sessions WHERE username = ?', (username,)))
+        changed = []
+        for seq, study_session in enumerate(sessions):
+            data = json.dumps(study_session)
+            if stored.get(seq) != data:
+                changed.append((
+                    username, seq, str(study_session.get('subject')), study_session.get('date'),
+                    study_session.get('duration'), data
+                ))
+        conn.execute('DELETE FROM study_sessions WHERE username = ? AND seq >= ?', (username, len(sessions)))
+        conn.executemany(
+            'INSERT INTO study_sessions (username, seq, subject, date, duration, data) VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(username, seq) DO UPDATE SET subject = excluded.subject, date = excluded.date, '
+            'duration = excluded.duration, data = excluded.data',
+            changed
+        )
+
+    # --- Store interface (same as JsonUserStore) ---
+    def exists(self, username):
+        conn = self._connect()
+        return conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone() is not None
+
+    def load(self, username):
+        """Full user document, or None if the user does not exist"""
+        with self._transaction() as conn:
+            account = self._read_account(conn, username)
+            if account is None:
+                return None
+            account['app_data'] = self._read_app_data(conn, username)
+            account['revision'] = self._revision(conn, username)
+        return account
+
+    def load_account(self, username):
+        """Account fields (password, premium, ...) without app_data"""
+        return self._read_account(self._connect(), username)
+
+    def load_header(self, username):
+        """Account fields plus 'revision' without app_data, or None if the user does not exist"""
+        with self._transaction() as conn:
+            header = self._read_account(conn, username)
+            if header is not None:
+                header['revision'] = self._revision(conn, username)
+        return header
+
+    def find_by_google_id(self, google_id):
+        """Username linked to a Google account ID, or None"""
+        row = self._connect().execute(
+            'SELECT username FROM users WHERE google_id = ? ORDER BY rowid LIMIT 1', (google_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def find_by_email(self, email):
+        """Username registered with an email address, or None"""
+        row = self._connect().execute(
+            'SELECT username FROM users WHERE lower(trim(email)) = ? ORDER BY rowid LIMIT 1', (normalize_email(email),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def create(self, username, user_data):
+        """Create a user, returning False if the username is taken"""
+        try:
+            with self._transaction(write=True) as conn:
+                conn.execute(
+                    'INSERT INTO users (username, email, password, google_id, premium, premium_expiry, extra) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)', (username, *self._account_row(user_data))
+                )
+                self._write_app_data(conn, username, user_data.get('app_data', {}))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def save(self, username, user_data):
+        """Replace a user's whole document, returning its new revision"""
+        with self._transaction(write=True) as conn:
+            conn.execute(
+                'INSERT INTO users (username, email, password, google_id, premium, premium_expiry, extra) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(username) DO UPDATE SET '
+                'email = excluded.email, password = excluded.password, google_id = excluded.google_id, '
+                'premium = excluded.premium, premium_expiry = excluded.premium_expiry, extra = excluded.extra',
+                (username, *self._account_row(user_data))
+            )
+            self._write_app_data(conn, username, user_data.get('app_data', {}))
+            return self._log_revision(conn, username)
+
+    def update_account(self, username, **fields):
+        """Set top-level account fields such as premium or premium_expiry"""
+        with self._transaction(write=True) as conn:
+            account = self._read_account(conn, username)
+            if account is None:
+                raise KeyError(username)
+            account.update(fields)
+            conn.execute(
+                'UPDATE users SET email = ?, password = ?, google_id = ?, premium = ?, premium_expiry = ?, '
+                'extra = ? WHERE username = ?', (*self._account_row(account), username)
+            )
+
+    def replace_app_data(self, username, app_data):
+        """Replace app_data, keeping account fields; returns the new revision
+
+        Raises KeyError if the user does not exist.
+        """
+        with self._transaction(write=True) as conn:
+            if not conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+                raise KeyError(username)
+            self._write_app_data(conn, username, app_data)
+            return self._log_revision(conn, username)
+
+    def revision(self, username):
+        """Current app_data revision, or None if the user does not exist"""
+        with self._transaction() as conn:
+            if not conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+                return None
+            return self._revision(conn, username)
+
+    def changes_since(self, username, since):
+        """(revision, ops) to bring a client at revision `since` up to date
+
+        ops is None if the client must reload the whole document instead.
+        Raises KeyError if the user does not exist.
+        """
+        with self._transaction() as conn:
+            if not conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+                raise KeyError(username)
+            revision = self._revision(conn, username)
+            newer = entries_since(self._read_oplog(conn, username), since, revision)
+        return revision, None if newer is None else [op for entry in newer for op in entry['ops']]
+
+    def apply_patch(self, username, base_revision, ops):
+        """Apply JSON Patch ops to app_data, returning the new revision
+
+        Raises PatchConflict if the ops touch data changed since base_revision,
+        PatchError if they are invalid and KeyError if the user does not exist.
+        Only the rows the patch changes are rewritten.
+        """
+        with self._transaction(write=True) as conn:
+            if not conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+                raise KeyError(username)
+            revision = self._revision(conn, username)
+            app_data, touched = patch_app_data(
+                self._read_app_data(conn, username), ops, base_revision, revision,
+                lambda: self._read_oplog(conn, username)
+            )
+            if not touched:
+                return revision
+            self._write_app_data(conn, username, app_data)
+            return self._log_revision(conn, username, ops, touched)
+
+    def add_attendance_records(self, username, subject_id, records):
+        """Append new attendance records for one subject, skipping known keys
+
+        Returns the number of records added.
+        """
+        return self.add_attendance(username, {subject_id: records})
+
+    def add_attendance(self, username, records_by_subject):
+        """Append records for several subjects in one transaction, skipping known keys
+
+        Returns the number of records added.
+        """
+        added = 0
+        with self._transaction(write=True) as conn:
+            if not conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+                raise KeyError(username)
+            aggregates = self._read_aggregates(conn, username)
+
+            for subject_id, records in records_by_subject.items():
+                subject_id = str(subject_id)
+                known_keys = {
+                    key for (key,) in conn.execute(
+                        'SELECT record_key FROM attendance_records WHERE username = ? AND subject_id = ?',
+                        (username, subject_id)
+                    )
+                }
+                (next_seq,) = conn.execute(
+                    'SELECT COALESCE(MAX(seq) + 1, 0) FROM attendance_records WHERE username = ? AND subject_id = ?',
+                    (username, subject_id)
+                ).fetchone()
+
+                rows = []
+                attended = 0
+                for record in records:
+                    if record['key'] in known_keys:
+                        continue
+                    known_keys.add(record['key'])
+                    rows.append((username, subject_id, record['key'], next_seq + len(rows), record['status']))
+                    attended += record['status'] == 'present'
+
+                conn.executemany(
+                    'INSERT INTO attendance_records (username, subject_id, record_key, seq, status) '
+                    'VALUES (?, ?, ?, ?, ?)', rows
+                )
+                conn.execute(
+                    'INSERT INTO attendance_totals (username, subject_id, total, attended) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(username, subject_id) DO UPDATE SET total = total + excluded.total, '
+                    'attended = attended + excluded.attended',
+                    (username, subject_id, len(rows), attended)
+                )
+                added += len(rows)
+                if aggregates is not None:
+                    aggregates = add_attendance_to_aggregates(
+                        aggregates, subject_id, [{'key': key, 'status': status} for _, _, key, _, status in rows]
+                    )
+
+            if added:
+                if aggregates is None:
+                    aggregates = build_aggregates(self._read_app_data(conn, username))
+                self._write_aggregates(conn, username, aggregates)
+                self._log_revision(conn, username)
+        return added
+
+    def load_aggregates(self, username):
+        """Analytics aggregates (see aggregates.build_aggregates), or None if the user does not exist"""
+        aggregates = self._read_aggregates(self._connect(), username)
+        if aggregates is not None:
+            return aggregates
+        # Databases migrated before aggregates were maintained, or with an older layout
+        with self._transaction(write=True) as conn:
+            if not conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+                return None
+            aggregates = build_aggregates(self._read_app_data(conn, username))
+            self._write_aggregates(conn, username, aggregates)
+        return aggregates
+
+    def usernames(self):
+        """All usernames, sorted"""
+        conn = self._connect()
+        return [username for (username,) in conn.execute('SELECT username FROM users ORDER BY username')]
+
+    def iter_users(self):
+        """Yield (username, user_data) for every user"""
+        for username in self.usernames():
+            user_data = self.load(username)
+            if user_data is not None:
+                yield username, user_data
+
+
+def open_user_store(backend='json', data_dir='user_data', db_path=None, coalesce_writes=False):
+    """Create the configured store ('json', 'compact' or 'sqlite')
+
+    coalesce_writes applies to the file backends; SQLite already serializes
+    writers with transactions.
+    """
+    if backend == 'json':
+        return JsonUserStore(data_dir, coalesce_writes)
+    if backend == 'compact':
+        return CompactUserStore(data_dir, coalesce_writes)
+    if backend == 'sqlite':
+        return SqliteUserStore(db_path or os.path.join(data_dir, 'ordinare.db'))
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def migrate_json_dir(data_dir, target):
+    """Copy every user document from a JSON data directory into another store
+
+    Returns (migrated, skipped) counts; existing users in the target are overwritten.
+    """
+    source = JsonUserStore(data_dir)
+    migrated = skipped = 0
+    for username in source.usernames():
+        try:
+            user_data = source.load(username)
+        except (ValueError, OSError) as e:
+            print(f"Skipping {username}: {e}")
+            skipped += 1
+            continue
+        target.save(username, user_data)
+        migrated += 1
+    return migrated, skipped
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ordinare user data storage tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help='Migrate user_data/*.json into SQLite or packed files')
+    migrate_parser.add_argument('--data-dir', default='user_data')
+    migrate_parser.add_argument('--to', choices=['sqlite', 'compact'], default='sqlite', help='Target backend')
+    migrate_parser.add_argument('--db', default=None, help='SQLite path (default: <data-dir>/ordinare.db)')
+
+    index_parser = subparsers.add_parser('rebuild-index', help='Rebuild the google_id/email index of a JSON data dir')
+    index_parser.add_argument('--data-dir', default='user_data')
+
+    args = parser.parse_args()
+    if args.command == 'migrate':
+        store = open_user_store(args.to, args.data_dir, args.db)
+        migrated, skipped = migrate_json_dir(args.data_dir, store)
+        target = store.db_path if args.to == 'sqlite' else f"{args.data_dir}/*{store.EXTENSION}"
+        print(f"Migrated {migrated} users into {target} ({skipped} skipped)")
+    elif args.command == 'rebuild-index':
+        index = JsonUserStore(args.data_dir).rebuild_index()
+        print(f"Indexed {len(index['google_id'])} Google IDs and {len(index['email'])} emails")
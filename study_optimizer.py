@@ -4,64 +4,78 @@ import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 
+from aggregates import study_totals
+import synthetic_data
+
 class StudyTimeOptimizer:
-    def __init__(self):
+    # Bump when the training recipe or feature layout changes
+    MODEL_VERSION = 1
+
+    # Default forest hyperparameters (`python train_models.py tune` can override them)
+    FOREST_PARAMS = {'n_estimators': 200, 'max_depth': 15, 'min_samples_split': 5, 'min_samples_leaf': 2}
+
+    def __init__(self, data=None, n_jobs=None, train=True, params=None):
+        """params optionally overrides forest hyperparameters: {'rf': {...}}"""
         self.model = RandomForestRegressor(n_estimators=100, random_state=42)
         self.scaler = StandardScaler()
         self.is_trained = False
-        self.train_model()
+        self.forest_params = {**self.FOREST_PARAMS, **(params or {}).get('rf', {})}
+        self.cv_metrics = self.train_model(data, n_jobs) if train else {}
     
-    def train_model(self):
-        """Train model with synthetic data"""
-        X = []
-        y = []
-        
-        # Generate training data
-        for _ in range(3000):
-            difficulty = np.random.choice([3, 4, 5, 6, 7, 8], p=[0.1, 0.2, 0.3, 0.2, 0.15, 0.05])
-            current_grade = np.random.beta(6, 2) * 60 + 40
-            days_to_exam = np.random.gamma(3, 10)
-            days_to_exam = min(90, max(1, days_to_exam))
-            attendance = np.random.beta(8, 2) * 100
-            
-            base_hours = difficulty * 0.6
-            grade_factor = max(0, (85 - current_grade) / 15)
-            urgency_factor = max(0.5, min(3, 40 / days_to_exam))
-            attendance_factor = max(0, (85 - attendance) / 40)
-            
-            recommended = base_hours + grade_factor + urgency_factor + attendance_factor
-            recommended = max(2, min(25, recommended))
-            recommended += np.random.normal(0, 0.5)
-            recommended = max(1, min(25, recommended))
-            
-            X.append([difficulty, current_grade, days_to_exam, attendance])
-            y.append(recommended)
-        
+    def train_model(self, data=None, n_jobs=None):
+        """Train model with synthetic data, or on data=(X, y) if given
+
+        n_jobs parallelizes the forest and the CV folds (default: all cores
+        for the forest). Returns the CV metrics.
+        """
+        if data is None:
+            df = synthetic_data.generate('study_optimizer', 3000, seed=42)
+            columns = synthetic_data.DATASET_COLUMNS['study_optimizer']
+            data = (df[columns[:-1]].values, df[columns[-1]].values)
+        return self._fit(*data, n_jobs=n_jobs)
+    
+    def _fit(self, X, y, n_jobs=None):
         X = np.array(X)
         y = np.array(y)
         
         self.scaler.fit(X)
         X_scaled = self.scaler.transform(X)
         
-        self.model = RandomForestRegressor(
-            n_estimators=200,
-            max_depth=15,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=42,
-            n_jobs=-1
-        )
+        self.model = self.build_forest(n_jobs, self.forest_params)
         self.model.fit(X_scaled, y)
         
         from sklearn.model_selection import cross_val_score
-        scores = cross_val_score(self.model, X_scaled, y, cv=5, scoring='r2')
+        scores = cross_val_score(self.model, X_scaled, y, cv=5, scoring='r2', n_jobs=n_jobs)
         print(f"Study Optimizer Model - CV R² Score: {scores.mean():.4f} (+/- {scores.std():.4f})")
         
         self.is_trained = True
+        return {'cv_r2': float(scores.mean())}
+    
+    @classmethod
+    def build_forest(cls, n_jobs=None, params=None):
+        """The unfitted Random Forest used by the optimizer"""
+        return RandomForestRegressor(
+            **(params or cls.FOREST_PARAMS),
+            random_state=42,
+            n_jobs=-1 if n_jobs is None else n_jobs
+        )
     
-    def optimize_study_plan(self, subjects_data, attendance_data, study_sessions, days_to_exam=30):
-        """Generate optimized study plan for all subjects"""
+    def score_rows(self, X):
+        """Recommended total study hours for each feature row"""
+        return self.model.predict(self.scaler.transform(X))
+    
+    def optimize_study_plan(self, subjects_data, attendance_data, study_sessions, days_to_exam=30,
+                            score_rows=None, study_summary=None):
+        """Generate optimized study plan for all subjects
+        
+        All subjects are scored in one model call; score_rows replaces
+        self.score_rows, e.g. with a cached version. study_summary is the
+        per-subject study totals from the user's aggregates, if available.
+        """
         recommendations = []
+        subject_stats = []
+        if study_summary is None:
+            study_summary = study_totals(study_sessions)
         
         for subject in subjects_data:
             subject_id = str(subject['id'])
@@ -71,8 +85,7 @@ class StudyTimeOptimizer:
             attendance_pct = (att_data['attended'] / att_data['total'] * 100) if att_data['total'] > 0 else 75
             
             # Get study time
-            subject_sessions = [s for s in study_sessions if str(s.get('subject')) == subject_id]
-            total_study_mins = sum(s.get('duration', 0) for s in subject_sessions)
+            total_study_mins = study_summary.get(subject_id, {}).get('minutes', 0)
             total_study_hours = total_study_mins / 60
             
             # Calculate current performance estimate
@@ -84,10 +97,20 @@ class StudyTimeOptimizer:
             else:
                 difficulty = 5  # Default medium difficulty
             
-            # Predict recommended hours
-            features = [[difficulty, current_grade, days_to_exam, attendance_pct]]
-            features_scaled = self.scaler.transform(features)
-            recommended_hours = self.model.predict(features_scaled)[0]
+            subject_stats.append((subject, subject_id, attendance_pct, total_study_hours, current_grade, difficulty))
+        
+        if not subject_stats:
+            return recommendations
+        
+        # Predict recommended hours
+        features = [
+            [difficulty, current_grade, days_to_exam, attendance_pct]
+            for _, _, attendance_pct, _, current_grade, difficulty in subject_stats
+        ]
+        all_recommended_hours = (score_rows or self.score_rows)(np.array(features, dtype=float))
+        
+        for stats, recommended_hours in zip(subject_stats, all_recommended_hours):
+            subject, subject_id, attendance_pct, total_study_hours, current_grade, difficulty = stats
             
             # Calculate weekly breakdown
             weekly_hours = (recommended_hours / days_to_exam) * 7
@@ -0,0 +1,175 @@
+# synthetic_data.py - Vectorized Synthetic Dataset Generators
+
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+# Column order of each dataset; the last column is the target
+DATASET_COLUMNS = {
+    'grade': ['attendance', 'study_hours', 'midterm', 'assignment', 'quiz', 'final_grade'],
+    'attendance_risk': ['current_attendance', 'trend', 'days_left', 'recent_absences', 'risk'],
+    'study_optimizer': ['difficulty', 'current_grade', 'days_to_exam', 'attendance', 'recommended_hours'],
+}
+
+
+def grade_columns(rng, n_samples):
+    """Grade prediction rows: correlated scores driven by a latent ability"""
+    attendance = rng.beta(8, 2, n_samples) * 100
+    study_hours = np.clip(rng.gamma(3, 2, n_samples) * 5, 0, 35)
+
+    # Correlated scores
+    base_ability = rng.normal(70, 15, n_samples)
+    midterm = np.clip(
+        base_ability + (attendance/100 * 15) + (study_hours/35 * 10) + rng.normal(0, 8, n_samples), 0, 100
+    )
+    assignment = np.clip(base_ability + (study_hours/35 * 15) + rng.normal(0, 10, n_samples), 0, 100)
+    quiz = np.clip(base_ability + (attendance/100 * 10) + rng.normal(0, 12, n_samples), 0, 100)
+
+    final_grade = (
+        attendance * 0.15 +
+        midterm * 0.35 +
+        assignment * 0.25 +
+        quiz * 0.15 +
+        (study_hours/35 * 100) * 0.10
+    )
+    final_grade = np.clip(final_grade + rng.normal(0, 5, n_samples), 0, 100)
+
+    return {
+        'attendance': attendance,
+        'study_hours': study_hours,
+        'midterm': midterm,
+        'assignment': assignment,
+        'quiz': quiz,
+        'final_grade': final_grade
+    }
+
+
+def attendance_risk_columns(rng, n_samples):
+    """Attendance risk rows labelled by projected end-of-term attendance"""
+    current_att = rng.beta(7, 2, n_samples) * 100
+    trend = rng.normal(0, 3, n_samples)
+    days_left = rng.integers(5, 90, n_samples)
+    recent_absences = rng.poisson(2, n_samples)
+
+    projected = current_att + (trend * (days_left / 30))
+    risk = (
+        (projected < 70) |
+        ((projected < 75) & (trend < -1)) |
+        ((current_att < 75) & (recent_absences > 3))
+    ).astype(np.int64)
+
+    return {
+        'current_attendance': current_att,
+        'trend': trend,
+        'days_left': days_left,
+        'recent_absences': recent_absences,
+        'risk': risk
+    }
+
+
+def study_optimizer_columns(rng, n_samples):
+    """Study time rows: recommended weekly hours from difficulty, grade, urgency and attendance"""
+    difficulty = rng.choice([3, 4, 5, 6, 7, 8], size=n_samples, p=[0.1, 0.2, 0.3, 0.2, 0.15, 0.05])
+    current_grade = rng.beta(6, 2, n_samples) * 60 + 40
+    days_to_exam = np.clip(rng.gamma(3, 10, n_samples), 1, 90)
+    attendance = rng.beta(8, 2, n_samples) * 100
+
+    base_hours = difficulty * 0.6
+    grade_factor = np.maximum(0, (85 - current_grade) / 15)
+    urgency_factor = np.clip(40 / days_to_exam, 0.5, 3)
+    attendance_factor = np.maximum(0, (85 - attendance) / 40)
+
+    recommended = np.clip(base_hours + grade_factor + urgency_factor + attendance_factor, 2, 25)
+    recommended = np.clip(recommended + rng.normal(0, 0.5, n_samples), 1, 25)
+
+    return {
+        'difficulty': difficulty,
+        'current_grade': current_grade,
+        'days_to_exam': days_to_exam,
+        'attendance': attendance,
+        'recommended_hours': recommended
+    }
+
+
+GENERATORS = {
+    'grade': grade_columns,
+    'attendance_risk': attendance_risk_columns,
+    'study_optimizer': study_optimizer_columns,
+}
+
+
+def generate(name, n_samples, seed=42):
+    """One dataset as a DataFrame, drawn from its own seeded stream"""
+    return pd.DataFrame(GENERATORS[name](np.random.default_rng(seed), n_samples), columns=DATASET_COLUMNS[name])
+
+
+def iter_chunks(name, n_samples, chunk_size=1_000_000, seed=42):
+    """Yield a dataset as DataFrames of at most chunk_size rows
+
+    Every chunk has an independent stream spawned from seed, so the output
+    depends only on (seed, n_samples, chunk_size).
+    """
+    n_chunks = -(-n_samples // chunk_size)
+    for i, child in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+        rows = min(chunk_size, n_samples - i * chunk_size)
+        yield pd.DataFrame(GENERATORS[name](np.random.default_rng(child), rows), columns=DATASET_COLUMNS[name])
+
+
+def write_dataset(name, path, n_samples, chunk_size=1_000_000, seed=42):
+    """Generate a dataset straight to a .csv, .parquet or .npy file, one chunk at a time
+
+    .npy files hold a float64 (n_samples, n_columns) matrix in DATASET_COLUMNS
+    order. Returns the number of rows written.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet' and pa is None:
+        raise RuntimeError('pyarrow is required for Parquet output (pip install pyarrow), or use .csv/.npy')
+    if ext not in ('.csv', '.parquet', '.npy'):
+        raise ValueError(f"Unsupported dataset format: {ext}")
+
+    columns = DATASET_COLUMNS[name]
+    writer = None
+    if ext == '.npy':
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(n_samples, len(columns)))
+
+    written = 0
+    try:
+        for chunk in iter_chunks(name, n_samples, chunk_size, seed):
+            if ext == '.csv':
+                chunk.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+            elif ext == '.parquet':
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pa.parquet.ParquetWriter(path, table.schema, compression='zstd')
+                writer.write_table(table)
+            else:
+                out[written:written + len(chunk)] = chunk.values
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+        if ext == '.npy':
+            out.flush()
+            del out
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic training dataset to disk')
+    parser.add_argument('dataset', choices=sorted(GENERATORS))
+    parser.add_argument('output', help='Output path (.csv, .parquet or .npy)')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help='Rows generated per chunk')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    written = write_dataset(args.dataset, args.output, args.rows, args.chunk_size, args.seed)
+    print(f"Wrote {written} {args.dataset} rows to {args.output}")
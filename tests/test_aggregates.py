@@ -0,0 +1,29 @@
+from aggregates import study_totals, build_aggregates
+
+
+def test_last_studied_across_month_boundary():
+    sessions = [
+        {'subject': '1', 'date': '01/02/2025', 'duration': 30},
+        {'subject': '1', 'date': '31/01/2025', 'duration': 45},
+        {'subject': '2', 'date': '28/12/2024', 'duration': 20},
+        {'subject': '2', 'date': '02/01/2025', 'duration': 10},
+    ]
+    totals = study_totals(sessions)
+    assert totals['1'] == {'minutes': 75, 'sessions': 2, 'last_studied': '01/02/2025'}
+    assert totals['2'] == {'minutes': 30, 'sessions': 2, 'last_studied': '02/01/2025'}
+
+
+def test_unparseable_dates_are_counted_but_not_dated():
+    totals = study_totals([
+        {'subject': '1', 'date': 'yesterday', 'duration': 15},
+        {'subject': '1', 'duration': 5},
+    ])
+    assert totals['1'] == {'minutes': 20, 'sessions': 2, 'last_studied': None}
+
+
+def test_build_aggregates_uses_study_totals():
+    app_data = {'studySessions': [
+        {'subject': '3', 'date': '30/11/2025', 'duration': 60},
+        {'subject': '3', 'date': '01/12/2025', 'duration': 40},
+    ]}
+    assert build_aggregates(app_data)['study']['3']['last_studied'] == '01/12/2025'
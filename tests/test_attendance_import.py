@@ -0,0 +1,76 @@
+from io import BytesIO
+
+import pytest
+from openpyxl import Workbook
+
+from attendance_import import import_attendance
+from storage import open_user_store
+
+ROWS = [('2025-03-%02d' % (i % 28 + 1), 'Maths' if i % 2 else 'Physics', '09:00' if i < 28 else '11:00',
+         'Present' if i % 3 else 'Absent') for i in range(50)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = open_user_store('json', data_dir=str(tmp_path / 'users'))
+    store.create('alice', {'password': 'hash', 'app_data': {
+        'subjects': [{'id': 1, 'name': 'Maths'}, {'id': 2, 'name': 'Physics'}], 'attendanceData': {}}})
+    return store
+
+
+def csv_file(rows):
+    lines = ['Date,Subject,Time Slot,Status'] + [','.join(row) for row in rows]
+    return BytesIO(('\n'.join(lines) + '\n').encode())
+
+
+def xlsx_file(rows):
+    workbook = Workbook()
+    workbook.active.append(['Date', 'Subject', 'Time Slot', 'Status'])
+    for row in rows:
+        workbook.active.append(list(row))
+    data = BytesIO()
+    workbook.save(data)
+    data.seek(0)
+    return data
+
+
+@pytest.mark.parametrize('filename, make_file', [('a.csv', csv_file), ('a.xlsx', xlsx_file)])
+def test_each_chunk_is_written_and_reported(store, filename, make_file):
+    writes = []
+    add_attendance = store.add_attendance
+    store.add_attendance = lambda username, records: writes.append(records) or add_attendance(username, records)
+    calls = []
+
+    # A row repeated in a later chunk is a duplicate
+    rows = ROWS + [ROWS[0], ('not a date', 'Maths', '09:00', 'Present')]
+    report = import_attendance(store, 'alice', make_file(rows), filename, chunk_size=10,
+                               progress=lambda fraction, message=None: calls.append(fraction))
+
+    assert len(writes) == 6
+    assert all(sum(len(records) for records in batch.values()) <= 10 for batch in writes)
+    assert len(calls) == 6
+    assert calls == sorted(calls) and calls[-1] == pytest.approx(0.95)
+    assert report['rows_read'] == 52
+    assert report['records_added'] == 50
+    assert report['duplicates'] == 1
+    assert report['rejected'] == 1
+
+    attendance = store.load('alice')['app_data']['attendanceData']
+    assert sum(len(entry['records']) for entry in attendance.values()) == 50
+
+
+def test_csv_progress_follows_the_bytes_read(store):
+    # Rows for an unknown subject are rejected, so only reading is measured
+    rows = [('2025-03-01', 'Chemistry', '09:00', 'Present')] * 60000
+    calls = []
+    report = import_attendance(store, 'alice', csv_file(rows), 'a.csv', chunk_size=5000,
+                               progress=lambda fraction, message=None: calls.append(fraction))
+    assert report['rejected'] == 60000
+    assert len(calls) == 12
+    assert calls == sorted(calls) and calls[0] < 0.5 and calls[-1] == pytest.approx(0.95)
+
+
+def test_reimport_adds_nothing(store):
+    import_attendance(store, 'alice', csv_file(ROWS), 'a.csv', chunk_size=7)
+    report = import_attendance(store, 'alice', csv_file(ROWS), 'a.csv', chunk_size=7)
+    assert (report['records_added'], report['duplicates']) == (0, 50)
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from compiled_ensemble import FlatForest
+from grade_predictor_model import GradePredictor
+from model_registry import ModelRegistry
+
+SMALL = {'rf': {'n_estimators': 25}, 'gb': {'n_estimators': 25}}
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    model = GradePredictor(params=SMALL)
+    X, y = model.generate_synthetic_training_data(n_samples=400)
+    model.train_models(data=(X, y))
+    assert model.compiled is not None
+    return model
+
+
+def sklearn_predictions(model, X):
+    X_scaled = model.scaler.transform(X)
+    return model.rf_model.predict(X_scaled), model.gb_model.predict(X_scaled), model.ridge_model.predict(X_scaled)
+
+
+def assert_parity(model, X):
+    for actual, expected in zip(model.compiled.predict(X), sklearn_predictions(model, X)):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def split_rows(model, rng):
+    """Scaled rows with one feature at, or one float32 step either side of, every split threshold"""
+    rows = []
+    for estimator in [*model.rf_model.estimators_, *model.gb_model.estimators_[:, 0]]:
+        tree = estimator.tree_
+        for feature, threshold in zip(tree.feature, tree.threshold):
+            if feature < 0:
+                continue  # leaf
+            at = np.float32(threshold)
+            for value in (at, np.nextafter(at, np.float32(-np.inf)), np.nextafter(at, np.float32(np.inf))):
+                row = rng.normal(size=len(model.scaler.mean_))
+                row[feature] = value
+                rows.append(row)
+    return np.array(rows)
+
+
+def test_matches_sklearn_outside_the_training_set(predictor):
+    rng = np.random.default_rng(0)
+    # Beyond every feature's training range, including negative and extreme values
+    X = np.column_stack([rng.uniform(-200, 300, 500) for _ in range(5)])
+    X = np.vstack([X, np.zeros(5), np.full(5, 1e6), np.full(5, -1e6)])
+    assert_parity(predictor, X)
+
+
+def test_matches_sklearn_at_split_thresholds(predictor):
+    X_scaled = split_rows(predictor, np.random.default_rng(1))
+    compiled = predictor.compiled.predict_scaled(X_scaled)
+    expected = (predictor.rf_model.predict(X_scaled), predictor.gb_model.predict(X_scaled),
+                predictor.ridge_model.predict(X_scaled))
+    for actual, wanted in zip(compiled, expected):
+        np.testing.assert_array_equal(actual, wanted)
+
+
+def test_flat_forest_reaches_the_same_leaf_as_each_tree(predictor):
+    trees = predictor.rf_model.estimators_[:5]
+    X_scaled = split_rows(predictor, np.random.default_rng(2))
+    leaves = FlatForest(trees).leaf_values(X_scaled)
+    for tree, values in zip(trees, leaves):
+        np.testing.assert_array_equal(values, tree.predict(X_scaled))
+
+
+def test_single_rows_match_sklearn_and_the_batch(predictor):
+    rng = np.random.default_rng(3)
+    X = np.column_stack([rng.uniform(0, 100, 40), rng.uniform(0, 35, 40), rng.uniform(0, 100, (40, 3))])
+    assert_parity(predictor, X)
+    batch = predictor.compiled.predict(X)
+    for i, row in enumerate(X):
+        assert_parity(predictor, row[np.newaxis])
+        rf, gb, ridge = predictor.compiled.predict(row[np.newaxis])
+        assert (rf[0], gb[0]) == (batch[0][i], batch[1][i])
+        # BLAS may round a one-row dot product differently, in sklearn too
+        assert ridge[0] == pytest.approx(batch[2][i], rel=1e-12)
+
+
+def test_seeded_random_inputs(predictor):
+    rng = np.random.default_rng(4)
+    X, _ = predictor.generate_synthetic_training_data(n_samples=200)
+    noisy = X + rng.normal(0, 5, X.shape)
+    assert_parity(predictor, np.vstack([X, noisy]))
+
+
+def test_registry_round_trip_keeps_parity(predictor, tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.save('grade_predictor', predictor, GradePredictor.MODEL_VERSION)
+    loaded = registry.load('grade_predictor', GradePredictor.MODEL_VERSION)
+    assert loaded.compiled is not None
+
+    rng = np.random.default_rng(5)
+    X = np.column_stack([rng.uniform(-50, 150, 300) for _ in range(5)])
+    assert_parity(loaded, X)
+    for actual, expected in zip(loaded.compiled.predict(X), predictor.compiled.predict(X)):
+        np.testing.assert_array_equal(actual, expected)
+    np.testing.assert_array_equal(loaded.predict_scores(X), predictor.predict_scores(X))
@@ -0,0 +1,95 @@
+import sqlite3
+import subprocess
+import sys
+import threading
+
+from jobs import JobQueue
+
+
+def _insert(db_path, job_id, host, pid, status='running'):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute(
+        "INSERT INTO jobs (job_id, kind, status, created_at, worker_host, worker_pid) "
+        "VALUES (?, 'test', ?, '2025-01-01T00:00:00', ?, ?)",
+        (job_id, status, host, pid)
+    )
+    conn.close()
+
+
+def _exited_pid():
+    child = subprocess.Popen([sys.executable, '-c', 'pass'])
+    child.wait()
+    return child.pid
+
+
+def test_restart_only_fails_jobs_of_exited_processes(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    queue = JobQueue(db_path, workers=1)
+    sibling = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+    try:
+        _insert(db_path, 'sibling', queue.host, sibling.pid)
+        _insert(db_path, 'dead', queue.host, _exited_pid())
+        _insert(db_path, 'remote', 'some-other-host', 1)
+        _insert(db_path, 'legacy', None, None, status='queued')
+
+        restarted = JobQueue(db_path, workers=1)
+        assert restarted.get('sibling')['status'] == 'running'
+        assert restarted.get('remote')['status'] == 'running'
+        for job_id in ('dead', 'legacy'):
+            job = restarted.get(job_id)
+            assert job['status'] == 'failed'
+            assert job['error'] == JobQueue.INTERRUPTED
+    finally:
+        sibling.kill()
+        sibling.wait()
+    # Polling notices a worker that died after this process started
+    assert restarted.get('sibling')['status'] == 'failed'
+
+
+def test_startup_reaps_jobs_left_under_its_own_pid(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    queue = JobQueue(db_path, workers=1)
+    _insert(db_path, 'stale', queue.host, queue.pid)
+    assert queue.get('stale')['status'] == 'running'
+    assert JobQueue(db_path, workers=1).get('stale')['status'] == 'failed'
+
+
+def test_reaping_keeps_jobs_of_the_running_process(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    queue = JobQueue(db_path, workers=1)
+    release = threading.Event()
+    job_id = queue.submit('test', lambda progress: release.wait(10))
+    assert queue.reap_orphans() == 0
+    release.set()
+    queue.shutdown()
+    assert queue.get(job_id)['status'] == 'succeeded'
+
+
+def test_adds_worker_columns_to_an_old_database(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE jobs (job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, owner TEXT, "
+        "status TEXT NOT NULL, progress REAL NOT NULL DEFAULT 0, message TEXT, result TEXT, "
+        "error TEXT, created_at TEXT NOT NULL, started_at TEXT, finished_at TEXT)"
+    )
+    conn.execute("INSERT INTO jobs (job_id, kind, status, created_at) VALUES ('old', 'test', 'running', 'x')")
+    conn.close()
+
+    queue = JobQueue(db_path, workers=1)
+    assert queue.get('old')['status'] == 'failed'
+    job_id = queue.submit('test', lambda progress: 42)
+    queue.shutdown()
+    row = sqlite3.connect(db_path).execute(
+        'SELECT worker_host, worker_pid FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+    assert row == (queue.host, queue.pid)
+    assert queue.get(job_id)['result'] == 42
+
+
+def test_get_returns_only_public_fields(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), workers=1)
+    job_id = queue.submit('test', lambda progress: 'done', owner='alice')
+    queue.shutdown()
+    job = queue.get(job_id)
+    assert set(job) == set(JobQueue.PUBLIC_FIELDS)
+    assert (job['owner'], job['status'], job['result']) == ('alice', 'succeeded', 'done')
@@ -0,0 +1,69 @@
+import multiprocessing
+
+from model_registry import ModelRegistry, ModelSlot
+
+
+def _save_models(models_dir, worker, count):
+    registry = ModelRegistry(models_dir)
+    for i in range(count):
+        registry.save(f"model_{worker}_{i}", {'worker': worker, 'i': i}, version=1)
+
+
+def test_concurrent_saves_keep_every_manifest_entry(tmp_path):
+    models_dir = str(tmp_path / 'models')
+    ModelRegistry(models_dir)
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_save_models, args=(models_dir, worker, 10)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(60)
+        assert process.exitcode == 0
+
+    registry = ModelRegistry(models_dir)
+    assert len(registry.read_manifest()['models']) == 40
+    for worker in range(4):
+        for i in range(10):
+            assert registry.stale_reason(f"model_{worker}_{i}", 1) is None
+            assert registry.load(f"model_{worker}_{i}", 1) == {'worker': worker, 'i': i}
+
+
+def test_resaving_bumps_the_revision(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.save('m', [1], version=1)['revision'] == 1
+    assert registry.save('m', [2], version=1)['revision'] == 2
+    assert registry.load('m', 1) == [2]
+
+
+def test_slot_follows_revisions_saved_by_another_process(tmp_path):
+    here = ModelRegistry(str(tmp_path))
+    entry = here.save('m', {'v': 1}, version=1)
+    slot = ModelSlot('m', here.load('m', 1), entry['revision'], registry=here, version=1)
+    assert slot.snapshot() == ({'v': 1}, 1)
+
+    # Another worker retrains, then rolls back
+    there = ModelRegistry(str(tmp_path))
+    there.save('m', {'v': 2}, version=1)
+    assert slot.snapshot() == ({'v': 2}, 2)
+    assert slot.previous == ({'v': 1}, 1)
+    there.save('m', {'v': 1}, version=1)
+    assert slot.get() == {'v': 1}
+    assert slot.revision == 3
+
+
+def test_slot_keeps_its_model_while_a_publish_is_in_progress(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.save('m', {'v': 1}, version=1)
+    slot = ModelSlot('m', {'v': 1}, 1, registry=registry, version=1)
+    with slot.update_lock:
+        registry.save('m', {'v': 2}, version=1)
+        assert slot.get() == {'v': 1}
+    assert slot.get() == {'v': 2}
+
+
+def test_slot_ignores_artifacts_of_another_model_version(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.save('m', {'v': 1}, version=1)
+    slot = ModelSlot('m', {'v': 1}, 1, registry=registry, version=1)
+    registry.save('m', {'v': 'new'}, version=2)
+    assert slot.snapshot() == ({'v': 1}, 1)
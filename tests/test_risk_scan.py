@@ -0,0 +1,45 @@
+import pytest
+
+from attendance_risk import AttendanceRiskPredictor
+from risk_scan import iter_user_chunks, score_chunk
+from storage import open_user_store
+
+
+def records(subject_id, statuses):
+    return [
+        {'key': f"{subject_id}-2025-03-{day + 1:02d}-09:00", 'status': 'present' if present else 'absent'}
+        for day, present in enumerate(statuses)
+    ]
+
+
+@pytest.fixture(params=['json', 'compact', 'sqlite'])
+def store(request, tmp_path):
+    store = open_user_store(request.param, data_dir=str(tmp_path / 'users'))
+    # The raw counters disagree with the records; the records are what the API scores
+    store.create('alice', {'password': 'hash', 'app_data': {
+        'subjects': [{'id': 1, 'name': 'Maths'}, {'id': 2, 'name': 'Physics'}],
+        'attendanceData': {
+            '1': {'total': 50, 'attended': 50, 'records': records(1, [1, 0, 0, 1, 0, 0, 1, 0])},
+            '2': {'total': 3, 'attended': 0, 'records': records(2, [1] * 12)},
+        },
+    }})
+    store.create('bob', {'password': 'hash', 'app_data': {'subjects': [], 'attendanceData': {}}})
+    return store
+
+
+def test_scan_scores_the_same_counts_as_the_api(store):
+    chunks = list(iter_user_chunks(store, chunk_size=1))
+    assert [username for chunk in chunks for username, _, _ in chunk] == ['alice', 'bob']
+
+    _, subjects, attendance = chunks[0][0]
+    assert (attendance['1']['total'], attendance['1']['attended']) == (8, 3)
+    assert (attendance['2']['total'], attendance['2']['attended']) == (12, 12)
+
+    model = AttendanceRiskPredictor()
+    aggregates = store.load_aggregates('alice')
+    expected = model.analyze_risk(aggregates['subjects'], aggregates['attendance'])
+    columns = score_chunk(chunks[0], model)
+    assert columns['username'] == ['alice'] * len(expected)
+    assert columns['total_classes'] == [risk['total_classes'] for risk in expected]
+    assert columns['attended'] == [risk['attended'] for risk in expected]
+    assert columns['risk_level'] == [risk['risk_level'] for risk in expected]
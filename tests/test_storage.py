@@ -0,0 +1,68 @@
+import os
+import threading
+
+import pytest
+
+from storage import open_user_store
+
+
+@pytest.fixture(params=[('json', False), ('json', True), ('compact', False), ('sqlite', False)],
+                ids=['json', 'json-coalesced', 'compact', 'sqlite'])
+def store(request, tmp_path):
+    backend, coalesce = request.param
+    return open_user_store(backend, data_dir=str(tmp_path / 'users'), coalesce_writes=coalesce)
+
+
+def test_replace_app_data_for_a_missing_user_raises(store):
+    with pytest.raises(KeyError):
+        store.replace_app_data('ghost', {'subjects': []})
+    assert not store.exists('ghost')
+    assert store.load('ghost') is None
+
+
+def test_replace_app_data_keeps_account_fields(store):
+    store.create('alice', {'password': 'hash', 'email': 'alice@example.com', 'app_data': {}})
+    revision = store.replace_app_data('alice', {'subjects': [{'id': 1}]})
+    user = store.load('alice')
+    assert user['password'] == 'hash'
+    assert user['email'] == 'alice@example.com'
+    assert user['app_data']['subjects'] == [{'id': 1}]
+    assert store.revision('alice') == revision
+
+
+def test_find_by_email_ignores_case_and_spaces(store):
+    store.create('alice', {'password': 'hash', 'email': 'Alice@Example.com', 'app_data': {}})
+    assert store.find_by_email(' alice@example.COM ') == 'alice'
+    assert store.find_by_email('bob@example.com') is None
+
+
+def test_index_rebuild_does_not_drop_a_concurrent_signup(tmp_path):
+    store = open_user_store('json', data_dir=str(tmp_path / 'users'))
+    store.create('alice', {'password': 'hash', 'google_id': 'g-alice', 'app_data': {}})
+    os.remove(store.index_path)
+
+    scanned, resume = threading.Event(), threading.Event()
+    scan = store.iter_users
+
+    def slow_scan():
+        users = list(scan())
+        scanned.set()
+        resume.wait(10)
+        yield from users
+
+    store.iter_users = slow_scan
+    reader = threading.Thread(target=store.find_by_google_id, args=('g-alice',))
+    reader.start()
+    assert scanned.wait(10)
+    # A second handle, as another worker process would have
+    other = open_user_store('json', data_dir=str(tmp_path / 'users'))
+    writer = threading.Thread(target=other.create, args=('bob', {'password': '', 'google_id': 'g-bob', 'app_data': {}}))
+    writer.start()
+    writer.join(0.3)
+    resume.set()
+    reader.join(10)
+    writer.join(10)
+
+    fresh = open_user_store('json', data_dir=str(tmp_path / 'users'))
+    assert fresh.find_by_google_id('g-bob') == 'bob'
+    assert fresh.find_by_google_id('g-alice') == 'alice'
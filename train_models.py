@@ -1,275 +1,396 @@
 # train_models.py - Comprehensive Model Training with Real Datasets
 
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split, GridSearchCV, cross_val_score
+from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import accuracy_score, r2_score, mean_squared_error, classification_report
-import pickle
-import os
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 
-from grade_predictor_model import GradePredictor
+from grade_predictor_model import GradePredictor, GRADE_FEATURES
 from attendance_risk import AttendanceRiskPredictor
 from study_optimizer import StudyTimeOptimizer
+from model_registry import ModelRegistry, MODELS_DIR
+import synthetic_data
+from out_of_core import read_dataset_chunks, RowSample, NormalEquations, HeldOutMetrics
+from tuning import (
+    SEARCH_SPACES, TUNING_CACHE_FILE, TuningCache, load_tuned_params, save_tuned_params,
+    successive_halving, select_config
+)
 
 class RealDatasetGenerator:
-    """Generate realistic academic datasets based on real-world patterns"""
+    """Generate realistic academic datasets based on real-world patterns
+    
+    Thin wrappers over the vectorized generators in synthetic_data; use
+    synthetic_data.write_dataset for corpora too large for memory.
+    """
     
     @staticmethod
-    def generate_grade_dataset(n_samples=5000):
+    def generate_grade_dataset(n_samples=5000, seed=42):
         """Generate realistic grade prediction dataset"""
-        np.random.seed(42)
-        
-        data = []
-        for _ in range(n_samples):
-            # Realistic distributions
-            attendance = np.random.beta(8, 2) * 100
-            study_hours = np.random.gamma(3, 2) * 5
-            study_hours = np.clip(study_hours, 0, 35)
-            
-            # Correlated scores
-            base_ability = np.random.normal(70, 15)
-            
-            midterm = base_ability + (attendance/100 * 15) + (study_hours/35 * 10) + np.random.normal(0, 8)
-            midterm = np.clip(midterm, 0, 100)
-            
-            assignment = base_ability + (study_hours/35 * 15) + np.random.normal(0, 10)
-            assignment = np.clip(assignment, 0, 100)
-            
-            quiz = base_ability + (attendance/100 * 10) + np.random.normal(0, 12)
-            quiz = np.clip(quiz, 0, 100)
-            
-            # Final grade calculation
-            final_grade = (
-                attendance * 0.15 +
-                midterm * 0.35 +
-                assignment * 0.25 +
-                quiz * 0.15 +
-                (study_hours/35 * 100) * 0.10
-            )
-            final_grade += np.random.normal(0, 5)
-            final_grade = np.clip(final_grade, 0, 100)
-            
-            data.append({
-                'attendance': attendance,
-                'study_hours': study_hours,
-                'midterm': midterm,
-                'assignment': assignment,
-                'quiz': quiz,
-                'final_grade': final_grade
-            })
-        
-        return pd.DataFrame(data)
+        return synthetic_data.generate('grade', n_samples, seed)
     
     @staticmethod
-    def generate_attendance_risk_dataset(n_samples=3000):
+    def generate_attendance_risk_dataset(n_samples=3000, seed=42):
         """Generate realistic attendance risk dataset"""
-        np.random.seed(42)
-        
-        data = []
-        for _ in range(n_samples):
-            current_att = np.random.beta(7, 2) * 100
-            trend = np.random.normal(0, 3)
-            days_left = np.random.randint(5, 90)
-            recent_absences = np.random.poisson(2)
-            
-            # Calculate risk
-            projected = current_att + (trend * (days_left / 30))
-            
-            risk = 0
-            if projected < 70:
-                risk = 1
-            elif projected < 75 and trend < -1:
-                risk = 1
-            elif current_att < 75 and recent_absences > 3:
-                risk = 1
-            
-            data.append({
-                'current_attendance': current_att,
-                'trend': trend,
-                'days_left': days_left,
-                'recent_absences': recent_absences,
-                'risk': risk
-            })
-        
-        return pd.DataFrame(data)
+        return synthetic_data.generate('attendance_risk', n_samples, seed)
     
     @staticmethod
-    def generate_study_optimizer_dataset(n_samples=4000):
+    def generate_study_optimizer_dataset(n_samples=4000, seed=42):
         """Generate realistic study time optimization dataset"""
-        np.random.seed(42)
-        
-        data = []
-        for _ in range(n_samples):
-            difficulty = np.random.choice([3, 4, 5, 6, 7, 8], p=[0.1, 0.2, 0.3, 0.2, 0.15, 0.05])
-            current_grade = np.random.beta(6, 2) * 60 + 40
-            days_to_exam = np.random.gamma(3, 10)
-            days_to_exam = min(90, max(1, days_to_exam))
-            attendance = np.random.beta(8, 2) * 100
-            
-            # Calculate recommended hours
-            base_hours = difficulty * 0.6
-            grade_factor = max(0, (85 - current_grade) / 15)
-            urgency_factor = max(0.5, min(3, 40 / days_to_exam))
-            attendance_factor = max(0, (85 - attendance) / 40)
-            
-            recommended = base_hours + grade_factor + urgency_factor + attendance_factor
-            recommended = max(2, min(25, recommended))
-            recommended += np.random.normal(0, 0.5)
-            recommended = max(1, min(25, recommended))
-            
-            data.append({
-                'difficulty': difficulty,
-                'current_grade': current_grade,
-                'days_to_exam': days_to_exam,
-                'attendance': attendance,
-                'recommended_hours': recommended
-            })
-        
-        return pd.DataFrame(data)
+        return synthetic_data.generate('study_optimizer', n_samples, seed)
+
+
+# name -> (dataset generator, samples, feature columns, target column)
+TRAINING_STAGES = {
+    'grade_predictor': (RealDatasetGenerator.generate_grade_dataset, 5000, GRADE_FEATURES, 'final_grade'),
+    'attendance_risk': (
+        RealDatasetGenerator.generate_attendance_risk_dataset, 3000,
+        ['current_attendance', 'trend', 'days_left', 'recent_absences'], 'risk'
+    ),
+    'study_optimizer': (
+        RealDatasetGenerator.generate_study_optimizer_dataset, 4000,
+        ['difficulty', 'current_grade', 'days_to_exam', 'attendance'], 'recommended_hours'
+    ),
+}
+
+MODEL_CLASSES = {
+    'grade_predictor': GradePredictor,
+    'attendance_risk': AttendanceRiskPredictor,
+    'study_optimizer': StudyTimeOptimizer,
+}
+
+TITLES = {
+    'grade_predictor': 'GRADE PREDICTOR MODEL',
+    'attendance_risk': 'ATTENDANCE RISK PREDICTOR',
+    'study_optimizer': 'STUDY TIME OPTIMIZER',
+}
+
+
+def fit_stage(name, X_train, y_train, n_jobs=None, params=None):
+    """Train one model on its training split; runs in a worker process
+
+    params are tuned hyperparameters for the tree models, if any.
+    Returns (model, cv_metrics, seconds).
+    """
+    start = time.perf_counter()
+    if name == 'grade_predictor':
+        model = GradePredictor(params)
+        cv_metrics = model.train_models(data=(X_train, y_train), n_jobs=n_jobs)
+    elif name == 'study_optimizer':
+        # The constructor trains it
+        model = StudyTimeOptimizer(data=(X_train, y_train), n_jobs=n_jobs, params=params)
+        cv_metrics = model.cv_metrics
+    else:
+        model = AttendanceRiskPredictor(data=(X_train, y_train), n_jobs=n_jobs)
+        cv_metrics = model.cv_metrics
+    return model, {key: float(value) for key, value in cv_metrics.items()}, time.perf_counter() - start
+
+
+def predict_target(name, model, X):
+    """Predictions on the scale of the dataset's target column (the class, for attendance risk)"""
+    if name == 'grade_predictor':
+        return model.predict_scores(X)
+    if name == 'attendance_risk':
+        return model.model.predict(X)
+    return model.score_rows(X)
+
+
+def train_out_of_core(name, path, chunk_size=100_000, max_forest_rows=200_000, epochs=3, seed=42, n_jobs=None,
+                      params=None):
+    """Train a model from a dataset file without loading the file into memory
+
+    Each chunk's rows are split 80/20 into training and held-out rows. The
+    first pass fits the feature scaler and keeps a uniform sample of at most
+    max_forest_rows training rows for the forests. Ridge is then solved
+    exactly from normal equations accumulated over every training row, and
+    the risk model is a logistic-loss SGD classifier fitted with partial_fit
+    over `epochs` passes. A last pass scores the held-out rows. params are
+    tuned hyperparameters for the tree models, if any. Returns (model, metrics).
+    """
+    features, target = TRAINING_STAGES[name][2:]
+    columns = list(features) + [target]
+
+    def chunks():
+        for i, (X, y) in enumerate(read_dataset_chunks(path, columns, chunk_size)):
+            train = np.random.default_rng([seed, i]).random(len(y)) >= 0.2
+            yield X, y, train
+
+    # Pass 1: feature scaling and the forests' training sample
+    scaler = StandardScaler()
+    sample = RowSample(max_forest_rows, seed)
+    n_train = 0
+    for X, y, train in chunks():
+        if train.any():
+            scaler.partial_fit(X[train])
+            if name != 'attendance_risk':
+                sample.add(X[train], y[train])
+            n_train += int(train.sum())
+    if n_train == 0:
+        raise ValueError(f"{path} has no training rows")
+    X_sample, y_sample = sample.rows()
+
+    if name == 'grade_predictor':
+        model = GradePredictor(params)
+        model.scaler = scaler
+        X_scaled = scaler.transform(X_sample)
+        model.rf_model.set_params(n_jobs=n_jobs)
+        model.rf_model.fit(X_scaled, y_sample)
+        model.rf_model.set_params(n_jobs=None)
+        model.gb_model.fit(X_scaled, y_sample)
+
+        normal = NormalEquations(len(features))
+        for X, y, train in chunks():
+            normal.add(scaler.transform(X[train]), y[train])
+        normal.fit(model.ridge_model)
+        model.is_trained = True
+        model.compile(X_sample[:1000])
+    elif name == 'attendance_risk':
+        model = AttendanceRiskPredictor(train=False)
+        classifier = SGDClassifier(loss='log_loss', random_state=seed)
+        for _ in range(epochs):
+            for X, y, train in chunks():
+                if train.any():
+                    classifier.partial_fit(scaler.transform(X[train]), y[train].astype(np.int64), classes=[0, 1])
+        model.model = make_pipeline(scaler, classifier)
+    else:
+        model = StudyTimeOptimizer(train=False, params=params)
+        model.scaler = scaler
+        model.model = model.build_forest(n_jobs, model.forest_params)
+        model.model.fit(scaler.transform(X_sample), y_sample)
+        model.is_trained = True
+
+    # Last pass: held-out metrics
+    held_out = HeldOutMetrics(classifier=name == 'attendance_risk')
+    for X, y, train in chunks():
+        if not train.all():
+            held_out.add(y[~train], predict_target(name, model, X[~train]))
+
+    metrics = {**held_out.result(), 'training_rows': n_train, 'test_rows': held_out.count}
+    if name != 'attendance_risk':
+        metrics['forest_rows'] = len(y_sample)
+    return model, metrics
 
 
 class ModelTrainer:
-    """Train and optimize all ML models"""
+    """Train and optimize all ML models
+
+    n_jobs is the total number of cores to use (default: all of them). When
+    training everything, the three models train at once in separate
+    processes and share the cores between their CV folds. Hyperparameters
+    saved by tune() are used for the tree models.
+    """
+    
+    def __init__(self, models_dir=MODELS_DIR, n_jobs=None):
+        self.models_dir = models_dir
+        self.registry = ModelRegistry(models_dir)
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.tuned_params = load_tuned_params(models_dir)
+        self.timings = {}
+    
+    def _timed(self, stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.timings[stage] = time.perf_counter() - start
+        return result
     
-    def __init__(self):
-        self.models_dir = 'trained_models'
-        if not os.path.exists(self.models_dir):
-            os.makedirs(self.models_dir)
+    def prepare_dataset(self, name):
+        """Generate a model's dataset and split it 80/20 into (X_train, X_test, y_train, y_test)"""
+        generate, n_samples, features, target = TRAINING_STAGES[name]
+        df = self._timed(f"{name}: generate", generate, n_samples)
+        return train_test_split(df[features].values, df[target].values, test_size=0.2, random_state=42)
     
-    def train_grade_predictor(self):
-        """Train grade predictor with hyperparameter tuning"""
+    def report(self, name, metrics, n_test):
+        """Print held-out metrics"""
         print("\n" + "="*60)
-        print("TRAINING GRADE PREDICTOR MODEL")
+        print(f"{TITLES[name]} - HELD-OUT PERFORMANCE")
         print("="*60)
-        
-        # Generate dataset
-        print("Generating realistic grade dataset...")
-        df = RealDatasetGenerator.generate_grade_dataset(5000)
-        
-        X = df[['attendance', 'study_hours', 'midterm', 'assignment', 'quiz']].values
-        y = df['final_grade'].values
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        print(f"Training samples: {len(X_train)}")
-        print(f"Testing samples: {len(X_test)}")
-        
-        # Train model
-        predictor = GradePredictor()
-        predictor.train_models()
-        
-        # Evaluate
-        from sklearn.preprocessing import StandardScaler
-        scaler = StandardScaler()
-        X_test_scaled = scaler.fit_transform(X_test)
-        
-        print("\nModel Performance:")
+        print(f"Testing samples: {n_test}")
         print("-" * 40)
-        
-        # Save model
-        model_path = os.path.join(self.models_dir, 'grade_predictor.pkl')
-        with open(model_path, 'wb') as f:
-            pickle.dump(predictor, f)
-        print(f"\nModel saved to: {model_path}")
-        
-        return predictor
+        if 'test_accuracy' in metrics:
+            print(f"Test Accuracy: {metrics['test_accuracy']:.4f}")
+        else:
+            unit = 'points' if name == 'grade_predictor' else 'hours'
+            print(f"Test R² Score: {metrics['test_r2']:.4f}")
+            print(f"Test RMSE: {metrics['test_rmse']:.4f} {unit}")
     
-    def train_attendance_risk(self):
-        """Train attendance risk predictor"""
+    def evaluate(self, name, model, X_test, y_test):
+        """Print held-out performance and return it as metrics"""
+        y_pred = predict_target(name, model, X_test)
+        if name == 'attendance_risk':
+            metrics = {'test_accuracy': float(accuracy_score(y_test, y_pred))}
+        else:
+            metrics = {
+                'test_r2': float(r2_score(y_test, y_pred)),
+                'test_rmse': float(np.sqrt(mean_squared_error(y_test, y_pred)))
+            }
+        self.report(name, metrics, len(X_test))
+        
+        if name == 'attendance_risk':
+            print("\nClassification Report:")
+            print(classification_report(y_test, y_pred, target_names=['Low Risk', 'High Risk']))
+        return metrics
+    
+    def save(self, name, model, metrics):
+        entry = self._timed(
+            f"{name}: save", self.registry.save, name, model, MODEL_CLASSES[name].MODEL_VERSION, metrics
+        )
+        print(f"\nModel saved to: {self.registry.artifact_path(name)} (revision {entry['revision']})")
+    
+    def train_model(self, name, dataset=None, n_jobs=None):
+        """Generate (or reuse) a dataset, train on its training split, evaluate and save"""
         print("\n" + "="*60)
-        print("TRAINING ATTENDANCE RISK PREDICTOR")
+        print(f"TRAINING {TITLES[name]}")
         print("="*60)
         
-        # Generate dataset
-        print("Generating realistic attendance risk dataset...")
-        df = RealDatasetGenerator.generate_attendance_risk_dataset(3000)
-        
-        X = df[['current_attendance', 'trend', 'days_left', 'recent_absences']].values
-        y = df['risk'].values
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
+        X_train, X_test, y_train, y_test = dataset or self.prepare_dataset(name)
         print(f"Training samples: {len(X_train)}")
-        print(f"Testing samples: {len(X_test)}")
-        
-        # Train model
-        risk_predictor = AttendanceRiskPredictor()
-        risk_predictor.train_model()
-        
-        # Evaluate
-        y_pred = risk_predictor.model.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
-        
-        print("\nModel Performance:")
-        print("-" * 40)
-        print(f"Test Accuracy: {accuracy:.4f}")
-        print("\nClassification Report:")
-        print(classification_report(y_test, y_pred, target_names=['Low Risk', 'High Risk']))
         
-        # Save model
-        model_path = os.path.join(self.models_dir, 'attendance_risk.pkl')
-        with open(model_path, 'wb') as f:
-            pickle.dump(risk_predictor, f)
-        print(f"\nModel saved to: {model_path}")
-        
-        return risk_predictor
+        model, cv_metrics, seconds = fit_stage(
+            name, X_train, y_train, n_jobs or self.n_jobs, self.tuned_params.get(name)
+        )
+        self.timings[f"{name}: train"] = seconds
+        self.save(name, model, {**cv_metrics, **self.evaluate(name, model, X_test, y_test)})
+        return model
     
-    def train_study_optimizer(self):
-        """Train study time optimizer"""
+    def train_from_file(self, name, path, chunk_size=100_000, max_forest_rows=200_000, epochs=3):
+        """Train a model out of core from a .parquet, .csv or .npy dataset file, evaluate and save"""
         print("\n" + "="*60)
-        print("TRAINING STUDY TIME OPTIMIZER")
+        print(f"TRAINING {TITLES[name]} FROM {path}")
         print("="*60)
         
-        # Generate dataset
-        print("Generating realistic study optimization dataset...")
-        df = RealDatasetGenerator.generate_study_optimizer_dataset(4000)
-        
-        X = df[['difficulty', 'current_grade', 'days_to_exam', 'attendance']].values
-        y = df['recommended_hours'].values
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        print(f"Training samples: {len(X_train)}")
-        print(f"Testing samples: {len(X_test)}")
-        
-        # Train model
-        optimizer = StudyTimeOptimizer()
-        optimizer.train_model()
-        
-        # Evaluate
-        X_test_scaled = optimizer.scaler.transform(X_test)
-        y_pred = optimizer.model.predict(X_test_scaled)
-        
-        r2 = r2_score(y_test, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        
-        print("\nModel Performance:")
-        print("-" * 40)
-        print(f"Test R² Score: {r2:.4f}")
-        print(f"Test RMSE: {rmse:.4f} hours")
-        
-        # Save model
-        model_path = os.path.join(self.models_dir, 'study_optimizer.pkl')
-        with open(model_path, 'wb') as f:
-            pickle.dump(optimizer, f)
-        print(f"\nModel saved to: {model_path}")
+        model, metrics = self._timed(
+            f"{name}: train", train_out_of_core, name, path, chunk_size, max_forest_rows, epochs, 42, self.n_jobs,
+            self.tuned_params.get(name)
+        )
+        print(f"Training samples: {metrics['training_rows']}")
+        if 'forest_rows' in metrics:
+            print(f"Forest training sample: {metrics['forest_rows']}")
+        self.report(name, metrics, metrics['test_rows'])
+        self.save(name, model, metrics)
+        return model
+    
+    def tuning_data(self, name, path=None, max_rows=50_000, seed=42):
+        """(X, y, dataset_id) to tune on: the synthetic training split, or a sample of a dataset file"""
+        if path is None:
+            X_train, _, y_train, _ = self.prepare_dataset(name)
+            return X_train, y_train, f"synthetic:{name}:{len(y_train)}"
+        
+        features, target = TRAINING_STAGES[name][2:]
+        sample = RowSample(max_rows, seed)
+        for X, y in read_dataset_chunks(path, list(features) + [target]):
+            sample.add(X, y)
+        X, y = sample.rows()
+        # Shuffle, so every prefix used by successive halving is a random subset
+        order = np.random.default_rng(seed).permutation(len(y))
+        stat = os.stat(path)
+        return X[order], y[order], f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}:{max_rows}:{seed}"
+    
+    def tune(self, targets=None, data_paths=None, max_rows=50_000, n_candidates=27, factor=3, cv=3,
+             tolerance=0.005, seed=42):
+        """Successive-halving search over the tree models' hyperparameters
+        
+        For each target, the configuration with the fewest tree-node visits per
+        prediction whose CV R² is within `tolerance` of the best is saved to
+        tuned_params.json and used by later training runs. Every evaluated
+        configuration is cached, so re-running resumes instead of starting over.
+        """
+        targets = targets or list(SEARCH_SPACES)
+        data_paths = data_paths or {}
+        cache = TuningCache(os.path.join(self.models_dir, TUNING_CACHE_FILE))
+        
+        datasets = {}
+        params, report = {}, {}
+        for target in targets:
+            name, component = SEARCH_SPACES[target][:2]
+            print("\n" + "="*60)
+            print(f"TUNING {target}")
+            print("="*60)
+            if name not in datasets:
+                datasets[name] = self._timed(
+                    f"{name}: tuning data", self.tuning_data, name, data_paths.get(name), max_rows, seed
+                )
+            X, y, dataset_id = datasets[name]
+            
+            results = self._timed(
+                f"{target}: search", successive_halving, target, X, y, cache, dataset_id,
+                n_candidates, factor, cv, self.n_jobs, seed
+            )
+            chosen, result = select_config(results, tolerance)
+            best = results[0][1]
+            
+            print("\nFinalists (CV R², node visits, single-row predict ms):")
+            for candidate, candidate_result in results:
+                marker = '*' if candidate is chosen else ' '
+                print(f" {marker} {candidate_result['cv_r2']:.4f}  {candidate_result['node_visits']:6d}  "
+                      f"{candidate_result['predict_ms']:7.2f}  {candidate}")
+            print(f"Chosen: {chosen} (best CV R² {best['cv_r2']:.4f}, tolerance {tolerance})")
+            
+            params.setdefault(name, {})[component] = chosen
+            report.setdefault(name, {})[component] = {**result, 'best_cv_r2': best['cv_r2'], 'rows': len(y)}
         
-        return optimizer
+        save_tuned_params(self.models_dir, params, report)
+        self.tuned_params = load_tuned_params(self.models_dir)
+        print(f"\nSaved tuned hyperparameters to {self.models_dir}/ - run 'python train_models.py' to retrain")
+        return params
+    
+    def train_grade_predictor(self, dataset=None):
+        """Train grade predictor ensemble"""
+        return self.train_model('grade_predictor', dataset)
+    
+    def train_attendance_risk(self, dataset=None):
+        """Train attendance risk predictor"""
+        return self.train_model('attendance_risk', dataset)
+    
+    def train_study_optimizer(self, dataset=None):
+        """Train study time optimizer"""
+        return self.train_model('study_optimizer', dataset)
     
-    def train_all_models(self):
-        """Train all models"""
+    def train_all_models(self, parallel=True):
+        """Train all models, concurrently in a process pool unless parallel=False"""
         print("\n" + "="*60)
         print("ORDINARE ML MODEL TRAINING PIPELINE")
         print("="*60)
         print("Training all models with realistic datasets...")
         
-        # Train all models
-        grade_predictor = self.train_grade_predictor()
-        risk_predictor = self.train_attendance_risk()
-        optimizer = self.train_study_optimizer()
+        start = time.perf_counter()
+        self.timings = {}
+        
+        # Each dataset is generated once and reused for training and evaluation
+        print("Generating datasets...")
+        datasets = {name: self.prepare_dataset(name) for name in TRAINING_STAGES}
+        
+        models = {}
+        if not parallel or self.n_jobs <= 1:
+            for name in TRAINING_STAGES:
+                models[name] = self.train_model(name, datasets[name])
+        else:
+            # Give the heaviest model (grade ensemble) whatever cores are left over
+            share = max(1, self.n_jobs // len(TRAINING_STAGES))
+            n_jobs = {name: share for name in TRAINING_STAGES}
+            n_jobs['grade_predictor'] = max(1, self.n_jobs - share * (len(TRAINING_STAGES) - 1))
+            print(f"Training {len(TRAINING_STAGES)} models in parallel on {self.n_jobs} cores...")
+            
+            with ProcessPoolExecutor(max_workers=len(TRAINING_STAGES)) as pool:
+                futures = {
+                    pool.submit(fit_stage, name, X_train, y_train, n_jobs[name], self.tuned_params.get(name)): name
+                    for name, (X_train, _, y_train, _) in datasets.items()
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    model, cv_metrics, seconds = future.result()
+                    self.timings[f"{name}: train"] = seconds
+                    _, X_test, _, y_test = datasets[name]
+                    self.save(name, model, {**cv_metrics, **self.evaluate(name, model, X_test, y_test)})
+                    models[name] = model
+        
+        self.timings['total'] = time.perf_counter() - start
         
         print("\n" + "="*60)
         print("TRAINING COMPLETE!")
@@ -279,17 +400,65 @@ class ModelTrainer:
         print("  1. Grade Predictor (Ensemble: RF + GB + Ridge)")
         print("  2. Attendance Risk Predictor (Logistic Regression)")
         print("  3. Study Time Optimizer (Random Forest)")
+        print("\nWall time per stage:")
+        for stage, seconds in self.timings.items():
+            print(f"  {stage:<32} {seconds:8.2f}s")
         
         return {
-            'grade_predictor': grade_predictor,
-            'risk_predictor': risk_predictor,
-            'study_optimizer': optimizer
+            'grade_predictor': models['grade_predictor'],
+            'risk_predictor': models['attendance_risk'],
+            'study_optimizer': models['study_optimizer']
         }
 
 
 if __name__ == '__main__':
-    trainer = ModelTrainer()
-    models = trainer.train_all_models()
+    parser = argparse.ArgumentParser(description='Train all Ordinare ML models')
+    parser.add_argument('--n-jobs', type=int, default=None, help='Cores to use (default: all)')
+    parser.add_argument('--sequential', action='store_true', help='Train one model at a time')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--data', action='append', default=[], metavar='MODEL=PATH',
+                        help='Train MODEL out of core from a .parquet, .csv or .npy file (repeatable)')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='Rows read per chunk with --data')
+    parser.add_argument('--max-forest-rows', type=int, default=200_000,
+                        help='Size of the row sample the forests are fitted on with --data')
+    parser.add_argument('--epochs', type=int, default=3, help='Passes over the data for the SGD risk model')
+    
+    subparsers = parser.add_subparsers(dest='command')
+    tune_parser = subparsers.add_parser('tune', help='Search hyperparameters for the tree models')
+    tune_parser.add_argument('targets', nargs='*', metavar='TARGET',
+                             help=f"Components to tune: {', '.join(SEARCH_SPACES)} (default: all)")
+    tune_parser.add_argument('--candidates', type=int, default=27, help='Random configurations to start with')
+    tune_parser.add_argument('--factor', type=int, default=3, help='Keep 1/factor of configurations per rung')
+    tune_parser.add_argument('--cv', type=int, default=3, help='Cross-validation folds')
+    tune_parser.add_argument('--tolerance', type=float, default=0.005,
+                             help='Accept a cheaper model if its CV R² is within this of the best')
+    tune_parser.add_argument('--max-rows', type=int, default=50_000, help='Rows sampled from --data files')
+    tune_parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    if args.command == 'tune' and set(args.targets) - set(SEARCH_SPACES):
+        parser.error(f"tune targets must be among {', '.join(SEARCH_SPACES)}")
+    
+    data_paths = {}
+    for spec in args.data:
+        name, _, path = spec.partition('=')
+        if name not in TRAINING_STAGES or not path:
+            parser.error(f"--data expects MODEL=PATH with MODEL one of {', '.join(TRAINING_STAGES)}")
+        data_paths[name] = path
+    
+    trainer = ModelTrainer(args.models_dir, n_jobs=args.n_jobs)
+    if args.command == 'tune':
+        trainer.tune(args.targets, data_paths, args.max_rows, args.candidates, args.factor, args.cv,
+                     args.tolerance, args.seed)
+        for stage, seconds in trainer.timings.items():
+            print(f"  {stage:<32} {seconds:8.2f}s")
+    elif data_paths:
+        for name, path in data_paths.items():
+            trainer.train_from_file(name, path, args.chunk_size, args.max_forest_rows, args.epochs)
+        for stage, seconds in trainer.timings.items():
+            print(f"  {stage:<32} {seconds:8.2f}s")
+    else:
+        models = trainer.train_all_models(parallel=not args.sequential)
     
     print("\n" + "="*60)
     print("Ready to use! Run 'python app.py' to start the application.")
@@ -0,0 +1,196 @@
+# tuning.py - Successive-halving Hyperparameter Search with a Resumable Result Cache
+
+import os
+import json
+import time
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.model_selection import KFold, cross_validate
+
+from grade_predictor_model import GradePredictor
+from study_optimizer import StudyTimeOptimizer
+from storage import atomic_write_json
+
+# Chosen hyperparameters, read by the trainers: {model: {component: params}}
+TUNED_PARAMS_FILE = 'tuned_params.json'
+# One JSON line per evaluated (configuration, training rows) pair
+TUNING_CACHE_FILE = 'tuning_cache.jsonl'
+
+# target -> (model, component, estimator class, default params, search space)
+SEARCH_SPACES = {
+    'grade_predictor.rf': ('grade_predictor', 'rf', RandomForestRegressor, GradePredictor.RF_PARAMS, {
+        'n_estimators': [25, 50, 100, 200, 300],
+        'max_depth': [4, 6, 8, 10, 12],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4, 8],
+    }),
+    'grade_predictor.gb': ('grade_predictor', 'gb', GradientBoostingRegressor, GradePredictor.GB_PARAMS, {
+        'n_estimators': [25, 50, 100, 150, 200],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'max_depth': [2, 3, 4, 5],
+    }),
+    'study_optimizer.rf': ('study_optimizer', 'rf', RandomForestRegressor, StudyTimeOptimizer.FOREST_PARAMS, {
+        'n_estimators': [25, 50, 100, 200],
+        'max_depth': [6, 8, 10, 15, 20],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4, 8],
+    }),
+}
+
+
+def load_tuned_params(models_dir):
+    """{model: {component: params}} chosen by the last tuning run, or {} if never tuned"""
+    try:
+        with open(os.path.join(models_dir, TUNED_PARAMS_FILE), 'r') as f:
+            return json.load(f).get('params', {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+class TuningCache:
+    """Append-only JSON-lines file of CV results, so an interrupted search resumes where it stopped"""
+
+    def __init__(self, path):
+        self.path = path
+        self._results = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # half-written last line
+                    self._results[entry['key']] = entry['result']
+
+    @staticmethod
+    def key(target, params, dataset_id, n_rows, cv):
+        return json.dumps([target, params, dataset_id, n_rows, cv], sort_keys=True)
+
+    def get(self, key):
+        return self._results.get(key)
+
+    def put(self, key, result):
+        self._results[key] = result
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({'key': key, 'result': result}) + '\n')
+
+
+def node_visits(estimator):
+    """Tree nodes walked per prediction (sum of tree depths), a proxy for inference latency"""
+    trees = estimator.estimators_
+    if isinstance(trees, np.ndarray):
+        trees = trees.ravel()
+    return int(sum(tree.tree_.max_depth for tree in trees))
+
+
+def evaluate_config(target, params, X, y, cv=3, seed=42):
+    """Cross-validated R², fit time and inference cost of one configuration (runs in a worker process)"""
+    estimator_class = SEARCH_SPACES[target][2]
+    scores = cross_validate(
+        estimator_class(**params, random_state=seed), X, y,
+        cv=KFold(cv, shuffle=True, random_state=seed), scoring='r2', return_estimator=True
+    )
+    estimator = scores['estimator'][0]
+    row = X[:1]
+    timings = []
+    for _ in range(10):
+        start = time.perf_counter()
+        estimator.predict(row)
+        timings.append(time.perf_counter() - start)
+    return {
+        'cv_r2': float(np.mean(scores['test_score'])),
+        'cv_std': float(np.std(scores['test_score'])),
+        'fit_seconds': float(np.mean(scores['fit_time'])),
+        'node_visits': int(np.mean([node_visits(e) for e in scores['estimator']])),
+        'predict_ms': float(np.median(timings) * 1000),
+    }
+
+
+def sample_configs(target, n_candidates, seed=42):
+    """The default configuration followed by distinct random draws from the search space"""
+    _, _, _, defaults, space = SEARCH_SPACES[target]
+    rng = np.random.default_rng(seed)
+    configs = [dict(defaults)]
+    seen = {json.dumps(configs[0], sort_keys=True)}
+    size = math.prod(len(values) for values in space.values())
+    while len(configs) < min(n_candidates, size + 1):
+        config = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        config = {name: value.item() if hasattr(value, 'item') else value for name, value in config.items()}
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def successive_halving(target, X, y, cache, dataset_id, n_candidates=27, factor=3, cv=3,
+                       n_jobs=1, seed=42, min_rows=300):
+    """Race random configurations on growing training subsets, keeping the best 1/factor each rung
+
+    The last rung trains on all rows and keeps at least `factor` finalists.
+    Configurations are evaluated in parallel across n_jobs processes; results
+    already in the cache are reused. Returns the last rung's results, best first.
+    """
+    candidates = sample_configs(target, n_candidates, seed)
+    rungs = max(1, int(math.log(max(len(candidates) / factor, 1), factor)) + 1)
+
+    results = []
+    for rung in range(rungs):
+        n_rows = len(y) if rung == rungs - 1 else max(min_rows, len(y) // factor ** (rungs - 1 - rung))
+        n_rows = min(n_rows, len(y))
+        X_rung, y_rung = X[:n_rows], y[:n_rows]
+
+        results = []
+        pending = {}
+        for params in candidates:
+            key = cache.key(target, params, dataset_id, n_rows, cv)
+            cached = cache.get(key)
+            if cached is not None:
+                results.append((params, cached))
+            else:
+                pending[key] = params
+
+        print(f"{target} rung {rung + 1}/{rungs}: {len(candidates)} configs on {n_rows} rows "
+              f"({len(candidates) - len(pending)} cached)")
+        if pending:
+            with ProcessPoolExecutor(max_workers=max(1, min(n_jobs, len(pending)))) as pool:
+                futures = {
+                    pool.submit(evaluate_config, target, params, X_rung, y_rung, cv, seed): key
+                    for key, params in pending.items()
+                }
+                for future in as_completed(futures):
+                    key = futures[future]
+                    result = future.result()
+                    cache.put(key, result)
+                    results.append((pending[key], result))
+
+        results.sort(key=lambda item: item[1]['cv_r2'], reverse=True)
+        if rung < rungs - 1:
+            candidates = [params for params, _ in results[:max(factor, len(results) // factor)]]
+    return results
+
+
+def select_config(results, tolerance=0.005):
+    """Cheapest configuration (fewest node visits) whose CV R² is within tolerance of the best"""
+    best = max(result['cv_r2'] for _, result in results)
+    eligible = [(params, result) for params, result in results if result['cv_r2'] >= best - tolerance]
+    return min(eligible, key=lambda item: (item[1]['node_visits'], -item[1]['cv_r2']))
+
+
+def save_tuned_params(models_dir, params, report):
+    """Merge newly tuned components into tuned_params.json"""
+    path = os.path.join(models_dir, TUNED_PARAMS_FILE)
+    try:
+        with open(path, 'r') as f:
+            existing = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        existing = {}
+    for section, values in (('params', params), ('report', report)):
+        merged = existing.setdefault(section, {})
+        for model, components in values.items():
+            merged.setdefault(model, {}).update(components)
+    atomic_write_json(path, existing, indent=4)
+    return existing
@@ -0,0 +1,192 @@
+# user_codec.py - Compact Binary Encoding of User Documents
+
+import json
+from datetime import date
+from itertools import accumulate
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# File header: magic, then one byte naming the container format
+MAGIC = b'ORD1'
+MSGPACK = b'M'
+JSON = b'J'
+
+SESSION_FIELDS = ('subject', 'date', 'duration')
+
+
+def _parse_iso_day(text):
+    """Day ordinal of a YYYY-MM-DD string, or None unless it round-trips exactly"""
+    try:
+        day = date.fromisoformat(text)
+    except ValueError:
+        return None
+    return day.toordinal() if day.isoformat() == text else None
+
+
+def _parse_dmy_day(text):
+    """Day ordinal of a dd/mm/yyyy string, or None unless it round-trips exactly"""
+    if not isinstance(text, str) or len(text) != 10 or text[2] != '/' or text[5] != '/':
+        return None
+    return _parse_iso_day(f"{text[6:]}-{text[3:5]}-{text[:2]}")
+
+
+def pack_records(subject_id, records, slots, slot_index):
+    """Attendance records -> {'days', 'codes', 'extra'}
+
+    A record {'key': '<subject>-<YYYY-MM-DD>-<slot>', 'status': present|absent}
+    becomes a day ordinal (delta-coded against the previous record) and a
+    code of slot index * 2 + present. Records in any other shape are kept
+    verbatim in extra as [position, record], so unpacking is lossless.
+    """
+    prefix = f"{subject_id}-"
+    days, codes, extra = [], [], []
+    previous = 0
+    for position, record in enumerate(records):
+        key = record.get('key') if isinstance(record, dict) else None
+        status = record.get('status') if isinstance(record, dict) else None
+        day = None
+        if (isinstance(key, str) and len(record) == 2 and status in ('present', 'absent')
+                and key.startswith(prefix) and key[len(prefix) + 10:len(prefix) + 11] == '-'):
+            day = _parse_iso_day(key[len(prefix):len(prefix) + 10])
+        if day is None:
+            extra.append([position, record])
+            continue
+        slot = key[len(prefix) + 11:]
+        if slot not in slot_index:
+            slot_index[slot] = len(slots)
+            slots.append(slot)
+        days.append(day - previous)
+        previous = day
+        codes.append(slot_index[slot] * 2 + (status == 'present'))
+    return {'days': days, 'codes': codes, 'extra': extra}
+
+
+def unpack_records(subject_id, packed, slots, day_strings):
+    """Inverse of pack_records; day_strings caches ordinal -> 'YYYY-MM-DD'"""
+    days = list(accumulate(packed['days']))
+    for day in set(days).difference(day_strings):
+        day_strings[day] = date.fromordinal(day).isoformat()
+    prefix = f"{subject_id}-"
+    suffixes = [f"-{slot}" for slot in slots]
+    records = [
+        {'key': prefix + day_strings[day] + suffixes[code >> 1], 'status': 'present' if code & 1 else 'absent'}
+        for day, code in zip(days, packed['codes'])
+    ]
+    for position, record in packed['extra']:
+        records.insert(position, record)
+    return records
+
+
+def pack_sessions(sessions):
+    """Study sessions -> columnar {'subject', 'day', 'duration', 'extra'}
+
+    Sessions other than {'subject', 'date': 'dd/mm/yyyy', 'duration': int}
+    are kept verbatim in extra as [position, session].
+    """
+    columns = {'subject': [], 'day': [], 'duration': [], 'extra': []}
+    for position, session in enumerate(sessions):
+        day = None
+        if isinstance(session, dict) and tuple(session) == SESSION_FIELDS and type(session['duration']) is int:
+            day = _parse_dmy_day(session['date'])
+        if day is None:
+            columns['extra'].append([position, session])
+            continue
+        columns['subject'].append(session['subject'])
+        columns['day'].append(day)
+        columns['duration'].append(session['duration'])
+    return columns
+
+
+def unpack_sessions(columns):
+    day_strings = {day: date.fromordinal(day).strftime('%d/%m/%Y') for day in set(columns['day'])}
+    sessions = [
+        {'subject': subject, 'date': day_strings[day], 'duration': duration}
+        for subject, day, duration in zip(columns['subject'], columns['day'], columns['duration'])
+    ]
+    for position, session in columns['extra']:
+        sessions.insert(position, session)
+    return sessions
+
+
+def pack_app_data(app_data):
+    """(packed app_data, layout) with attendance records and study sessions packed
+
+    layout lists the slot strings and which parts were packed, for unpack_app_data.
+    """
+    packed = dict(app_data)
+    layout = {'slots': [], 'subjects': [], 'sessions': False}
+    slot_index = {}
+    attendance = app_data.get('attendanceData')
+    if isinstance(attendance, dict):
+        packed['attendanceData'] = dict(attendance)
+        for subject_id, entry in attendance.items():
+            if isinstance(entry, dict) and isinstance(entry.get('records'), list):
+                records = pack_records(subject_id, entry['records'], layout['slots'], slot_index)
+                packed['attendanceData'][subject_id] = dict(entry, records=records)
+                layout['subjects'].append(subject_id)
+    if isinstance(app_data.get('studySessions'), list):
+        packed['studySessions'] = pack_sessions(app_data['studySessions'])
+        layout['sessions'] = True
+    return packed, layout
+
+
+def unpack_app_data(packed, layout):
+    """Inverse of pack_app_data: the app_data shape the API and the rest of the app use"""
+    app_data = dict(packed)
+    day_strings = {}
+    if layout['subjects']:
+        app_data['attendanceData'] = attendance = dict(app_data['attendanceData'])
+        for subject_id in layout['subjects']:
+            entry = attendance[subject_id]
+            records = unpack_records(subject_id, entry['records'], layout['slots'], day_strings)
+            attendance[subject_id] = dict(entry, records=records)
+    if layout['sessions']:
+        app_data['studySessions'] = unpack_sessions(app_data['studySessions'])
+    return app_data
+
+
+def encode_user(user_data):
+    """A user document as bytes: header + msgpack (or compact JSON without msgpack)
+
+    The body is {'account': fields other than app_data, 'app_data': packed,
+    'layout': ...}, so account fields can be read without unpacking app_data.
+    """
+    document = {'account': {key: value for key, value in user_data.items() if key != 'app_data'}}
+    if 'app_data' in user_data:
+        app_data = user_data['app_data']
+        if isinstance(app_data, dict):
+            document['app_data'], document['layout'] = pack_app_data(app_data)
+        else:
+            document['app_data'] = app_data
+    if msgpack is not None:
+        return MAGIC + MSGPACK + msgpack.packb(document, use_bin_type=True)
+    return MAGIC + JSON + json.dumps(document, separators=(',', ':')).encode('utf-8')
+
+
+def decode_user(data, expand=True):
+    """Inverse of encode_user; with expand=False only the account fields are returned
+
+    Raises ValueError for data that is not an encoded user document.
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not an encoded user document')
+    container = data[len(MAGIC):len(MAGIC) + 1]
+    body = data[len(MAGIC) + 1:]
+    if container == MSGPACK:
+        if msgpack is None:
+            raise RuntimeError('msgpack is required to read this user document (pip install msgpack)')
+        document = msgpack.unpackb(body, raw=False, strict_map_key=False)
+    elif container == JSON:
+        document = json.loads(body)
+    else:
+        raise ValueError(f"Unknown user document container: {container!r}")
+    user_data = document['account']
+    if expand and 'app_data' in document:
+        app_data = document['app_data']
+        if 'layout' in document:
+            app_data = unpack_app_data(app_data, document['layout'])
+        user_data['app_data'] = app_data
+    return user_data